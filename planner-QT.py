@@ -11,30 +11,356 @@ https://creativecommons.org/licenses/by-nc/4.0/
 """
 
 import sys
-import csv
 import os
-import re
-import subprocess
 import calendar
+import csv
+import time
+import sqlite3
+from collections import OrderedDict
 from datetime import datetime
 
 # PyQt imports
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QLabel,
-    QLineEdit, QPushButton, QCheckBox, QMessageBox, QMenu, QAction, QDialog,
-    QFileDialog, QTextEdit, QComboBox, QScrollArea, QFrame, QMenuBar,
-    QCalendarWidget, QStyle, QSplitter, QGridLayout
+    QLineEdit, QPushButton, QMessageBox, QMenu, QAction, QDialog,
+    QFileDialog, QPlainTextEdit, QScrollBar, QComboBox, QSpinBox, QSplitter, QGridLayout, QListView, QStyledItemDelegate,
+    QProgressBar, QActionGroup, QInputDialog, QCheckBox, QListWidget, QListWidgetItem, QTextBrowser
+)
+from PyQt5.QtCore import (
+    Qt, QTimer, QRect, QPoint, pyqtSlot, pyqtSignal, QAbstractListModel, QModelIndex, QObject, QEvent,
+    QPersistentModelIndex, QThread, QProcess, QMarginsF
+)
+from PyQt5.QtGui import (
+    QFont, QPainter, QPen, QColor, QPalette, QPixmap, QFontMetrics, QTextDocument, QPdfWriter,
+    QPageSize, QPageLayout, QTextCursor, QTextDocumentFragment, QTextFrameFormat, QTextBlockFormat,
+    QSyntaxHighlighter, QTextCharFormat
 )
-from PyQt5.QtCore import Qt, QTimer, QRect, pyqtSlot, QDateTime
-from PyQt5.QtGui import QFont, QPainter, QPen, QColor
+
+from planner_core import (
+    CSV_BATCH_SIZE, FREQUENCIES, TaskTable, TaskStore, EventStore, WriteBehind, at_time, day_span,
+    lazy_import, read_tasks_csv, write_tasks_csv
+)
+from planner_calendar import GRID_WEEKS, HEAT_COLORS, DayActivity, heat_level, page_days, step_month
+from planner_clock import Clock
+from planner_schedule import RELAYOUT_INTERVAL_MS, VIEWS, ScheduleEngine
+from planner_theme import DEFAULT_THEME, THEMES
+
+# Only needed once a calendar file, note or PDF export is used; loaded on first attribute access
+planner_export = lazy_import("planner_export")
+planner_ical = lazy_import("planner_ical")
+planner_notes = lazy_import("planner_notes")
+
+
+# ----------------------------- To-Do List Model/View -----------------------------#
+class TodoListModel(QAbstractListModel):
+    """
+    List model over a TaskStore.
+    The QListView only asks for the rows it is painting, so no widgets are created per task.
+    """
+    def __init__(self, store, parent=None):
+        super().__init__(parent)
+        self.store = store
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.store)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        task = self.store.at(index.row())
+        if role == Qt.DisplayRole:
+            return task.text
+        if role == Qt.CheckStateRole:
+            return Qt.Checked if task.completed else Qt.Unchecked
+        return None
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.NoItemFlags
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable | Qt.ItemIsUserCheckable
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if not index.isValid() or role != Qt.CheckStateRole:
+            return False
+        self.store.set_completed(self.store.at(index.row()).id, value == Qt.Checked)
+        self.dataChanged.emit(index, index, [Qt.CheckStateRole])
+        return True
+
+    def add_task(self, text, completed=False):
+        row = len(self.store)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.store.add(text, completed)
+        self.endInsertRows()
+
+    def remove_task(self, row):
+        if 0 <= row < len(self.store):
+            self.beginRemoveRows(QModelIndex(), row, row)
+            self.store.remove(self.store.at(row).id)
+            self.endRemoveRows()
+
+    def set_tasks(self, tasks):
+        """Replace every task in one model reset instead of one insert per row."""
+        self.beginResetModel()
+        self.store.replace(tasks)
+        self.endResetModel()
+
+
+class TodoItemDelegate(QStyledItemDelegate):
+    """
+    Paints the checkbox and text for each visible row, greyed out and struck through
+    once the task is completed. The base class draws the checkbox and handles clicks on it.
+    """
+    def initStyleOption(self, option, index):
+        super().initStyleOption(option, index)
+        if index.data(Qt.CheckStateRole) == Qt.Checked:
+            option.font.setStrikeOut(True)
+            option.palette.setColor(QPalette.Text, QColor("lightgray"))
+
+
+# ----------------------------- Background CSV Import/Export -----------------------------#
+class CsvTaskWorker(QThread):
+    """
+    Reads or writes the to-do CSV off the GUI thread.
+    Imported rows are emitted in batches so the list fills in while the file is still parsed.
+    Exports go to a temporary file that only replaces the target once every row is written.
+    """
+    batch_ready = pyqtSignal(list)
+    progress = pyqtSignal(int)
+    failed = pyqtSignal(str)
+
+    batch_size = CSV_BATCH_SIZE
+    reader = staticmethod(read_tasks_csv)
+    writer = staticmethod(write_tasks_csv)
+    errors = (OSError, csv.Error, UnicodeDecodeError)
+    loaded_message = "To-Do List loaded successfully!"
+    saved_message = "To-Do List saved to {}"
+
+    def __init__(self, file_path, tasks=None, parent=None):
+        super().__init__(parent)
+        self.file_path = file_path
+        self.tasks = tasks  # None when importing, a list of (text, completed) when exporting
+        self.cancelled = False
+        self.error = None
+
+    def run(self):
+        try:
+            if self.tasks is None:
+                for batch, percent in self.reader(self.file_path, self.batch_size):
+                    if self.isInterruptionRequested():
+                        self.cancelled = True
+                        return
+                    self.batch_ready.emit(batch)
+                    self.progress.emit(percent)
+            else:
+                writer = self.writer(self.file_path, self.tasks, self.batch_size)
+                for percent in writer:
+                    if self.isInterruptionRequested():
+                        self.cancelled = True
+                        writer.close()  # discards the partial file
+                        return
+                    self.progress.emit(percent)
+        except self.errors as e:
+            self.error = str(e)
+            self.failed.emit(self.error)
+
+
+class IcsWorker(CsvTaskWorker):
+    """The same job for an .ics calendar: tasks is the store's snapshot of events when exporting."""
+    # planner_ical is only loaded once a calendar is imported or exported
+    @property
+    def batch_size(self):
+        return planner_ical.ICS_BATCH_SIZE
+
+    def reader(self, *args):
+        return planner_ical.read_ics(*args)
+
+    def writer(self, *args):
+        return planner_ical.write_ics(*args)
+
+    errors = (OSError, ValueError)
+    loaded_message = "Calendar imported successfully!"
+    saved_message = "Calendar saved to {}"
+
+
+# ----------------------------- Schedule View -----------------------------#
+class ScheduleView(QWidget):
+    """
+    Custom-painted schedule: hour grid, events and the current-time line in one paintEvent.
+
+    The grid and events are rendered into a cached QPixmap that is only rebuilt when the
+    view, the theme, the size or one of the displayed events changes. Each paint just blits
+    the dirty rect from it and draws the red now-line on top, so the minute tick repaints a
+    2px strip instead of the whole schedule.
+    """
+    event_menu_requested = pyqtSignal(int, QPoint)  # event id, global position
+
+    def __init__(self, engine, parent=None):
+        super().__init__(parent)
+        self.engine = engine
+        self.view = "day"
+        self.anchor = datetime.now().date()
+        self.bg = QColor(DEFAULT_THEME.bg)
+        self.slot_color = QColor(DEFAULT_THEME.slot)
+        self.text_color = QColor(DEFAULT_THEME.text)
+        self._static = None  # cached QPixmap of grid + events
+        self._hits = []  # (QRect, event id) for every event drawn, for hit testing
+        self._days = set()
+        self._now_y = None
+        engine.event_store.subscribe(self._event_changed)
+
+        # Resize events arrive in bursts while the window or splitter is dragged; they are
+        # coalesced into one relayout per frame and the stale layer is stretched meanwhile
+        self._relayout_timer = QTimer(self)
+        self._relayout_timer.setSingleShot(True)
+        self._relayout_timer.setInterval(RELAYOUT_INTERVAL_MS)
+        self._relayout_timer.timeout.connect(self.invalidate)
+
+    def set_view(self, view, anchor):
+        self.view = view
+        self.anchor = anchor
+        self.invalidate()
+
+    def set_colors(self, bg, slot_color, text_color):
+        self.bg, self.slot_color, self.text_color = QColor(bg), QColor(slot_color), QColor(text_color)
+        self.invalidate()
+
+    def invalidate(self):
+        """Drop the cached static layer and repaint everything."""
+        self._static = None
+        self.update()
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        if self._static is not None and not self._relayout_timer.isActive():
+            self._relayout_timer.start()
+
+    def _event_changed(self, kind, event):
+        if kind == "rule":
+            if any(event.overlaps(*day_span(day)) for day in self._days):
+                self.invalidate()
+        elif self._days.intersection(self.engine.event_store.days_of(event)):
+            self.invalidate()
+
+    def event_at(self, pos):
+        for rect, event_id in reversed(self._hits):
+            if rect.contains(pos):
+                return event_id
+        return None
+
+    # ----------------------------- Current time -----------------------------#
+    def now_line_y(self):
+        now = datetime.now()
+        days, columns, gutter, header, cell_width, cell_height = self.engine.grid(self.view, self.anchor, self.width(), self.height())
+        fraction = self.engine.time_fraction(now)
+        if self.view == "month" or now.date() not in days or fraction is None:
+            return None
+        return header + int(fraction * cell_height)
+
+    def update_now(self):
+        """Move the now-line, repainting only the strips it leaves and enters."""
+        y = self.now_line_y()
+        if y == self._now_y:
+            return
+        if self._now_y is not None:
+            self.update(QRect(0, self._now_y - 1, self.width(), 2))
+        self._now_y = y
+        if y is not None:
+            self.update(QRect(0, y - 1, self.width(), 2))
+
+    # ----------------------------- Painting -----------------------------#
+    def paintEvent(self, event):
+        if self._static is None:
+            self._render_static()
+            self._now_y = self.now_line_y()
+
+        painter = QPainter(self)
+        if self._static.size() != self.size() * self.devicePixelRatioF():
+            # Mid-resize: stretch the previous layer until the coalesced relayout runs
+            painter.drawPixmap(self.rect(), self._static)
+        else:
+            dirty = event.rect()
+            ratio = self._static.devicePixelRatioF()
+            source = QRect(int(dirty.x() * ratio), int(dirty.y() * ratio), int(dirty.width() * ratio), int(dirty.height() * ratio))
+            painter.drawPixmap(dirty, self._static, source)
+        if self._now_y is not None:
+            painter.fillRect(QRect(0, self._now_y - 1, self.width(), 2), QColor("red"))
+        painter.end()
+
+    def _render_static(self):
+        ratio = self.devicePixelRatioF()
+        pixmap = QPixmap(self.size() * ratio)
+        pixmap.setDevicePixelRatio(ratio)
+        pixmap.fill(self.bg)
+
+        days, columns, gutter, header, cell_width, cell_height = self.engine.grid(self.view, self.anchor, self.width(), self.height())
+        small = self.view != "day"
+        self._days = set(days)
+        self._hits = []
+
+        painter = QPainter(pixmap)
+        painter.setPen(QPen(self.text_color))
+
+        # Hour rows in the gutter
+        if self.view != "month":
+            painter.setFont(QFont("Arial", 10 if small else 14))
+            slot_height = cell_height / self.engine.hours
+            for i, label_text in enumerate(self.engine.hour_labels()):
+                rect = QRect(0, header + int(i * slot_height), gutter, int(slot_height))
+                painter.fillRect(rect, self.slot_color)
+                painter.drawRect(rect.adjusted(0, 0, -1, -1))
+                painter.drawText(rect.adjusted(4, 0, 0, 0), Qt.AlignVCenter | Qt.AlignLeft, label_text)
+
+        # Day names above the columns
+        if self.view != "day":
+            painter.setFont(QFont("Helvetica", 11))
+            for col in range(columns):
+                name = f"{days[col]:%a %d}" if self.view == "week" else f"{days[col]:%a}"
+                painter.drawText(QRect(gutter + col * cell_width, 0, cell_width, header), Qt.AlignCenter, name)
+
+        event_font = QFont("Helvetica", 9 if small else 14)
+        metrics = QFontMetrics(event_font)
+        for i, layout in enumerate(self.engine.layouts(days)):
+            x = gutter + (i % columns) * cell_width
+            y = header + (i // columns) * cell_height
+            events_y, events_height = y, cell_height
+            if self.view == "month":
+                painter.setPen(QPen(self.text_color if layout.day.month == self.anchor.month else QColor("gray")))
+                painter.setFont(QFont("Helvetica", 10))
+                cell = QRect(x, y, cell_width, cell_height)
+                painter.drawRect(cell.adjusted(0, 0, -1, -1))
+                painter.drawText(cell.adjusted(3, 1, 0, 0), Qt.AlignTop | Qt.AlignLeft, str(layout.day.day))
+                events_y, events_height = y + 16, cell_height - 18
+
+            painter.setFont(event_font)
+            xs, ys, widths, heights = layout.rects(x + 1, events_y, cell_width - 2, events_height)
+            for event, ex, ey, ew, eh in zip(layout.events, xs, ys, widths, heights):
+                rect = QRect(int(ex), int(ey), int(ew), int(eh))
+                painter.fillRect(rect, QColor(event.color))
+                painter.setPen(QPen(QColor("black")))
+                painter.drawRect(rect.adjusted(0, 0, -1, -1))
+                painter.drawText(rect, Qt.AlignCenter, metrics.elidedText(event.title, Qt.ElideRight, rect.width() - 4))
+                self._hits.append((rect, event.id))
+
+        painter.setPen(QPen(self.text_color))
+        painter.drawRect(self.rect().adjusted(0, 0, -1, -1))
+        painter.end()
+        self._static = pixmap
+
+    def contextMenuEvent(self, event):
+        event_id = self.event_at(event.pos())
+        if event_id is not None:
+            self.event_menu_requested.emit(event_id, event.globalPos())
 
 
 # ----------------------------- Dialog for Adding Events -----------------------------#
 class AddEventDialog(QDialog):
-    def __init__(self, parent=None):
+    def __init__(self, event_store, day, hours, parent=None):
         super().__init__(parent)
-        self.setWindowTitle("Add Event")
-        self.setFixedSize(300, 420)
+        self.event_store = event_store
+        self.day = day
+        self.hours = hours  # selectable hours, from the schedule's time window
+        self.setWindowTitle(f"Add Event - {day:%a %b %d}")
+        self.setFixedSize(300, 560)
         self.initUI()
 
     def initUI(self):
@@ -58,7 +384,7 @@ class AddEventDialog(QDialog):
         self.start_minute_combo = QComboBox()
         self.start_hour_combo.setFont(QFont("Helvetica", 14))
         self.start_minute_combo.setFont(QFont("Helvetica", 14))
-        for h in range(8, 20):
+        for h in self.hours:
             self.start_hour_combo.addItem(f"{h:02}")
         for m in range(0, 60, 15):
             self.start_minute_combo.addItem(f"{m:02}")
@@ -75,7 +401,7 @@ class AddEventDialog(QDialog):
         self.end_minute_combo = QComboBox()
         self.end_hour_combo.setFont(QFont("Helvetica", 14))
         self.end_minute_combo.setFont(QFont("Helvetica", 14))
-        for h in range(8, 20):
+        for h in self.hours:
             self.end_hour_combo.addItem(f"{h:02}")
         for m in range(0, 60, 15):
             self.end_minute_combo.addItem(f"{m:02}")
@@ -94,12 +420,41 @@ class AddEventDialog(QDialog):
         self.color_combo.addItems(color_options)
         layout.addWidget(self.color_combo)
 
+        # Recurrence: stored as one rule, however many times it repeats
+        self.repeat_label = QLabel("Repeat:")
+        self.repeat_label.setFont(QFont("Helvetica", 14))
+        layout.addWidget(self.repeat_label)
+
+        self.repeat_combo = QComboBox()
+        self.repeat_combo.setFont(QFont("Helvetica", 14))
+        self.repeat_combo.addItems(["Never"] + [freq.capitalize() for freq in FREQUENCIES])
+        layout.addWidget(self.repeat_combo)
+
+        repeat_layout = QHBoxLayout()
+        self.interval_spin = QSpinBox()
+        self.interval_spin.setRange(1, 99)
+        self.interval_spin.setPrefix("every ")
+        self.count_spin = QSpinBox()
+        self.count_spin.setRange(0, 9999)
+        self.count_spin.setSpecialValueText("no end")
+        self.count_spin.setSuffix(" times")
+        for spin in (self.interval_spin, self.count_spin):
+            spin.setFont(QFont("Helvetica", 14))
+            spin.setEnabled(False)
+            repeat_layout.addWidget(spin)
+        layout.addLayout(repeat_layout)
+        self.repeat_combo.currentIndexChanged.connect(self.repeat_changed)
+
         # Submit Button
         self.submit_button = QPushButton("Add Event")
         self.submit_button.setFont(QFont("Helvetica", 14))
         self.submit_button.clicked.connect(self.submit_event)
         layout.addWidget(self.submit_button)
 
+    def repeat_changed(self, index):
+        self.interval_spin.setEnabled(index > 0)
+        self.count_spin.setEnabled(index > 0)
+
     def submit_event(self):
         title = self.title_edit.text().strip()
         start_hour = self.start_hour_combo.currentText()
@@ -112,28 +467,315 @@ class AddEventDialog(QDialog):
             QMessageBox.warning(self, "Error", "Please enter a valid event title.")
             return
 
-        start_idx = int(start_hour) - 8 + (int(start_minute)/60)
-        end_idx = int(end_hour) - 8 + (int(end_minute)/60)
-        if start_idx >= end_idx:
+        start = at_time(self.day, int(start_hour), int(start_minute))
+        end = at_time(self.day, int(end_hour), int(end_minute))
+        if start >= end:
             QMessageBox.warning(self, "Error", "End time must be after start time.")
             return
 
-        # Gather data for the main window to place the event
+        # Overlap lookup goes through the day's interval index
+        conflicts = self.event_store.conflicts(start, end)
+        if conflicts:
+            names = ", ".join(f"{e.title} ({e.start:%H:%M}-{e.end:%H:%M})" for e in conflicts)
+            answer = QMessageBox.question(self, "Conflict", f"This overlaps with {names}. Add it anyway?")
+            if answer != QMessageBox.Yes:
+                return
+
+        repeat = None
+        if self.repeat_combo.currentIndex() > 0:
+            repeat = {"freq": FREQUENCIES[self.repeat_combo.currentIndex() - 1],
+                      "interval": self.interval_spin.value(), "count": self.count_spin.value() or None}
+
+        # Gather data for the main window to store and place the event
         self.event_data = {
             "title": title,
-            "start_idx": start_idx,
-            "end_idx": end_idx,
-            "color": color
+            "start": start,
+            "end": end,
+            "color": color,
+            "repeat": repeat
         }
         self.accept()
 
 
+# ----------------------------- In-process PDF Rendering -----------------------------#
+def note_document(md_path):
+    """
+    (title, QTextDocument) of a saved note as it is printed: the front matter becomes a
+    title block above the body. The "Last Modified" line is left out, like the render
+    cache leaves it out of its key, so a cached PDF never shows an older save's time.
+    """
+    metadata, body = planner_notes.read_note(md_path)
+    metadata = metadata or {}
+    title = metadata.get("Title", "Untitled")
+    created = metadata.get("Date Created")
+
+    header = f"# {title}\n\n" + (f"*Date Created: {created}*\n\n" if created else "")
+    document = QTextDocument()
+    document.setDefaultFont(QFont("Helvetica", 11))
+    document.setMarkdown(header + body + "\n")
+    return title, document
+
+
+def render_pdf(md_path, pdf_path):
+    """
+    Render a saved note to PDF without leaving the process: Qt's Markdown parser builds
+    a QTextDocument and QPdfWriter prints it. Takes milliseconds and needs no pandoc or
+    LaTeX install.
+    """
+    title, document = note_document(md_path)
+    open(pdf_path, 'ab').close()  # QPdfWriter fails silently on unwritable paths
+    writer = QPdfWriter(pdf_path)
+    writer.setTitle(title)
+    writer.setPageSize(QPageSize(QPageSize.A4))
+    writer.setPageMargins(QMarginsF(20, 20, 20, 20), QPageLayout.Millimeter)
+    document.print_(writer)
+
+
+# ----------------------------- Live Markdown Preview -----------------------------#
+# Idle time after the last keystroke before the preview catches up
+PREVIEW_DELAY_MS = 250
+
+
+class MarkdownPreview(QTextBrowser):
+    """
+    Rendered view of a Markdown note, updated incrementally.
+
+    Each top-level Markdown block is rendered into its own QTextFrame. On update, the
+    blocks shared with the previous text at the start and end are kept as they are and
+    only the frames in between are replaced; rendered blocks are cached by their text,
+    so moving or restoring a block does not render it again. Large changes (opening a
+    long note) are applied a chunk of blocks per event-loop turn.
+    """
+    cache_size = 2000
+    chunk_size = 100
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setOpenExternalLinks(True)
+        self._blocks = []  # source text of each rendered block
+        self._frames = []  # the QTextFrame holding each block
+        self._target = []  # blocks of the latest text, still being applied
+        self._step_timer = QTimer(self)
+        self._step_timer.setSingleShot(True)
+        self._step_timer.timeout.connect(self._apply_step)
+        self._fragments = OrderedDict()  # block text -> (QTextDocumentFragment, first block format), LRU
+        self._frame_format = QTextFrameFormat()
+        self._frame_format.setBottomMargin(6)
+        # Qt keeps an empty block between frames; collapse it so blocks are spaced by the frame margin
+        self._separator_format = QTextBlockFormat()
+        self._separator_format.setLineHeight(1, QTextBlockFormat.FixedHeight)
+
+    def _fragment(self, block):
+        fragment = self._fragments.get(block)
+        if fragment is None:
+            document = QTextDocument()
+            document.setDefaultFont(self.font())
+            document.setMarkdown(block)
+            # Inserting a fragment drops its first block's format (quote indent, code fence, heading)
+            fragment = self._fragments[block] = (QTextDocumentFragment(document), document.begin().blockFormat())
+            if len(self._fragments) > self.cache_size:
+                self._fragments.popitem(last=False)
+        else:
+            self._fragments.move_to_end(block)
+        return fragment
+
+    def set_markdown(self, text):
+        self._target = planner_notes.markdown_blocks(text)
+        self._apply_step()
+
+    def _apply_step(self):
+        blocks = self._target
+        old = self._blocks
+        start = 0
+        while start < len(old) and start < len(blocks) and old[start] == blocks[start]:
+            start += 1
+        old_end, new_end = len(old), len(blocks)
+        while old_end > start and new_end > start and old[old_end - 1] == blocks[new_end - 1]:
+            old_end -= 1
+            new_end -= 1
+        if start == old_end == new_end:
+            return
+
+        cursor = QTextCursor(self.document())
+        cursor.beginEditBlock()
+        if old_end > start:
+            # Each frame is followed by an empty separator block; remove both
+            cursor.setPosition(self._frames[start].firstPosition() - 1)
+            cursor.setPosition(self._frames[old_end - 1].lastPosition() + 1, QTextCursor.KeepAnchor)
+            cursor.removeSelectedText()
+        position = self._frames[start - 1].lastPosition() + 1 if start else 0
+        inserted = blocks[start:min(new_end, start + self.chunk_size)]
+        frames = []
+        for block in inserted:
+            cursor.setPosition(position)
+            frame = cursor.insertFrame(self._frame_format)
+            fragment, block_format = self._fragment(block)
+            cursor.insertFragment(fragment)
+            cursor.setPosition(frame.firstPosition())
+            cursor.setBlockFormat(block_format)
+            frames.append(frame)
+            position = frame.lastPosition() + 1
+            cursor.setPosition(position)
+            cursor.setBlockFormat(self._separator_format)
+        cursor.endEditBlock()
+
+        self._frames[start:old_end] = frames
+        self._blocks = old[:start] + inserted + old[old_end:]
+        if len(inserted) < new_end - start:
+            self._step_timer.start(0)
+
+
+# ----------------------------- Markdown Syntax Highlighting -----------------------------#
+class MarkdownHighlighter(QSyntaxHighlighter):
+    """
+    Colours Markdown in the notes editor. Qt re-highlights only the blocks an edit touches,
+    moving on to the next block only while a block's end state (inside a code fence or
+    not) changes, so a keystroke costs the same in a short note and a long one.
+    """
+    def __init__(self, document=None):
+        super().__init__(document)
+        self.formats = {}
+        for kind, style in planner_notes.MARKDOWN_STYLES.items():
+            fmt = QTextCharFormat()
+            if "color" in style:
+                fmt.setForeground(QColor(style["color"]))
+            if style.get("bold"):
+                fmt.setFontWeight(QFont.Bold)
+            fmt.setFontItalic(style.get("italic", False))
+            fmt.setFontUnderline(style.get("underline", False))
+            if style.get("monospace"):
+                fmt.setFontFamily("Courier")
+            self.formats[kind] = fmt
+
+    def highlightBlock(self, text):
+        state = self.previousBlockState()
+        spans, state = planner_notes.markdown_spans(text, planner_notes.STATE_TEXT if state < 0 else state)
+        for start, length, kind in spans:
+            self.setFormat(start, length, self.formats[kind])
+        self.setCurrentBlockState(state)
+
+
+# ----------------------------- Paged View of Huge Notes -----------------------------#
+class PagedTextView(QWidget):
+    """
+    Editor for a MappedNote. The text widget holds one page of PAGE_LINES lines; the
+    scrollbar beside it spans the whole note, and scrolling near either edge of the page
+    swaps in the page around the new position. Each edit replaces the page's lines in
+    the note, so the scroll range and the next page always match what was typed.
+    """
+    edited = pyqtSignal()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.note = None
+        self.page_first = 0  # line number of the first line in the text widget
+        self.page_lines = 0
+        self._syncing = False  # set while the two scrollbars are moved programmatically
+
+        self.text = QPlainTextEdit()
+        self.text.setLineWrapMode(QPlainTextEdit.NoWrap)
+        self.text.setVerticalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        self.scrollbar = QScrollBar(Qt.Vertical)
+        layout = QHBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.setSpacing(0)
+        layout.addWidget(self.text)
+        layout.addWidget(self.scrollbar)
+
+        self.scrollbar.valueChanged.connect(self.scroll_to)
+        self.text.verticalScrollBar().valueChanged.connect(self._page_scrolled)
+        self.text.textChanged.connect(self._page_edited)
+
+    def set_note(self, note):
+        """Show a MappedNote (closing the previous one), or nothing for None."""
+        if self.note is not None:
+            self.note.close()
+        self.note = note
+        self.page_first = self.page_lines = 0
+        self._syncing = True
+        self.text.clear()
+        self._syncing = False
+        if note is not None:
+            self._update_range()
+            self._load_page(0)
+            self.scrollbar.setValue(0)
+
+    def visible_lines(self):
+        return max(1, self.text.viewport().height() // self.text.fontMetrics().lineSpacing())
+
+    def _update_range(self):
+        visible = self.visible_lines()
+        self.scrollbar.setPageStep(visible)
+        self.scrollbar.setRange(0, max(0, len(self.note) - visible))
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        if self.note is not None:
+            self._update_range()
+
+    def _load_page(self, first):
+        self.page_first = first
+        self.page_lines = min(planner_notes.PAGE_LINES, len(self.note) - first)
+        self._syncing = True
+        self.text.setPlainText(self.note.lines(first, first + planner_notes.PAGE_LINES))
+        self._syncing = False
+
+    @pyqtSlot(int)
+    def scroll_to(self, line):
+        if self.note is None:
+            return
+        # Keep a screenful of loaded lines beyond the view, so wheel scrolling can reach the edge
+        visible = self.visible_lines()
+        page_end = self.page_first + self.page_lines
+        if ((line - visible < self.page_first and self.page_first > 0)
+                or (line + 2 * visible > page_end and page_end < len(self.note))):
+            page = planner_notes.PAGE_LINES
+            self._load_page(max(0, min(line - page // 2, len(self.note) - page)))
+        self._syncing = True
+        self.text.verticalScrollBar().setValue(line - self.page_first)
+        self._syncing = False
+
+    @pyqtSlot()
+    def _page_edited(self):
+        if self._syncing or self.note is None:
+            return
+        self.page_lines = self.note.replace(self.page_first, self.page_first + self.page_lines,
+                                            self.text.toPlainText())
+        self._update_range()
+        self.edited.emit()
+
+    @pyqtSlot(int)
+    def _page_scrolled(self, value):
+        # Wheel and keyboard scrolling move the page; the outer scrollbar follows
+        if not self._syncing:
+            self.scrollbar.setValue(self.page_first + value)
+
+
 # ----------------------------- Dialog for Markdown Notes -----------------------------#
 class NotesDialog(QDialog):
-    def __init__(self, parent=None):
+    """
+    Markdown editor with a live preview. Once a note has a file, edits are autosaved
+    shortly after typing stops: the text is captured here and the span that changed is
+    appended to the note's journal by the writer thread, which compacts the journal into
+    the note when it grows or the note is closed, so the dialog never waits on the disk.
+
+    Notes of LARGE_NOTE_BYTES and up open in large-file mode: the preview is turned off
+    and the text is appended a chunk per event-loop turn. Notes of HUGE_NOTE_BYTES and
+    up are memory-mapped and edited a page at a time; saving streams the unedited lines
+    from the mapping, so autosaves of a huge note still run on the writer thread.
+    """
+    def __init__(self, export_queue, writer, parent=None):
         super().__init__(parent)
+        self.export_queue = export_queue
+        self.writer = writer
+        self.file_path = None  # file being edited, once saved or opened
+        self.mode = "normal"  # "normal", "large" or "paged"
+        self.load_chunks = None  # body chunks still to insert while a large note loads
+        self.loading_path = None
+        self.journal = None  # autosave journal of the open note, outside paged mode
+        self.writer.submit("recover-notes", planner_notes.recover_notes)
         self.setWindowTitle("Markdown Notes")
-        self.resize(700, 600)
+        self.resize(1100, 600)
         self.initUI()
 
     def initUI(self):
@@ -154,9 +796,37 @@ class NotesDialog(QDialog):
         self.notes_label.setFont(QFont("Helvetica", 16, QFont.Bold))
         self.main_layout.addWidget(self.notes_label)
 
-        self.notes_text = QTextEdit()
+        # Editor and live preview side by side; the preview re-renders shortly after typing stops
+        self.notes_text = QPlainTextEdit()
         self.notes_text.setFont(QFont("Helvetica", 14))
-        self.main_layout.addWidget(self.notes_text)
+        self.highlighter = MarkdownHighlighter(self.notes_text.document())
+        self.preview = MarkdownPreview()
+        self.preview.setFont(QFont("Helvetica", 12))
+        self.pager = PagedTextView()
+        self.pager.text.setFont(QFont("Courier", 12))
+        self.pager.hide()
+        editor_splitter = QSplitter(Qt.Horizontal)
+        editor_splitter.addWidget(self.notes_text)
+        editor_splitter.addWidget(self.preview)
+        editor_splitter.addWidget(self.pager)
+        self.main_layout.addWidget(editor_splitter, 1)
+
+        self.load_timer = QTimer(self)
+        self.load_timer.timeout.connect(self.load_step)
+
+        self.preview_timer = QTimer(self)
+        self.preview_timer.setSingleShot(True)
+        self.preview_timer.setInterval(PREVIEW_DELAY_MS)
+        self.preview_timer.timeout.connect(self.update_preview)
+        self.notes_text.textChanged.connect(self.preview_timer.start)
+
+        self.autosave_timer = QTimer(self)
+        self.autosave_timer.setSingleShot(True)
+        self.autosave_timer.setInterval(planner_notes.AUTOSAVE_DELAY_MS)
+        self.autosave_timer.timeout.connect(self.autosave)
+        self.notes_text.textChanged.connect(self.schedule_autosave)
+        self.pager.edited.connect(self.schedule_autosave)
+        self.title_edit.textEdited.connect(self.schedule_autosave)
 
         # Metadata label
         self.metadata_label = QLabel("")
@@ -177,6 +847,50 @@ class NotesDialog(QDialog):
         btn_layout.addWidget(self.open_btn)
         self.main_layout.addLayout(btn_layout)
 
+        # PDFs are rendered in-process unless the slower, high-fidelity pandoc route is chosen
+        self.pandoc_check = QCheckBox("High-fidelity PDF via pandoc")
+        self.pandoc_check.setFont(QFont("Helvetica", 12))
+        self.pandoc_check.setChecked(self.export_queue.backend == "pandoc")
+        self.pandoc_check.toggled.connect(
+            lambda checked: setattr(self.export_queue, "backend", "pandoc" if checked else "qt"))
+        self.main_layout.addWidget(self.pandoc_check)
+
+    @pyqtSlot()
+    def update_preview(self):
+        if self.mode == "normal":
+            self.preview.set_markdown(self.notes_text.toPlainText())
+
+    def set_mode(self, mode):
+        """Switch between the editor with preview, large-file mode and the pager."""
+        if (mode == "normal") != (self.mode == "normal"):
+            # Large notes are not highlighted, like the preview; the highlighter would style every appended chunk
+            self.highlighter.setDocument(self.notes_text.document() if mode == "normal" else None)
+        self.mode = mode
+        self.notes_text.setVisible(mode != "paged")
+        self.preview.setVisible(mode == "normal")
+        self.pager.setVisible(mode == "paged")
+        if mode != "normal":
+            self.preview.set_markdown("")
+        if mode != "paged":
+            self.pager.set_note(None)
+
+    @pyqtSlot()
+    def schedule_autosave(self):
+        if self.file_path:
+            self.autosave_timer.start()
+
+    @pyqtSlot()
+    def autosave(self):
+        file_path = self.file_path
+        if self.mode == "paged":
+            note, pieces = self.pager.note, self.pager.note.pieces
+            metadata, _ = planner_notes.note_content(file_path, self.title_edit.text().strip(), "")
+            self.writer.submit(file_path, lambda: note.write(file_path, metadata, pieces))
+        else:
+            metadata, _ = planner_notes.note_content(file_path, self.title_edit.text().strip(), "")
+            self.journal.record(metadata, self.notes_text.toPlainText().strip())
+        self.metadata_label.setText(f"Autosaved {file_path} at {metadata['Last Modified']}")
+
     @pyqtSlot()
     def save_notes(self, file_path=None):
         if not file_path:
@@ -184,102 +898,292 @@ class NotesDialog(QDialog):
         if not file_path:
             return
 
-        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-        # If file exists, read metadata
-        if os.path.exists(file_path):
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            metadata_match = re.match(r'---\n(.*?)\n---\n', content, re.DOTALL)
-            if metadata_match:
-                metadata = metadata_match.group(1)
-                try:
-                    created_date = re.search(r'Date Created: (.*)', metadata).group(1)
-                except:
-                    created_date = now
-                try:
-                    title_match = re.search(r'Title: (.*)', metadata)
-                    old_title = title_match.group(1) if title_match else "Untitled"
-                except:
-                    old_title = "Untitled"
-                last_modified = now
-            else:
-                created_date = now
-                old_title = self.title_edit.text().strip() or "Untitled"
-                last_modified = now
+        # A queued autosave of this note must not land after the explicit save
+        self.autosave_timer.stop()
+        self.close_journal(compact=False)  # the save below writes the note in full
+        self.writer.flush()
+        if self.mode == "paged":
+            metadata = planner_notes.save_mapped_note(file_path, self.title_edit.text().strip(), self.pager.note)
         else:
-            created_date = now
-            last_modified = now
-            old_title = self.title_edit.text().strip() or "Untitled"
+            body = self.notes_text.toPlainText().strip()
+            metadata = planner_notes.save_note(file_path, self.title_edit.text().strip(), body)
+            self.start_journal(file_path, body)
+        self.title_edit.setText(metadata["Title"])
+        self.file_path = file_path
+        if self.mode == "paged":
+            self.metadata_label.setText(f"Saved at {file_path} | Not converted to PDF, the note is too large")
+            return
 
-        final_title = self.title_edit.text().strip() or old_title
-        text_body = self.notes_text.toPlainText().strip()
+        self.metadata_label.setText(f"Saved at {file_path} | Converting to PDF...")
 
-        markdown_content = f"""---
-Title: {final_title}
-Date Created: {created_date}
-Last Modified: {last_modified}
----
+        # PDF conversion runs in the background; the main window reports the result
+        self.export_queue.submit(file_path)
 
-{text_body}
-"""
+    @pyqtSlot()
+    def open_notes(self):
+        file_path, _ = QFileDialog.getOpenFileName(self, "Open Markdown File", "", "Markdown Files (*.md)")
+        if file_path:
+            self.load_note(file_path)
+
+    def load_note(self, file_path):
+        self.flush_autosave()
+        self.close_journal()
+        self.stop_loading()
+        self.writer.flush()
+        planner_notes.recover_note(file_path)  # edits journaled before a crash
+        size = os.path.getsize(file_path)
+        if size >= planner_notes.HUGE_NOTE_BYTES:
+            mapped = planner_notes.MappedNote(file_path)
+            metadata = mapped.metadata
+        elif size >= planner_notes.LARGE_NOTE_BYTES:
+            metadata, chunks = planner_notes.read_note_chunks(file_path)
+        else:
+            metadata, content_body = planner_notes.read_note(file_path)
+        if metadata is None:
+            if size >= planner_notes.HUGE_NOTE_BYTES:
+                mapped.close()
+            QMessageBox.warning(self, "Error", "Invalid or missing metadata in file.")
+            return
+
+        self.file_path = None  # loading the text is not an edit to autosave
+        self.title_edit.setText(metadata.get("Title", "Untitled"))
+        self.metadata_label.setText(
+            f"Created: {metadata.get('Date Created', '')} | Last Modified: {metadata.get('Last Modified', '')}")
+        if size >= planner_notes.HUGE_NOTE_BYTES:
+            self.set_mode("paged")
+            self.pager.set_note(mapped)
+            self.metadata_label.setText(f"{self.metadata_label.text()} | {size / 2**20:.0f} MB, {len(mapped)} lines")
+            self.file_path = file_path
+        elif size >= planner_notes.LARGE_NOTE_BYTES:
+            self.set_mode("large")
+            self.notes_text.clear()
+            self.notes_text.setReadOnly(True)
+            self.notes_text.setUndoRedoEnabled(False)  # the undo stack would keep a second copy
+            self.save_btn.setEnabled(False)  # saving now would truncate the note
+            self.load_chunks = chunks
+            self.loading_path = file_path
+            self.load_timer.start(0)
+        else:
+            self.set_mode("normal")
+            self.notes_text.setPlainText(content_body)
+            self.start_journal(file_path, content_body)
+            self.file_path = file_path
 
-        # Write new content
-        with open(file_path, 'w', encoding='utf-8') as f:
-            f.write(markdown_content)
+    @pyqtSlot()
+    def load_step(self):
+        """Append the next chunk of a large note; the event loop runs between chunks."""
+        chunk = next(self.load_chunks, None)
+        if chunk is None:
+            file_path = self.loading_path
+            self.stop_loading()
+            self.notes_text.moveCursor(QTextCursor.Start)
+            self.start_journal(file_path, self.notes_text.toPlainText().strip())
+            self.file_path = file_path
+            return
+        cursor = QTextCursor(self.notes_text.document())
+        cursor.movePosition(QTextCursor.End)
+        cursor.insertText(chunk)
 
-        QMessageBox.information(self, "Success", f"Notes saved at {file_path}")
+    def stop_loading(self):
+        if self.load_chunks is None:
+            return
+        self.load_timer.stop()
+        self.load_chunks.close()
+        self.load_chunks = None
+        self.loading_path = None
+        self.notes_text.setReadOnly(False)
+        self.notes_text.setUndoRedoEnabled(True)
+        self.save_btn.setEnabled(True)
+
+    def flush_autosave(self):
+        """Queue the pending autosave now instead of when its timer fires."""
+        if self.autosave_timer.isActive():
+            self.autosave_timer.stop()
+            self.autosave()
+        if self.mode == "paged":
+            self.writer.flush()  # the write reads from the mapping, which is closed next
+
+    def start_journal(self, file_path, body):
+        self.journal = planner_notes.NoteJournal(self.writer, file_path, body)
+
+    def close_journal(self, compact=True):
+        """Queue the compaction of the open note's journal, or its removal after a save in full."""
+        if self.journal is not None:
+            self.journal.close(compact)
+            self.journal = None
+
+    def done(self, result):
+        self.flush_autosave()
+        self.close_journal()
+        self.stop_loading()
+        self.pager.set_note(None)
+        super().done(result)
+
+
+# ----------------------------- Dialog for the Notes Library -----------------------------#
+class LibrarySyncWorker(QThread):
+    """Brings a notes library's index up to date off the GUI thread, with its own connection."""
+    progress = pyqtSignal(int)  # changed notes still to index
+
+    def __init__(self, directory, parent=None):
+        super().__init__(parent)
+        self.directory = directory
 
-        # Attempt PDF conversion via pandoc
-        pdf_path = file_path.replace(".md", ".pdf")
+    def run(self):
+        library = planner_notes.NoteLibrary(self.directory)
         try:
-            subprocess.run(["pandoc", file_path, "-o", pdf_path], check=True)
-            QMessageBox.information(self, "Success", f"PDF saved at {pdf_path}")
-        except Exception as e:
-            QMessageBox.warning(self, "Conversion Error", f"Failed to convert to PDF: {e}")
+            for remaining in library.sync():
+                self.progress.emit(remaining)
+                if self.isInterruptionRequested():
+                    return
+        finally:
+            library.close()
+
+
+class NotesLibraryDialog(QDialog):
+    """
+    Full-text search over a folder of notes. The folder is rescanned and new or changed
+    notes are indexed periodically on a worker thread, so the dialog stays responsive
+    while a large library is indexed.
+    """
+
+    def __init__(self, export_queue, writer, parent=None):
+        super().__init__(parent)
+        self.export_queue = export_queue
+        self.writer = writer
+        self.library = planner_notes.NoteLibrary()
+        self.sync_worker = None
+        self.pending = 0  # notes the running sync has still to index
+        self.changed = False  # whether the running sync changed the index
+        self.setWindowTitle("Notes Library")
+        self.resize(700, 600)
+        self.initUI()
+
+        self.scan_timer = QTimer(self)
+        self.scan_timer.timeout.connect(self.scan)
+        self.scan_timer.start(planner_notes.LIBRARY_SCAN_INTERVAL_MS)
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(150)
+        self.search_timer.timeout.connect(self.run_search)
+        self.scan()
+
+    def initUI(self):
+        layout = QVBoxLayout()
+        self.setLayout(layout)
+
+        folder_layout = QHBoxLayout()
+        self.folder_label = QLabel(self.library.directory)
+        self.folder_label.setFont(QFont("Helvetica", 12))
+        folder_btn = QPushButton("Choose Folder...")
+        folder_btn.setFont(QFont("Helvetica", 12))
+        folder_btn.clicked.connect(self.choose_folder)
+        folder_layout.addWidget(self.folder_label, 1)
+        folder_layout.addWidget(folder_btn)
+        layout.addLayout(folder_layout)
+
+        self.search_edit = QLineEdit()
+        self.search_edit.setFont(QFont("Helvetica", 16))
+        self.search_edit.setPlaceholderText("Search notes...")
+        self.search_edit.textChanged.connect(lambda text: self.search_timer.start())
+        layout.addWidget(self.search_edit)
+
+        self.results = QListWidget()
+        self.results.setFont(QFont("Helvetica", 13))
+        self.results.setWordWrap(True)
+        self.results.itemActivated.connect(self.open_result)
+        layout.addWidget(self.results)
+
+        self.status_label = QLabel("")
+        self.status_label.setFont(QFont("Helvetica", 12))
+        layout.addWidget(self.status_label)
+
+    def choose_folder(self):
+        directory = QFileDialog.getExistingDirectory(self, "Notes Folder", self.library.directory)
+        if directory:
+            self.stop_sync()
+            self.library.close()
+            self.library = planner_notes.NoteLibrary(directory)
+            self.folder_label.setText(self.library.directory)
+            self.results.clear()
+            self.scan()
 
     @pyqtSlot()
-    def open_notes(self):
-        file_path, _ = QFileDialog.getOpenFileName(self, "Open Markdown File", "", "Markdown Files (*.md)")
-        if file_path:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-
-            metadata_match = re.match(r'---\n(.*?)\n---\n', content, re.DOTALL)
-            if metadata_match:
-                metadata = metadata_match.group(1)
-                content_body = content[len(metadata_match.group(0)):].strip()
-
-                # Extract data
-                try:
-                    title = re.search(r'Title: (.*)', metadata).group(1)
-                except:
-                    title = "Untitled"
-                try:
-                    created_date = re.search(r'Date Created: (.*)', metadata).group(1)
-                except:
-                    created_date = ""
-                try:
-                    last_modified = re.search(r'Last Modified: (.*)', metadata).group(1)
-                except:
-                    last_modified = ""
-
-                self.title_edit.setText(title)
-                self.metadata_label.setText(f"Created: {created_date} | Last Modified: {last_modified}")
-                self.notes_text.setPlainText(content_body)
-            else:
-                QMessageBox.warning(self, "Error", "Invalid or missing metadata in file.")
+    def scan(self):
+        if self.sync_worker is None:
+            self.changed = False
+            self.sync_worker = LibrarySyncWorker(self.library.directory, self)
+            self.sync_worker.progress.connect(self.sync_progress)
+            self.sync_worker.finished.connect(self.sync_finished)
+            self.sync_worker.start()
+        self.update_status()
+
+    @pyqtSlot(int)
+    def sync_progress(self, remaining):
+        self.pending = remaining
+        self.changed = True
+        self.update_status()
+
+    @pyqtSlot()
+    def sync_finished(self):
+        worker = self.sender()
+        worker.deleteLater()
+        if worker is self.sync_worker:
+            self.sync_worker = None
+            if self.changed:
+                self.run_search()
+
+    def stop_sync(self):
+        """Stop a running sync after its current batch and ignore its remaining progress."""
+        if self.sync_worker is not None:
+            self.sync_worker.progress.disconnect(self.sync_progress)
+            self.sync_worker.requestInterruption()
+            self.sync_worker.wait()
+            self.sync_worker = None
+        self.pending = 0
+
+    def update_status(self):
+        indexed = f"{len(self.library)} notes indexed"
+        self.status_label.setText(f"{indexed}, {self.pending} to go..." if self.pending else indexed)
+
+    @pyqtSlot()
+    def run_search(self):
+        self.results.clear()
+        for path, title, created, snippet in self.library.search(self.search_edit.text()):
+            item = QListWidgetItem(f"{title}  ({created or os.path.basename(path)})\n{snippet}")
+            item.setData(Qt.UserRole, path)
+            self.results.addItem(item)
+
+    def open_result(self, item):
+        dialog = NotesDialog(self.export_queue, self.writer, self)
+        dialog.load_note(item.data(Qt.UserRole))
+        dialog.exec_()
+
+    def done(self, result):
+        self.scan_timer.stop()
+        self.stop_sync()
+        self.library.close()
+        super().done(result)
 
 
 # ----------------------------- Dialog for Text-based Calendar -----------------------------#
 class CalendarDialog(QDialog):
-    def __init__(self, parent=None):
+    """
+    Clickable month grid, each day shaded by how many events and tasks it has.
+    The 42 day buttons are created once and relabelled when the month changes; the
+    month layout and the counts both come from caches, so paging is instant.
+    """
+    day_selected = pyqtSignal(object)  # datetime.date
+
+    def __init__(self, activity, parent=None):
         super().__init__(parent)
+        self.activity = activity
         self.setWindowTitle("Calendar")
-        self.resize(400, 450)
+        self.resize(520, 450)
 
         self.current_year = datetime.now().year
         self.current_month = datetime.now().month
+        self.days = ()  # dates shown by the day buttons, in grid order
 
         self.initUI()
 
@@ -289,85 +1193,148 @@ class CalendarDialog(QDialog):
 
         # Top controls
         control_layout = QHBoxLayout()
+        prev_btn = QPushButton("<")
+        prev_btn.setFont(QFont("Helvetica", 14))
+        prev_btn.clicked.connect(lambda: self.page_month(-1))
         self.month_combo = QComboBox()
         self.month_combo.setFont(QFont("Helvetica", 14))
-        for m in list(calendar.month_name)[1:]:
-            self.month_combo.addItem(m)
-        self.month_combo.setCurrentText(calendar.month_name[self.current_month])
+        self.month_combo.addItems(list(calendar.month_name)[1:])
+        self.month_combo.setCurrentIndex(self.current_month - 1)
         self.month_combo.currentIndexChanged.connect(self.select_month)
 
-        self.year_combo = QComboBox()
-        self.year_combo.setFont(QFont("Helvetica", 14))
-        for y in range(1900, 2101):
-            self.year_combo.addItem(str(y))
-        self.year_combo.setCurrentText(str(self.current_year))
-        self.year_combo.currentIndexChanged.connect(self.select_year)
-
-        control_layout.addWidget(self.month_combo)
-        control_layout.addWidget(self.year_combo)
+        self.year_spin = QSpinBox()
+        self.year_spin.setFont(QFont("Helvetica", 14))
+        self.year_spin.setRange(1, 9999)
+        self.year_spin.setValue(self.current_year)
+        self.year_spin.valueChanged.connect(self.select_year)
+
+        next_btn = QPushButton(">")
+        next_btn.setFont(QFont("Helvetica", 14))
+        next_btn.clicked.connect(lambda: self.page_month(1))
+        today_btn = QPushButton("Today")
+        today_btn.setFont(QFont("Helvetica", 14))
+        today_btn.clicked.connect(self.show_today)
+
+        control_layout.addWidget(prev_btn)
+        control_layout.addWidget(self.month_combo, 1)
+        control_layout.addWidget(self.year_spin)
+        control_layout.addWidget(next_btn)
+        control_layout.addWidget(today_btn)
         main_layout.addLayout(control_layout)
 
-        # Calendar label
-        self.calendar_label = QLabel()
-        self.calendar_label.setFont(QFont("Courier", 14))
-        main_layout.addWidget(self.calendar_label)
+        # Day grid
+        grid = QGridLayout()
+        grid.setSpacing(2)
+        for column, name in enumerate(calendar.day_abbr):
+            label = QLabel(name)
+            label.setFont(QFont("Helvetica", 12, QFont.Bold))
+            label.setAlignment(Qt.AlignCenter)
+            grid.addWidget(label, 0, column)
+        self.day_buttons = []
+        for i in range(GRID_WEEKS * 7):
+            button = QPushButton()
+            button.setFont(QFont("Helvetica", 12))
+            button.setMinimumHeight(48)
+            button.clicked.connect(lambda checked, i=i: self.select_day(i))
+            grid.addWidget(button, 1 + i // 7, i % 7)
+            self.day_buttons.append(button)
+        main_layout.addLayout(grid, 1)
+
+        legend = QLabel("Shading: events + tasks on the day. Click a day to show it in the schedule.")
+        legend.setFont(QFont("Helvetica", 11))
+        legend.setWordWrap(True)
+        main_layout.addWidget(legend)
 
         self.update_calendar(self.current_year, self.current_month)
 
-    def select_month(self):
-        selected_month = self.month_combo.currentText()
-        self.current_month = list(calendar.month_name).index(selected_month)
+    def select_month(self, index):
+        self.current_month = index + 1
         self.update_calendar(self.current_year, self.current_month)
 
-    def select_year(self):
-        self.current_year = int(self.year_combo.currentText())
+    def select_year(self, year):
+        self.current_year = year
         self.update_calendar(self.current_year, self.current_month)
 
-    def update_calendar(self, year, month):
+    def page_month(self, direction):
+        self.set_month(*step_month(self.current_year, self.current_month, direction))
+
+    def show_today(self):
         now = datetime.now()
-        today = now.day if (year == now.year and month == now.month) else None
+        self.set_month(now.year, now.month)
+
+    def set_month(self, year, month):
+        """Move both controls, then draw once."""
+        self.current_year, self.current_month = year, month
+        self.year_spin.blockSignals(True)
+        self.month_combo.blockSignals(True)
+        self.year_spin.setValue(year)
+        self.month_combo.setCurrentIndex(month - 1)
+        self.year_spin.blockSignals(False)
+        self.month_combo.blockSignals(False)
+        self.update_calendar(year, month)
 
-        cal = calendar.monthcalendar(year, month)
-        cal_text = f"{calendar.month_name[month]} {year}\n\n"
-        cal_text += " Mo  Tu  We  Th  Fr  Sa  Su\n"
+    def update_calendar(self, year, month):
+        today = datetime.now().date()
+        self.days = page_days(year, month)
+        for button, day in zip(self.day_buttons, self.days):
+            events, tasks = self.activity.counts(day)
+            count = events + tasks
+            button.setText(f"{day.day}\n{count}" if count else str(day.day))
+            button.setToolTip(self.activity.describe(day))
+            in_month = day.month == month
+            border = "2px solid #da4167" if day == today else "1px solid #c0c0c0"
+            button.setStyleSheet(
+                f"background-color: {HEAT_COLORS[heat_level(count)]}; color: {'#381d2a' if in_month else '#a0a0a0'};"
+                f" border: {border};{' font-weight: bold;' if day == today else ''}")
+
+    def select_day(self, i):
+        self.day_selected.emit(self.days[i])
+        self.accept()
 
-        for week in cal:
-            for day in week:
-                if day == 0:
-                    cal_text += "    "
-                else:
-                    # Mark today with an asterisk
-                    if day == today:
-                        cal_text += f"{day:3d}*"
-                    else:
-                        cal_text += f"{day:3d} "
-            cal_text += "\n"
 
-        self.calendar_label.setText(cal_text)
+# ----------------------------- Theme -----------------------------#
+def theme_palette(theme):
+    """
+    A theme compiled into an application palette. Disabled colours are derived by Qt
+    from the button and window colours; only the active and inactive groups are set.
+    """
+    palette = QPalette(QColor(theme.button), QColor(theme.bg))
+    roles = {QPalette.Window: theme.bg, QPalette.Base: theme.bg, QPalette.AlternateBase: theme.bg,
+             QPalette.WindowText: theme.text, QPalette.Text: theme.text, QPalette.Button: theme.button,
+             QPalette.ButtonText: theme.text}
+    for group in (QPalette.Active, QPalette.Inactive):
+        for role, color in roles.items():
+            palette.setColor(group, role, QColor(color))
+    return palette
 
 
 # ----------------------------- Main Window -----------------------------#
 class PlannerWindow(QMainWindow):
+    # Emitted from the writer thread; Qt queues it to the GUI thread
+    write_failed = pyqtSignal(str)
+
     def __init__(self):
         super().__init__()
 
         self.setWindowTitle("Planner (PyQt)")
         self.resize(900, 750)
 
-        # For theming
-        self.univ_bg_day = "#FFECD8"
-        self.text_color_day = "#381d2a"
-        self.schedule_color_day = "#88D5D3"
-        self.button_color_day = "#E3E6B5"
-
-        self.univ_bg_night = "#231123"
-        self.text_color_night = "#da4167"
-        self.schedule_color_night = "#3E0F06"
-        self.button_color_night = "#3B5360"
+        # For theming: every theme is compiled once; switching swaps the application palette
+        self.palettes = {name: theme_palette(theme) for name, theme in THEMES.items()}
 
         # State variables
         self.isNightMode = False
-        self.todo_tasks = []
+        self.task_store = TaskStore()
+        self.writer = WriteBehind(on_error=self.write_failed.emit)
+        self.write_failed.connect(lambda message: self.statusBar().showMessage(f"Autosave failed: {message}", 10000))
+        self.task_table = self.open_task_table()
+        self.event_store = EventStore()
+        self.event_store.load()
+        self.schedule_engine = ScheduleEngine(self.event_store)
+        self.day_activity = DayActivity(self.event_store, self.task_store)
+        self._export_queue = None  # created when notes are first opened
+        self.schedule_view = "day"  # one of VIEWS
+        self.schedule_day = datetime.now().date()  # anchor date of the view
         self.initMenu()
         self.initUI()
         self.applyTheme()  # apply day theme by default
@@ -380,6 +1347,40 @@ class PlannerWindow(QMainWindow):
         open_calendar_action = QAction("Open Calendar", self)
         open_calendar_action.triggered.connect(self.open_calendar)
         calendar_menu.addAction(open_calendar_action)
+        calendar_menu.addSeparator()
+        self.import_calendar_action = QAction("Import .ics...", self)
+        self.import_calendar_action.triggered.connect(self.import_calendar)
+        calendar_menu.addAction(self.import_calendar_action)
+        self.export_calendar_action = QAction("Export .ics...", self)
+        self.export_calendar_action.triggered.connect(self.export_calendar)
+        calendar_menu.addAction(self.export_calendar_action)
+
+        # View menu: day/week/month, paging and the visible time window
+        view_menu = menubar.addMenu("View")
+        view_group = QActionGroup(self)
+        for view in VIEWS:
+            view_action = QAction(view.capitalize(), self, checkable=True)
+            view_action.setChecked(view == self.schedule_view)
+            view_action.triggered.connect(lambda checked, v=view: self.set_schedule_view(v))
+            view_group.addAction(view_action)
+            view_menu.addAction(view_action)
+        view_menu.addSeparator()
+        for label, shortcut, direction in (("Previous", "Ctrl+Left", -1), ("Today", "Ctrl+T", 0), ("Next", "Ctrl+Right", 1)):
+            page_action = QAction(label, self)
+            page_action.setShortcut(shortcut)
+            page_action.triggered.connect(lambda checked, d=direction: self.page_schedule(d))
+            view_menu.addAction(page_action)
+        view_menu.addSeparator()
+        window_action = QAction("Time Window...", self)
+        window_action.triggered.connect(self.set_time_window)
+        view_menu.addAction(window_action)
+
+        # Notes menu
+        notes_menu = menubar.addMenu("Notes")
+        library_action = QAction("Notes Library...", self)
+        library_action.setShortcut("Ctrl+Shift+F")
+        library_action.triggered.connect(self.open_notes_library)
+        notes_menu.addAction(library_action)
 
         # Themes menu (demonstration of multiple possible themes)
         themes_menu = menubar.addMenu("Theme")
@@ -421,15 +1422,35 @@ class PlannerWindow(QMainWindow):
         self.todo_entry.returnPressed.connect(self.add_task)
         left_layout.addWidget(self.todo_entry)
 
-        # Scroll area for tasks
-        self.todo_scroll = QScrollArea()
-        self.todo_scroll.setWidgetResizable(True)
-        self.todo_container = QWidget()
-        self.todo_layout = QVBoxLayout()
-        self.todo_container.setLayout(self.todo_layout)
-        self.todo_scroll.setWidget(self.todo_container)
-
-        left_layout.addWidget(self.todo_scroll)
+        # Task list: only the visible rows are painted, whatever the task count
+        self.todo_model = TodoListModel(self.task_store, self)
+        self.todo_view = QListView()
+        self.todo_view.setModel(self.todo_model)
+        self.todo_view.setItemDelegate(TodoItemDelegate(self.todo_view))
+        self.todo_view.setFont(QFont("Helvetica", 16))
+        self.todo_view.setUniformItemSizes(True)
+        self.todo_view.setContextMenuPolicy(Qt.CustomContextMenu)
+        self.todo_view.customContextMenuRequested.connect(self.show_remove_menu)
+
+        left_layout.addWidget(self.todo_view)
+
+        # Progress of a running CSV import/export, hidden while idle
+        csv_layout = QHBoxLayout()
+        self.csv_progress = QProgressBar()
+        self.csv_progress.setRange(0, 100)
+        self.csv_cancel_btn = QPushButton("Cancel")
+        self.csv_cancel_btn.setFont(QFont("Helvetica", 14))
+        self.csv_cancel_btn.clicked.connect(self.cancel_csv_job)
+        csv_layout.addWidget(self.csv_progress)
+        csv_layout.addWidget(self.csv_cancel_btn)
+        left_layout.addLayout(csv_layout)
+        self.csv_progress.hide()
+        self.csv_cancel_btn.hide()
+        self.csv_worker = None
+
+        # Rows of a CSV being loaded are staged here and replace the list in one model reset
+        # once the whole file has been read; a cancelled or failed load leaves the list as it was
+        self.staged_tasks = None
 
         # Right side: Schedule
         right_widget = QWidget()
@@ -441,28 +1462,23 @@ class PlannerWindow(QMainWindow):
         self.schedule_label.setFont(QFont("Helvetica", 20, QFont.Bold))
         right_layout.addWidget(self.schedule_label)
 
-        # A frame where we will place the time slots and events
-        self.schedule_frame = QFrame()
-        self.schedule_frame.setMinimumHeight(500)
-        self.schedule_frame.setMinimumWidth(400)
-        self.schedule_frame.setFrameShape(QFrame.StyledPanel)
-        self.schedule_frame.setFrameShadow(QFrame.Raised)
-        right_layout.addWidget(self.schedule_frame)
-
-        # We’ll do manual painting for time slots:
-        # Alternatively, you could build a layout with many rows.
-        self.create_time_labels()
-
-        # Real-time line indicator
-        self.time_indicator = QFrame(self.schedule_frame)
-        self.time_indicator.setStyleSheet("background-color: red;")
-        self.time_indicator.setGeometry(QRect(0, 0, 400, 2))
-
-        # Timer to update line every minute
-        self.timer = QTimer()
-        self.timer.timeout.connect(self.update_time_indicator)
-        self.timer.start(60_000)  # 60 seconds
-        self.update_time_indicator()  # initial positioning
+        # Time slots, events and the current-time line are painted by one widget
+        self.schedule_widget = ScheduleView(self.schedule_engine)
+        self.schedule_widget.setMinimumHeight(500)
+        self.schedule_widget.setMinimumWidth(400)
+        self.schedule_widget.event_menu_requested.connect(self.show_event_menu)
+        right_layout.addWidget(self.schedule_widget)
+        self.render_schedule()
+
+        # One timer, re-armed for each minute boundary, drives everything that follows the
+        # clock; it starts when the window is shown and pauses while it is hidden
+        self.clock_timer = QTimer(self)
+        self.clock_timer.setSingleShot(True)
+        self.clock_timer.setTimerType(Qt.PreciseTimer)
+        self.clock = Clock(self.clock_timer.start, lambda handle: self.clock_timer.stop())
+        self.clock_timer.timeout.connect(self.clock.tick)
+        self.clock.on_day(self.day_changed)
+        self.clock.on_minute(lambda now: self.schedule_widget.update_now())
 
         # Buttons (Add Event, Open Notes, Save, Load)
         btn_layout = QHBoxLayout()
@@ -493,47 +1509,61 @@ class PlannerWindow(QMainWindow):
     def add_task(self):
         task_text = self.todo_entry.text().strip()
         if task_text:
-            # Create container widget for the task
-            container = QWidget()
-            container_layout = QHBoxLayout()
-            container.setLayout(container_layout)
-
-            # CheckBox
-            checkbox = QCheckBox(task_text)
-            checkbox.setFont(QFont("Helvetica", 16))
-            checkbox.stateChanged.connect(lambda state, cb=checkbox: self.toggle_task(cb))
-            container_layout.addWidget(checkbox)
-
-            # Right-click to remove
-            checkbox.setContextMenuPolicy(Qt.CustomContextMenu)
-            checkbox.customContextMenuRequested.connect(lambda pos, cont=container: self.show_remove_menu(pos, cont))
-
-            self.todo_layout.addWidget(container)
-            self.todo_tasks.append(container)
+            self.todo_model.add_task(task_text)
             self.todo_entry.clear()
 
-    def show_remove_menu(self, pos, container):
+    def show_remove_menu(self, pos):
+        index = self.todo_view.indexAt(pos)
+        if not index.isValid():
+            return
+        index = QPersistentModelIndex(index)
         menu = QMenu()
         remove_action = QAction("Remove Task", self)
-        remove_action.triggered.connect(lambda: self.remove_task(container))
+        remove_action.triggered.connect(lambda: self.remove_task(index.row()))
         menu.addAction(remove_action)
-        menu.exec_(container.mapToGlobal(pos))
-
-    def remove_task(self, container):
-        index = self.todo_layout.indexOf(container)
-        if index != -1:
-            widget_item = self.todo_layout.takeAt(index)
-            if widget_item is not None:
-                widget_item.widget().deleteLater()
-        if container in self.todo_tasks:
-            self.todo_tasks.remove(container)
-
-    def toggle_task(self, checkbox):
-        if checkbox.isChecked():
-            # Strikethrough style
-            checkbox.setStyleSheet("color: lightgray; text-decoration: line-through;")
-        else:
-            checkbox.setStyleSheet("")
+        menu.exec_(self.todo_view.viewport().mapToGlobal(pos))
+
+    def remove_task(self, row):
+        self.todo_model.remove_task(row)
+
+    @property
+    def export_queue(self):
+        """The PDF export queue, created with planner_export on first use rather than at startup."""
+        if self._export_queue is None:
+            self._export_queue = planner_export.ExportQueue(self.launch_export, self.export_done,
+                                                            cache=planner_export.RenderCache(), backend="qt")
+        return self._export_queue
+
+    def open_task_table(self):
+        """Restore the to-do list saved by the last session and store every change to it as it happens."""
+        try:
+            return TaskTable(self.task_store, self.writer)
+        except (OSError, ValueError, KeyError, sqlite3.Error) as e:
+            # Leave the damaged data alone rather than overwrite it with an empty list
+            self.task_store.clear()
+            QMessageBox.warning(self, "Error", f"Could not restore the saved to-do list: {e}")
+            return None
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.clock.start()  # catches up at once on a minute or day missed while hidden
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self.clock.pause()
+
+    def changeEvent(self, event):
+        super().changeEvent(event)
+        if event.type() == QEvent.WindowStateChange:
+            if self.isMinimized():
+                self.clock.pause()
+            elif self.isVisible():
+                self.clock.start()
+
+    def closeEvent(self, event):
+        # Let queued writes (task changes, note autosaves) reach the disk before exiting
+        self.writer.close()
+        super().closeEvent(event)
 
     # ----------------------------- Save/Load Data (CSV) -----------------------------#
     @pyqtSlot()
@@ -542,16 +1572,8 @@ class PlannerWindow(QMainWindow):
         if not file_path:
             return
 
-        with open(file_path, 'w', newline='', encoding='utf-8') as file:
-            writer = csv.writer(file)
-            writer.writerow(["Completed", "Task"])
-            # Go through each task container
-            for container in self.todo_tasks:
-                checkbox = container.findChild(QCheckBox)
-                completed = "Yes" if checkbox.isChecked() else "No"
-                writer.writerow([completed, checkbox.text()])
-
-        QMessageBox.information(self, "Success", f"To-Do List saved to {file_path}")
+        # The worker writes a snapshot, so edits made during the export are not half-saved
+        self.start_csv_job(CsvTaskWorker(file_path, self.task_store.snapshot(), self))
 
     @pyqtSlot()
     def load_data(self):
@@ -559,190 +1581,247 @@ class PlannerWindow(QMainWindow):
         if not file_path:
             return
 
-        # Clear existing tasks
-        for container in self.todo_tasks:
-            container.setParent(None)
-            container.deleteLater()
-        self.todo_tasks.clear()
+        self.staged_tasks = []
+        worker = CsvTaskWorker(file_path, parent=self)
+        worker.batch_ready.connect(self.staged_tasks.extend)
+        self.start_csv_job(worker)
 
-        with open(file_path, 'r', encoding='utf-8') as file:
-            reader = csv.reader(file)
-            next(reader, None)  # Skip header
-            for row in reader:
-                completed_str, task_text = row
-                completed = (completed_str.strip().lower() == "yes")
+    def set_csv_controls(self, enabled):
+        """Enable or disable everything that starts a CSV or .ics job, so only one job runs at a time."""
+        for control in (self.save_btn, self.load_btn, self.import_calendar_action, self.export_calendar_action):
+            control.setEnabled(enabled)
 
-                container = QWidget()
-                container_layout = QHBoxLayout()
-                container.setLayout(container_layout)
+    def start_csv_job(self, worker):
+        if self.csv_worker is not None:
+            worker.deleteLater()
+            return
+        self.csv_worker = worker
+        worker.progress.connect(self.csv_progress.setValue)
+        worker.failed.connect(lambda message: QMessageBox.warning(self, "Error", message))
+        worker.finished.connect(self.csv_job_finished)
+
+        self.set_csv_controls(False)
+        self.csv_progress.setValue(0)
+        self.csv_progress.show()
+        self.csv_cancel_btn.show()
+        worker.start()
 
-                checkbox = QCheckBox(task_text)
-                checkbox.setFont(QFont("Helvetica", 16))
-                checkbox.setChecked(completed)
-                checkbox.stateChanged.connect(lambda state, cb=checkbox: self.toggle_task(cb))
-                if completed:
-                    checkbox.setStyleSheet("color: lightgray; text-decoration: line-through;")
+    @pyqtSlot()
+    def cancel_csv_job(self):
+        if self.csv_worker is not None:
+            self.csv_worker.requestInterruption()
 
-                # Right-click
-                checkbox.setContextMenuPolicy(Qt.CustomContextMenu)
-                checkbox.customContextMenuRequested.connect(lambda pos, cont=container: self.show_remove_menu(pos, cont))
+    @pyqtSlot()
+    def csv_job_finished(self):
+        worker = self.sender()
+        if worker is self.csv_worker:
+            self.csv_worker = None
+        worker.deleteLater()
+        staged, self.staged_tasks = self.staged_tasks, None
+
+        self.set_csv_controls(True)
+        self.csv_progress.hide()
+        self.csv_cancel_btn.hide()
+
+        if worker.cancelled or worker.error is not None or self.csv_progress.value() < 100:
+            return
+        if staged is not None:
+            self.todo_model.set_tasks(staged)
+        if worker.tasks is None:
+            self.statusBar().showMessage(worker.loaded_message, 5000)
+        else:
+            self.statusBar().showMessage(worker.saved_message.format(worker.file_path), 5000)
 
-                container_layout.addWidget(checkbox)
+    @pyqtSlot()
+    def import_calendar(self):
+        file_path, _ = QFileDialog.getOpenFileName(self, "Import Calendar", "", "iCalendar Files (*.ics)")
+        if not file_path:
+            return
 
-                self.todo_layout.addWidget(container)
-                self.todo_tasks.append(container)
+        # Events join the store batch by batch, one transaction per batch
+        worker = IcsWorker(file_path, parent=self)
+        worker.batch_ready.connect(self.event_store.extend)
+        self.start_csv_job(worker)
 
-        QMessageBox.information(self, "Success", "To-Do List loaded successfully!")
+    @pyqtSlot()
+    def export_calendar(self):
+        file_path, _ = QFileDialog.getSaveFileName(self, "Export Calendar", "", "iCalendar Files (*.ics)")
+        if file_path:
+            self.start_csv_job(IcsWorker(file_path, self.event_store.snapshot(), self))
 
     # ----------------------------- Schedule & Events -----------------------------#
-    def create_time_labels(self):
-        """
-        Create the "time-slot" labels from 8AM to 8PM and place them in the schedule_frame.
-        We'll do manual geometry for demonstration (similar to Tkinter's place).
-        """
-        start_hour = 8
-        end_hour = 20
-        num_hours = end_hour - start_hour
-        frame_height = 500
-        slot_height = frame_height / num_hours
-        frame_width = self.schedule_frame.width()
-
-        for i in range(num_hours):
-            hour = start_hour + i
-            label_text = ""
-            if hour < 12:
-                label_text = f"{hour}:00 AM"
-            elif hour == 12:
-                label_text = "12:00 PM"
-            else:
-                label_text = f"{hour - 12}:00 PM"
+    def render_schedule(self):
+        """Show the current view; the ScheduleView repaints from the engine's cached layouts."""
+        self.schedule_label.setText(f"Schedule - {self.schedule_engine.title(self.schedule_view, self.schedule_day)}")
+        self.schedule_widget.set_view(self.schedule_view, self.schedule_day)
+
+    def set_schedule_view(self, view):
+        self.schedule_view = view
+        self.render_schedule()
+
+    def page_schedule(self, direction):
+        """Move the view one day/week/month back or forward, or back to today for 0."""
+        if direction:
+            self.schedule_day = self.schedule_engine.step(self.schedule_view, self.schedule_day, direction)
+        else:
+            self.schedule_day = datetime.now().date()
+        self.render_schedule()
 
-            lbl = QLabel(label_text, self.schedule_frame)
-            lbl.setFont(QFont("Arial", 14))
-            lbl.setFrameStyle(QLabel.Box | QLabel.Plain)
-            # Place it
-            lbl.setGeometry(0, int(i * slot_height), int(frame_width * 0.35), int(slot_height))
+    def set_time_window(self):
+        engine = self.schedule_engine
+        start, ok = QInputDialog.getInt(self, "Time Window", "First hour (0-23):", engine.start_hour, 0, 23)
+        if not ok:
+            return
+        end, ok = QInputDialog.getInt(self, "Time Window", "Last hour (1-24):", max(engine.end_hour, start + 1), start + 1, 24)
+        if not ok:
+            return
+        engine.set_window(start, end)
+        self.render_schedule()
 
     def add_event(self):
-        dialog = AddEventDialog(self)
+        hours = range(self.schedule_engine.start_hour, self.schedule_engine.end_hour)
+        dialog = AddEventDialog(self.event_store, self.schedule_day, hours, self)
         if dialog.exec_() == QDialog.Accepted:
             data = dialog.event_data
-            self.place_event(data)
-
-    def place_event(self, data):
-        """
-        Place an event label within the schedule frame based on start_idx and end_idx,
-        which are fractional positions in [0..12].
-        """
-        start_idx = data["start_idx"]
-        end_idx = data["end_idx"]
-        title = data["title"]
-        color = data["color"]
-
-        # The schedule covers 8AM->8PM => 12 hours
-        # schedule_frame height is ~500 by default
-        total_hours = 12.0
-        frame_height = self.schedule_frame.height()
-        # x, width
-        x = int(self.schedule_frame.width() * 0.35)
-        w = int(self.schedule_frame.width() * 0.60)
-        # y positions
-        y_start = int((start_idx / total_hours) * frame_height)
-        y_end = int((end_idx / total_hours) * frame_height)
-
-        event_label = QLabel(title, self.schedule_frame)
-        event_label.setStyleSheet(f"background-color: {color}; border: 1px solid black;")
-        event_label.setFont(QFont("Helvetica", 14))
-        event_label.setAlignment(Qt.AlignCenter)
-        event_label.setGeometry(x, y_start, w, y_end - y_start)
-        event_label.show()
-
-    def update_time_indicator(self):
-        """
-        Similar to the Tkinter version, place a line to indicate the current time.
-        Hide it if outside 8AM -> 8PM.
-        """
-        now = datetime.now()
-        hour = now.hour
-        minute = now.minute
-
-        if 8 <= hour < 20:
-            # total = 12 hours from 8 -> 20
-            total_hours = 12
-            frame_height = self.schedule_frame.height()
-            # fraction of day so far
-            offset = (hour - 8) + minute/60
-            rel_pos = offset / total_hours  # 0..1
-            y = int(rel_pos * frame_height)
-            self.time_indicator.setGeometry(0, y, self.schedule_frame.width(), 2)
-            self.time_indicator.show()
+            # The schedule view repaints itself when the store reports the new event
+            if data["repeat"]:
+                self.event_store.add_rule(data["title"], data["start"], data["end"], data["color"], **data["repeat"])
+            else:
+                self.event_store.add(data["title"], data["start"], data["end"], data["color"])
+
+    def show_event_menu(self, event_id, global_pos):
+        menu = QMenu()
+        rule = self.event_store.rule_of(event_id)
+        if rule is None:
+            remove_action = QAction("Remove Event", self)
+            remove_action.triggered.connect(lambda: self.remove_event(event_id))
+            menu.addAction(remove_action)
         else:
-            self.time_indicator.hide()
+            skip_action = QAction("Remove This Occurrence", self)
+            skip_action.triggered.connect(lambda: self.event_store.skip_occurrence(event_id))
+            menu.addAction(skip_action)
+            remove_action = QAction("Remove All Occurrences", self)
+            remove_action.triggered.connect(lambda: self.remove_event(rule.id))
+            menu.addAction(remove_action)
+        menu.exec_(global_pos)
+
+    def remove_event(self, event_id):
+        self.event_store.remove(event_id)
+
+    def day_changed(self, previous, today):
+        """At midnight: new header date, and a view that was showing today moves on with it."""
+        self.header_label.setText(today.strftime("%B %d, %Y | %A"))
+        if previous is not None and self.schedule_day == previous:
+            self.schedule_day = today
+            self.render_schedule()
 
     # ----------------------------- Notes -----------------------------#
     def open_notes_window(self):
-        dialog = NotesDialog(self)
+        dialog = NotesDialog(self.export_queue, self.writer, self)
+        dialog.exec_()
+
+    def open_notes_library(self):
+        dialog = NotesLibraryDialog(self.export_queue, self.writer, self)
         dialog.exec_()
 
+    def launch_export(self, job):
+        """Start one conversion; pandoc runs as a QProcess and the event loop reports when it exits."""
+        if job.backend == "qt":
+            # The in-process render is fast; run it on the next event-loop turn so saving returns first
+            QTimer.singleShot(0, lambda: self.render_export(job))
+            return
+        process = QProcess(self)
+        process.finished.connect(lambda code, status: self.export_process_done(job, process))
+        process.errorOccurred.connect(lambda error: self.export_process_failed(job, process, error))
+        process.start(job.command[0], job.command[1:])
+
+    def render_export(self, job):
+        try:
+            render_pdf(job.source, job.target)
+            error = None
+        except (OSError, UnicodeDecodeError) as e:
+            error = str(e)
+        self.export_queue.finished(job, error)
+
+    def export_process_done(self, job, process):
+        error = None
+        if process.exitStatus() != QProcess.NormalExit or process.exitCode() != 0:
+            error = bytes(process.readAllStandardError()).decode(errors="replace").strip() or process.errorString()
+        process.deleteLater()
+        self.export_queue.finished(job, error)
+
+    def export_process_failed(self, job, process, error):
+        # A process that never started emits no finished signal
+        if error == QProcess.FailedToStart:
+            message = process.errorString()
+            process.deleteLater()
+            self.export_queue.finished(job, message)
+
+    def export_done(self, job, error):
+        if error is None:
+            reused = " (unchanged, reused cached render)" if job.cached else ""
+            self.statusBar().showMessage(f"PDF saved at {job.target}{reused} | {self.export_queue.cache.summary()}", 5000)
+        else:
+            self.statusBar().showMessage(f"Failed to convert {os.path.basename(job.source)} to PDF: {error}", 10000)
+
     # ----------------------------- Calendar -----------------------------#
     def open_calendar(self):
-        dialog = CalendarDialog(self)
+        dialog = CalendarDialog(self.day_activity, self)
+        dialog.day_selected.connect(self.show_day)
         dialog.exec_()
 
+    def show_day(self, day):
+        """Move the schedule to a day picked in the calendar, keeping the current view."""
+        self.schedule_day = day
+        self.render_schedule()
+
     # ----------------------------- Toggle Theme -----------------------------#
     def toggle_theme(self):
         self.isNightMode = not self.isNightMode
         self.applyTheme()
 
     def applyTheme(self):
-        if self.isNightMode:
-            univ_bg = self.univ_bg_night
-            text_color = self.text_color_night
-            schedule_color = self.schedule_color_night
-            button_color = self.button_color_night
-        else:
-            univ_bg = self.univ_bg_day
-            text_color = self.text_color_day
-            schedule_color = self.schedule_color_day
-            button_color = self.button_color_day
-
-        # Build a style sheet
-        self.setStyleSheet(f"""
-            QMainWindow {{
-                background-color: {univ_bg};
-            }}
-            QWidget {{
-                background-color: {univ_bg};
-                color: {text_color};
-            }}
-            QLineEdit, QTextEdit, QComboBox, QSpinBox {{
-                background-color: white;
-                color: black;
-            }}
-            QPushButton {{
-                background-color: {button_color};
-                color: {text_color};
-            }}
-            QCheckBox {{
-                color: {text_color};
-            }}
-            QLabel {{
-                color: {text_color};
-            }}
-        """)
-
-        # For the schedule slots, we could do something more targeted:
-        # Find all children in schedule_frame that are "hour labels"
-        for child in self.schedule_frame.children():
-            if isinstance(child, QLabel):
-                child.setStyleSheet(f"background-color: {schedule_color}; color: {text_color};")
+        theme = THEMES["night" if self.isNightMode else "day"]
+        # No style sheets: a palette change is propagated without re-polishing every widget
+        QApplication.setPalette(self.palettes[theme.name])
+
+        # The schedule paints itself; its cached layer is re-rendered once with the new colours
+        self.schedule_widget.set_colors(theme.bg, theme.slot, theme.text)
 
 
 # ----------------------------- Run Application -----------------------------#
+class FirstFrameProbe(QObject):
+    """
+    Used by startup_benchmark.py: prints the time once the first frame has been painted,
+    then quits. The window is painted in one pass, so the first paint event only has to
+    be followed by one turn of the event loop.
+    """
+    def __init__(self, app, window):
+        super().__init__(app)  # owned by the application, so it lives until exit
+        self.app = app
+        self.window = window
+        self.seen = False
+        app.installEventFilter(self)
+
+    def eventFilter(self, obj, event):
+        if not self.seen and event.type() == QEvent.Paint:
+            self.seen = True
+            QTimer.singleShot(0, self.report)
+        return False
+
+    def report(self):
+        print(f"first-frame {time.time():.6f}", flush=True)
+        self.window.close()
+        self.app.quit()
+
+
 def main():
     app = QApplication(sys.argv)
+    app.setStyle("Fusion")  # draws every widget from the palette, so themes look the same on all platforms
     window = PlannerWindow()
     window.show()
+    if os.environ.get("PLANNER_BENCHMARK"):
+        FirstFrameProbe(app, window)
     sys.exit(app.exec_())
 
 
@@ -11,39 +11,336 @@ https://creativecommons.org/licenses/by-nc/4.0/
 """
 
 import tkinter as tk
-from ttkthemes import ThemedTk
 from tkinter import ttk, simpledialog, messagebox, filedialog
 from datetime import datetime
-import subprocess
 import calendar
-import json
 import os
-import re
 import csv
+import queue
+import sqlite3
+import threading
+import time
+
+from planner_core import (
+    FREQUENCIES, TaskTable, TaskStore, EventStore, WriteBehind, at_time, lazy_import, read_tasks_csv, write_tasks_csv
+)
+from planner_calendar import GRID_WEEKS, HEAT_COLORS, DayActivity, heat_level, page_days, step_month
+from planner_clock import Clock
+from planner_schedule import RELAYOUT_INTERVAL_MS, VIEWS, ScheduleEngine
+from planner_theme import DEFAULT_THEME, THEMES, tk_options
+
+# Only needed once a calendar file, note or PDF export is used; loaded on first attribute access
+subprocess = lazy_import("subprocess")
+planner_export = lazy_import("planner_export")
+planner_ical = lazy_import("planner_ical")
+planner_notes = lazy_import("planner_notes")
+
+
+class TodoCanvas:
+    """
+    Windowed to-do list drawn on a single canvas.
+    Only the rows that fit in the window are drawn, using a fixed pool of canvas items
+    that is re-labelled as the list scrolls, so the cost does not grow with the task count.
+    Rows are read from the shared TaskStore.
+    """
+    row_height = 36
+    font = ("Helvetica", 20)
+    done_font = ("Helvetica", 20, "overstrike")
+
+    def __init__(self, parent, store, bg, fg):
+        self.store = store
+        self.bg = bg
+        self.fg = fg
+        self.first = 0  # index of the task drawn in the top row
+        self.slots = []  # (box, mark, label) canvas items, one per visible row
+
+        self.scrollbar = tk.Scrollbar(parent, orient="vertical", command=self.yview)
+        self.scrollbar.pack(side="right", fill="y")
+        self.canvas = tk.Canvas(parent, bg=bg, highlightthickness=0)
+        self.canvas.pack(side="left", fill="both", expand=True)
+
+        self.canvas.bind("<Configure>", lambda e: self.redraw())
+        self.canvas.bind("<Button-1>", self.on_click)
+        self.canvas.bind("<Button-3>", self.on_right_click)
+        self.canvas.bind("<MouseWheel>", lambda e: self.yview("scroll", -1 if e.delta > 0 else 1, "units"))
+        self.canvas.bind("<Button-4>", lambda e: self.yview("scroll", -1, "units"))
+        self.canvas.bind("<Button-5>", lambda e: self.yview("scroll", 1, "units"))
+
+    def visible_rows(self):
+        return max(1, self.canvas.winfo_height() // self.row_height)
+
+    def row_at(self, y):
+        row = self.first + int(y) // self.row_height
+        return row if row < len(self.store) else None
+
+    def _ensure_slots(self):
+        # One extra slot covers a partially visible row at the bottom
+        needed = self.visible_rows() + 1
+        while len(self.slots) < needed:
+            y = len(self.slots) * self.row_height
+            box = self.canvas.create_rectangle(8, y + 8, 28, y + 28, outline=self.fg)
+            mark = self.canvas.create_text(18, y + 18, text="", fill=self.fg, font=("Helvetica", 14))
+            label = self.canvas.create_text(38, y + 18, text="", anchor="w", fill=self.fg, font=self.font)
+            self.slots.append((box, mark, label))
+
+    def redraw(self):
+        self._ensure_slots()
+        total = len(self.store)
+        self.first = max(0, min(self.first, total - self.visible_rows()))
+
+        for i, (box, mark, label) in enumerate(self.slots):
+            row = self.first + i
+            if row < total:
+                task = self.store.at(row)
+                self.canvas.itemconfigure(box, state="normal", outline=self.fg)
+                self.canvas.itemconfigure(mark, state="normal", text="✔" if task.completed else "", fill=self.fg)
+                self.canvas.itemconfigure(label, state="normal", text=task.text,
+                                          fill="lightgray" if task.completed else self.fg,
+                                          font=self.done_font if task.completed else self.font)
+            else:
+                for item in (box, mark, label):
+                    self.canvas.itemconfigure(item, state="hidden")
+
+        if total:
+            self.scrollbar.set(self.first / total, min(1.0, (self.first + self.visible_rows()) / total))
+        else:
+            self.scrollbar.set(0, 1)
+
+    def yview(self, *args):
+        """Scrollbar and mouse wheel callback, in the same form as tk.Canvas.yview."""
+        if args[0] == "moveto":
+            self.first = int(float(args[1]) * len(self.store))
+        elif args[0] == "scroll":
+            step = self.visible_rows() if args[2] == "pages" else 1
+            self.first += int(args[1]) * step
+        self.redraw()
+
+    def see(self, row):
+        """Scroll just enough to bring a row into view."""
+        if row < self.first:
+            self.first = row
+        elif row >= self.first + self.visible_rows():
+            self.first = row - self.visible_rows() + 1
+        self.redraw()
+
+    def set_colors(self, bg, fg):
+        self.bg = bg
+        self.fg = fg
+        self.canvas.configure(bg=bg)
+        self.redraw()
+
+    def on_click(self, event):
+        row = self.row_at(event.y)
+        if row is not None:
+            toggle_task(self.store.at(row).id)
+
+    def on_right_click(self, event):
+        row = self.row_at(event.y)
+        if row is not None:
+            show_remove_menu(event, self.store.at(row).id)
+
+
+class PagedText:
+    """
+    Editor for a MappedNote in a tk.Text that holds one page of PAGE_LINES lines. The
+    scrollbar spans the whole note, and scrolling near either edge of the page swaps in
+    the page around the new position. Each edit replaces the page's lines in the note
+    and calls on_edit().
+    """
+
+    def __init__(self, parent, font, on_edit=None):
+        self.note = None
+        self.on_edit = on_edit
+        self.page_first = 0  # line number of the first line in the text widget
+        self.page_lines = 0
+        self.scrollbar = tk.Scrollbar(parent, orient="vertical", width=20, command=self.yview)
+        self.text = tk.Text(parent, font=font, wrap="none", yscrollcommand=self.page_scrolled)
+        self.text.bind("<<Modified>>", self.page_edited)
+
+    def pack(self):
+        self.scrollbar.pack(side="right", fill="y")
+        self.text.pack(side="left", expand=True, fill="both")
+
+    def pack_forget(self):
+        self.scrollbar.pack_forget()
+        self.text.pack_forget()
+
+    def set_note(self, note):
+        """Show a MappedNote (closing the previous one), or nothing for None."""
+        if self.note is not None:
+            self.note.close()
+        self.note = note
+        self.page_first = self.page_lines = 0
+        self.text.delete("1.0", tk.END)
+        self.text.edit_modified(False)
+        if note is not None:
+            self._load_page(0)
+
+    def _load_page(self, first):
+        self.page_first = first
+        self.page_lines = min(planner_notes.PAGE_LINES, len(self.note) - first)
+        self.text.delete("1.0", tk.END)
+        self.text.insert("1.0", self.note.lines(first, first + planner_notes.PAGE_LINES))
+        self.text.edit_modified(False)  # loading a page is not an edit
+
+    def page_edited(self, event=None):
+        # <<Modified>> fires when the flag changes; clearing it re-arms the event for the next edit
+        if self.note is None or not self.text.edit_modified():
+            return
+        self.text.edit_modified(False)
+        self.page_lines = self.note.replace(self.page_first, self.page_first + self.page_lines,
+                                            self.text.get("1.0", "end-1c"))
+        if self.on_edit is not None:
+            self.on_edit()
+
+    def _line_at(self, y):
+        return int(self.text.index(f"@0,{y}").split(".")[0]) - 1
+
+    def visible_lines(self):
+        return self._line_at(self.text.winfo_height()) - self._line_at(0) + 1
+
+    def top_line(self):
+        return self.page_first + self._line_at(0)
+
+    def _near_edge(self, line):
+        # Keep a screenful of loaded lines beyond the view, so wheel scrolling can reach the edge
+        visible = self.visible_lines()
+        page_end = self.page_first + self.page_lines
+        return ((line - visible < self.page_first and self.page_first > 0)
+                or (line + 2 * visible > page_end and page_end < len(self.note)))
+
+    def scroll_to(self, line):
+        line = max(0, min(line, len(self.note) - 1))
+        if self._near_edge(line):
+            page_lines = planner_notes.PAGE_LINES
+            self._load_page(max(0, min(line - page_lines // 2, len(self.note) - page_lines)))
+        self.text.yview(f"{line - self.page_first + 1}.0")
+
+    def yview(self, *args):
+        """Scrollbar callback, with positions as fractions of the whole note."""
+        if self.note is None:
+            return
+        if args[0] == "moveto":
+            self.scroll_to(int(float(args[1]) * len(self.note)))
+        elif args[0] == "scroll":
+            step = self.visible_lines() if args[2] == "pages" else 1
+            self.scroll_to(self.top_line() + int(args[1]) * step)
+
+    def page_scrolled(self, first, last):
+        """yscrollcommand of the text: map fractions of the page onto the whole note."""
+        if self.note is None:
+            self.scrollbar.set(first, last)
+            return
+        total = len(self.note)
+        self.scrollbar.set((self.page_first + float(first) * self.page_lines) / total,
+                           (self.page_first + float(last) * self.page_lines) / total)
+        # Wheel and keyboard scrolling move the page itself; swap pages once they near its edge
+        top = self.top_line()
+        if self._near_edge(top):
+            self.text.after_idle(lambda: self.scroll_to(top))
+
+
+class MarkdownHighlighter:
+    """
+    Markdown colouring for a tk.Text, updated incrementally.
+
+    The widget's insert and delete commands are redirected (the way IDLE's colorizer
+    does it) to note which lines each edit touched. On idle only those lines are
+    re-tagged, continuing past them only while a line's end state (inside a code fence
+    or not) changes. That state is kept as a tag on each line's newline, so it moves
+    with the text as lines are inserted and deleted above it.
+    """
+    def __init__(self, text, family, size):
+        self.text = text
+        self.kinds = tuple(planner_notes.MARKDOWN_STYLES)
+        self.enabled = True
+        self.dirty = None  # (first, last) lines waiting to be re-tagged
+        self.pending = None  # after_idle id
+        self._orig = text._w + "_orig"
+        text.tk.call("rename", text._w, self._orig)
+        text.tk.createcommand(text._w, self._dispatch)
+        text.bind("<Destroy>", self._destroyed, add="+")
+
+        for kind, style in planner_notes.MARKDOWN_STYLES.items():
+            weight = "bold" if style.get("bold") else "normal"
+            slant = "italic" if style.get("italic") else "roman"
+            font = ("Courier" if style.get("monospace") else family, size, weight, slant)
+            text.tag_configure("md_" + kind, font=font, foreground=style.get("color", ""),
+                               underline=style.get("underline", False))
+
+    def _call(self, *args):
+        return self.text.tk.call(self._orig, *args)
+
+    def _line(self, index):
+        return int(str(self._call("index", index)).split(".")[0])
+
+    def _dispatch(self, operation, *args):
+        if not self.enabled or operation not in ("insert", "delete", "replace"):
+            return self._call(operation, *args)
+        first = self._line(args[0])
+        result = self._call(operation, *args)
+        # Inserted text is every other argument after the index (text, tags, text, tags, ...)
+        inserted = args[1::2] if operation == "insert" else args[2::2] if operation == "replace" else ()
+        last = first + sum(str(chars).count("\n") for chars in inserted)
+        if self.dirty is not None:
+            first, last = min(first, self.dirty[0]), max(last, self.dirty[1])
+        self.dirty = (first, last)
+        if self.pending is None:
+            self.pending = self.text.after_idle(self.highlight)
+        return result
+
+    def _destroyed(self, event):
+        if event.widget is self.text:
+            if self.pending is not None:
+                self.text.after_cancel(self.pending)
+            self.text.tk.deletecommand(self.text._w)
+
+    def _state_after(self, line):
+        for tag in self.text.tk.splitlist(self._call("tag", "names", f"{line}.end")):
+            if tag.startswith("md_state"):
+                return int(tag[8:])
+        return planner_notes.STATE_TEXT
+
+    def highlight(self):
+        self.pending = None
+        if self.dirty is None:
+            return
+        (line, last), self.dirty = self.dirty, None
+        end = self._line("end-1c")
+        state = self._state_after(line - 1) if line > 1 else planner_notes.STATE_TEXT
+        while line <= end:
+            spans, new_state = planner_notes.markdown_spans(self._call("get", f"{line}.0", f"{line}.end"), state)
+            old_state = self._state_after(line)
+            for kind in self.kinds:
+                self._call("tag", "remove", "md_" + kind, f"{line}.0", f"{line}.end")
+            for start, length, kind in spans:
+                self._call("tag", "add", "md_" + kind, f"{line}.{start}", f"{line}.{start + length}")
+            if new_state != old_state:
+                self._call("tag", "remove", f"md_state{old_state}", f"{line}.end")
+                if new_state != planner_notes.STATE_TEXT:
+                    self._call("tag", "add", f"md_state{new_state}", f"{line}.end")
+            elif line >= last:
+                break  # the lines below start in the same state as before
+            state = new_state
+            line += 1
+
+    def rehighlight(self):
+        """Re-tag the whole text, e.g. after highlighting was re-enabled."""
+        self.dirty = (1, self._line("end-1c"))
+        self.highlight()
 
 
 # Function to add task to todo list
 def add_task(event=None):
     task_text = todo_entry.get().strip()
     if task_text:
-        task_var = tk.StringVar(value=task_text)
-        task_frame = tk.Frame(todo_frame, bg = univ_bg)
-        task_frame.pack(anchor="w", pady = 2, fill ="x")
-
-        completed_var = tk.IntVar(value = 0)
-        task_checkbox = tk.Checkbutton(task_frame, text=task_text, 
-                                        variable=completed_var, font=("Helvetica", 20), 
-                                       command=lambda: toggle_task(task_var, completed_var, task_checkbox))
-        task_checkbox.configure(bg = univ_bg)
-        task_checkbox.pack(anchor='w', pady=2)
-        #task_checkbox.pack(side = "left", padx = 5, fill = "x", expand = True)
-        task_checkbox.bind("<Button-3>", lambda e: show_remove_menu(e,task_frame, task_var))
-        todo_tasks.append((task_var, task_frame, completed_var))
+        task_store.add(task_text)
+        todo_view.see(len(task_store) - 1)
         todo_entry.delete(0, tk.END)
 
-def show_remove_menu(event, task_frame, task_var):
+def show_remove_menu(event, task_id):
     remove_menu = tk.Menu(root, tearoff = 0)
-    remove_menu.add_command(label="Remove Task", command=lambda: remove_task(task_frame, task_var))
+    remove_menu.add_command(label="Remove Task", command=lambda: remove_task(task_id))
     remove_menu.post(event.x_root, event.y_root)
     root.bind("<Button-1>", lambda event: close_menu(event, remove_menu))
 
@@ -52,95 +349,294 @@ def close_menu(event, menu):
     root.unbind("<Button-1>")
 
 # Function to remove a task
-def remove_task(task_frame, task_var):
-    for task in todo_tasks:
-        if task[0] == task_var:
-            task[1].destroy()  # Remove the whole frame (task + button)
-            todo_tasks.remove(task)
-            break
+def remove_task(task_id):
+    if task_id in task_store:
+        task_store.remove(task_id)
+        todo_view.redraw()
 
 
 # Function to toggle task completion (strike-through effect)
-def toggle_task(task_var, completed_var, checkbox,):
-    if completed_var.get():
-        checkbox.config(fg="lightgray", font=("Helvetica", 20, "overstrike"))
-        #task_var.set(f"{task_var.get()}")
+def toggle_task(task_id):
+    task_store.toggle(task_id)
+    todo_view.redraw()
+
+
+# State of the running CSV or .ics import/export, if any
+csv_job = {}
+
+
+def csv_import_worker(file_path, results, cancel):
+    """Parse the CSV in a background thread and queue the tasks in batches."""
+    for batch, percent in read_tasks_csv(file_path):
+        if cancel.is_set():
+            return
+        results.put(("batch", batch))
+        results.put(("progress", percent))
+
+
+def csv_export_worker(file_path, tasks, results, cancel):
+    """Write a snapshot of the tasks in a background thread, replacing the file only when complete."""
+    writer = write_tasks_csv(file_path, tasks)
+    for percent in writer:
+        if cancel.is_set():
+            writer.close()  # discards the partial file
+            return
+        results.put(("progress", percent))
+
+
+def ics_import_worker(file_path, results, cancel):
+    """Parse an .ics calendar in a background thread and queue its events in batches."""
+    for batch, percent in planner_ical.read_ics(file_path):
+        if cancel.is_set():
+            return
+        results.put(("events", batch))
+        results.put(("progress", percent))
+
+
+def ics_export_worker(file_path, items, results, cancel):
+    """Write a snapshot of the events in a background thread, replacing the file only when complete."""
+    writer = planner_ical.write_ics(file_path, items)
+    for percent in writer:
+        if cancel.is_set():
+            writer.close()  # discards the partial file
+            return
+        results.put(("progress", percent))
+
+
+def run_csv_worker(worker, results, *args):
+    try:
+        worker(*args)
+    except (OSError, ValueError, csv.Error, UnicodeDecodeError) as e:
+        results.put(("error", str(e)))
+    results.put(("done", None))
+
+
+def set_csv_controls(state):
+    """Enable or disable everything that starts a CSV or .ics job, so only one job runs at a time."""
+    save_btn.configure(state=state)
+    load_btn.configure(state=state)
+    for label in ("Import .ics...", "Export .ics..."):
+        calendar_menu.entryconfigure(label, state=state)
+
+
+def start_csv_job(worker, message, *args, staged=None):
+    """Run a job in a background thread; a CSV load passes the list its rows are staged in."""
+    if csv_job:
+        return  # one job at a time: they share the progress bar and this state
+    results = queue.Queue()
+    cancel = threading.Event()
+    csv_job.update(results=results, cancel=cancel, message=message, progress=0)
+    if staged is not None:
+        csv_job["staged"] = staged
+
+    set_csv_controls("disabled")
+    csv_progress["value"] = 0
+    csv_frame.pack(fill="x", pady=5)
+
+    threading.Thread(target=run_csv_worker, args=(worker, results) + args + (results, cancel), daemon=True).start()
+    root.after(50, poll_csv_job)
+
+
+def poll_csv_job():
+    """Drain the worker queue on the Tk thread, redrawing the schedule once per poll while events arrive."""
+    results = csv_job["results"]
+    done = False
+    try:
+        while not done:
+            kind, value = results.get_nowait()
+            if kind == "batch":
+                csv_job["staged"].extend(value)
+            elif kind == "events":
+                event_store.extend(value)
+                csv_job["events"] = True
+            elif kind == "progress":
+                csv_job["progress"] = value
+            elif kind == "error":
+                csv_job["failed"] = True
+                messagebox.showerror("Error", value)
+            else:
+                done = True
+    except queue.Empty:
+        pass
+
+    if csv_job.get("events"):
+        render_schedule()
+    csv_progress["value"] = csv_job["progress"]
+    if not done:
+        root.after(50, poll_csv_job)
+        return
+
+    csv_frame.pack_forget()
+    set_csv_controls("normal")
+    if csv_job["progress"] == 100 and not csv_job["cancel"].is_set() and not csv_job.get("failed"):
+        if "staged" in csv_job:
+            # The loaded file replaces the list only now, so a failed load keeps the saved one
+            task_store.replace(csv_job["staged"])
+            todo_view.first = 0
+            todo_view.redraw()
+        messagebox.showinfo("Success", csv_job["message"])
+    csv_job.clear()
+
+
+def cancel_csv_job():
+    if csv_job:
+        csv_job["cancel"].set()
+
+
+# Results of pandoc conversions finished by worker threads, drained on the Tk thread
+export_results = queue.Queue()
+export_poll = None  # pending after() id while conversions are running
+
+
+def run_export(job):
+    try:
+        subprocess.run(job.command, check=True, capture_output=True)
+        error = None
+    except subprocess.CalledProcessError as e:
+        error = e.stderr.decode(errors="replace").strip() or str(e)
+    except OSError as e:
+        error = str(e)
+    export_results.put((job, error))
+
+
+def launch_export(job):
+    global export_poll
+    threading.Thread(target=run_export, args=(job,), daemon=True).start()
+    if export_poll is None:
+        export_poll = root.after(200, poll_exports)
+
+
+def poll_exports():
+    global export_poll
+    try:
+        while True:
+            job, error = export_results.get_nowait()
+            export_queue.finished(job, error)
+    except queue.Empty:
+        pass
+    export_poll = root.after(200, poll_exports) if export_queue else None
+
+
+def export_done(job, error):
+    if error is None:
+        reused = " (unchanged, reused cached render)" if job.cached else ""
+        show_status(f"PDF saved at {job.target}{reused} | {export_queue.cache.summary()}")
     else:
-        checkbox.config(fg="black", font=("Helvetica", 20, "normal"))
-        #task_var.set(task_var.get().replace("✔ ", ""))
+        show_status(f"Failed to convert {os.path.basename(job.source)} to PDF: {error}", 10000)
+
+
+export_queue = None  # created by the first PDF export
+
+
+def submit_export(file_path):
+    """Queue the PDF conversion of a note, starting the export queue on first use."""
+    global export_queue
+    if export_queue is None:
+        export_queue = planner_export.ExportQueue(launch_export, export_done, cache=planner_export.RenderCache())
+    export_queue.submit(file_path)
+
+# Pending after() id that clears the status line
+status_clear = None
+
+
+def show_status(message, timeout=5000):
+    """Show a message in the status line at the bottom of the window without blocking."""
+    global status_clear
+    if status_clear is not None:
+        root.after_cancel(status_clear)
+    status_label.configure(text=message)
+    status_clear = root.after(timeout, lambda: status_label.configure(text=""))
+
+
+# ----------------------------- Autosave -----------------------------#
+# Errors from the writer thread, reported on the Tk thread; they are polled for only
+# while writes are pending, so an idle planner schedules nothing
+write_errors = queue.Queue()
+write_poll = None
+
+
+def watch_writes():
+    global write_poll
+    if write_poll is None:
+        write_poll = root.after(500, poll_write_errors)
+
+
+def poll_write_errors():
+    global write_poll
+    busy = writer.pending()  # before draining, so a failing last write is still reported
+    try:
+        while True:
+            show_status(f"Autosave failed: {write_errors.get_nowait()}", 10000)
+    except queue.Empty:
+        pass
+    write_poll = root.after(500, poll_write_errors) if busy else None
+
+
+writer = WriteBehind(on_error=write_errors.put, on_submit=watch_writes)
+
+
+def open_task_table():
+    """Restore the to-do list saved by the last session and store every change to it as it happens."""
+    try:
+        return TaskTable(task_store, writer)
+    except (OSError, ValueError, KeyError, sqlite3.Error) as e:
+        # Leave the damaged data alone rather than overwrite it with an empty list
+        task_store.clear()
+        messagebox.showerror("Error", f"Could not restore the saved to-do list: {e}")
+        return None
+
+
+def quit_planner():
+    # Let queued writes (task changes, note autosaves) reach the disk before exiting
+    writer.close()
+    root.destroy()
 
 
 # Function to save the To-Do list in a CSV file
 def save_data():
     file_path = filedialog.asksaveasfilename(defaultextension=".csv", filetypes=[("CSV files", "*.csv")])
     if file_path:
-        with open(file_path, 'w', newline='') as file:
-            writer = csv.writer(file)
-            # Write header
-            writer.writerow(["Completed", "Task"])
-            # Write each task with completion status
-            for task_var, task_frame, completed_var in todo_tasks:
-                completed = "Yes" if completed_var.get() == 1 else "No"
-                task_name = task_var.get().replace("✔ ", "")
-                writer.writerow([completed, task_var.get()])
-
-        messagebox.showinfo("Success", f"To-Do List saved to {file_path}")
+        start_csv_job(csv_export_worker, f"To-Do List saved to {file_path}", file_path, task_store.snapshot())
 
 # Function to load the To-Do list from a CSV file
 def load_data():
     file_path = filedialog.askopenfilename(filetypes=[("CSV files", "*.csv")])
     if file_path:
-        with open(file_path, 'r') as file:
-            reader = csv.reader(file)
-            next(reader)  # Skip header row
-            
-            # Clear existing tasks
-            for task in todo_tasks:
-                task[1].destroy()
-            todo_tasks.clear()
+        # Rows arrive from the worker in batches and replace the list once the file is read
+        start_csv_job(csv_import_worker, "To-Do List loaded successfully!", file_path, staged=[])
 
-            # Load tasks from CSV file
-            for row in reader:
-                completed = row[0].strip().lower() == "yes"
-                task_text = row[1].strip()
-                
-                task_var = tk.StringVar(value=task_text)
-                task_frame = tk.Frame(todo_frame, bg=univ_bg)
-                task_frame.pack(anchor="w", pady=2, fill="x")
-
-                completed_var = tk.IntVar(value=1 if completed else 0)
-
-                task_checkbox = tk.Checkbutton(task_frame, text=task_text, variable=completed_var,
-                                               font=("Helvetica", 20))
-                task_checkbox.configure(bg=univ_bg)
-                task_checkbox.pack(anchor='w', pady=2)
-
-                task_checkbox.config(command=lambda t=task_var, c=completed_var, ch=task_checkbox: toggle_task(t,c,ch))
+# Functions to import/export the schedule as an iCalendar file
+def import_calendar():
+    file_path = filedialog.askopenfilename(filetypes=[("iCalendar files", "*.ics")])
+    if file_path:
+        start_csv_job(ics_import_worker, "Calendar imported successfully!", file_path)
 
-                task_checkbox.bind("<Button-3>", lambda e, tf=task_frame, tv=task_var: show_remove_menu(e, tf, tv))
 
-                todo_tasks.append((task_var, task_frame, completed_var))
+def export_calendar():
+    file_path = filedialog.asksaveasfilename(defaultextension=".ics", filetypes=[("iCalendar files", "*.ics")])
+    if file_path:
+        start_csv_job(ics_export_worker, f"Calendar saved to {file_path}", file_path, event_store.snapshot())
 
-        messagebox.showinfo("Success", "To-Do List loaded successfully!")
 
 # Function to add event using dropdown selections for hours and minutes
 def add_event():
     event_window = tk.Toplevel(root)
-    event_window.title("Add Event")
-    event_window.geometry("350x500")
+    event_window.title(f"Add Event - {schedule_day:%a %b %d}")
+    hours = range(schedule_engine.start_hour, schedule_engine.end_hour)
+    event_window.geometry("350x680")
 
     tk.Label(event_window, text="Event Title:", font=("Helvetica", 20)).pack(pady=5)
     title_entry = tk.Entry(event_window, font=("Helvetica", 20))
     title_entry.pack(pady=5)
 
     tk.Label(event_window, text="Start Time:", font=("Helvetica", 20)).pack(pady=5)
-    start_hour = ttk.Combobox(event_window, values=[f"{h:02}" for h in range(8, 20)], width=5, font=("Helvetica", 20))
+    start_hour = ttk.Combobox(event_window, values=[f"{h:02}" for h in hours], width=5, font=("Helvetica", 20))
     start_hour.pack( padx=5)
     start_minute = ttk.Combobox(event_window, values=[f"{m:02}" for m in range(0, 60, 15)], width=5, font=("Helvetica", 20))
     start_minute.pack(padx=5)
 
     tk.Label(event_window, text="End Time:", font=("Helvetica", 20)).pack(pady=5)
-    end_hour = ttk.Combobox(event_window, values=[f"{h:02}" for h in range(8, 20)], width=5, font=("Helvetica", 20))
+    end_hour = ttk.Combobox(event_window, values=[f"{h:02}" for h in hours], width=5, font=("Helvetica", 20))
     end_hour.pack(padx=5)
     end_minute = ttk.Combobox(event_window, values=[f"{m:02}" for m in range(0, 60, 15)], width=5, font=("Helvetica", 20))
     end_minute.pack(padx=5)
@@ -152,6 +648,21 @@ def add_event():
     color_dropdown = ttk.Combobox(event_window, textvariable=color_var, values=color_options, font=("Helvetica", 20))
     color_dropdown.pack(padx=5)
 
+    # Recurrence: stored as one rule, however many times it repeats
+    tk.Label(event_window, text="Repeat:", font=("Helvetica", 20)).pack(pady=5)
+    repeat_options = ["Never"] + [freq.capitalize() for freq in FREQUENCIES]
+    repeat_var = tk.StringVar(value="Never")
+    ttk.Combobox(event_window, textvariable=repeat_var, values=repeat_options, state="readonly",
+                 font=("Helvetica", 20)).pack(padx=5)
+    repeat_frame = tk.Frame(event_window)
+    repeat_frame.pack(pady=5)
+    tk.Label(repeat_frame, text="every", font=("Helvetica", 16)).pack(side="left")
+    interval_spin = tk.Spinbox(repeat_frame, from_=1, to=99, width=3, font=("Helvetica", 16))
+    interval_spin.pack(side="left")
+    tk.Label(repeat_frame, text="times (0 = no end)", font=("Helvetica", 16)).pack(side="right")
+    count_spin = tk.Spinbox(repeat_frame, from_=0, to=9999, width=5, font=("Helvetica", 16))
+    count_spin.pack(side="right", padx=(10, 0))
+
     def submit_event():
         title = title_entry.get().strip()
         start = f"{start_hour.get()}:{start_minute.get()}"
@@ -159,12 +670,29 @@ def add_event():
         selected_color = color_var.get()
 
         if title and start_hour.get() and end_hour.get():
-            start_idx = int(start_hour.get()) - 8 + (int(start_minute.get()) / 60)
-            end_idx = int(end_hour.get()) - 8 + (int(end_minute.get()) / 60)
-
-            if start_idx < end_idx:
-                event_label = tk.Label(schedule_frame, text=f"{title}", bg=selected_color, relief="ridge", font = ("Helvetica", 16))
-                event_label.place(relx=0.35, rely=start_idx / 12, relwidth=0.60, relheight=(end_idx - start_idx) / 12)
+            start = at_time(schedule_day, int(start_hour.get()), int(start_minute.get() or 0))
+            end = at_time(schedule_day, int(end_hour.get()), int(end_minute.get() or 0))
+
+            if start < end:
+                # Overlap lookup goes through the day's interval index
+                conflicts = event_store.conflicts(start, end)
+                if conflicts:
+                    names = ", ".join(f"{e.title} ({e.start:%H:%M}-{e.end:%H:%M})" for e in conflicts)
+                    if not messagebox.askyesno("Conflict", f"This overlaps with {names}. Add it anyway?",
+                                               parent=event_window):
+                        return
+                if repeat_var.get() == "Never":
+                    event_store.add(title, start, end, selected_color)
+                else:
+                    try:
+                        interval, count = int(interval_spin.get()), int(count_spin.get())
+                        event_store.add_rule(title, start, end, selected_color, freq=repeat_var.get().upper(),
+                                             interval=interval, count=count or None)
+                    except ValueError:
+                        messagebox.showerror("Error", "Repeat every 1 or more, and 0 or more times.",
+                                             parent=event_window)
+                        return
+                render_schedule()
                 event_window.destroy()
             else:
                 messagebox.showerror("Error", "End time must be after start time.")
@@ -175,8 +703,130 @@ def add_event():
 
 
 
+# Function to redraw the schedule canvas for the current view
+def render_schedule(event=None):
+    """
+    Everything on the schedule is a canvas item. Event positions come from the engine's
+    cached per-day layouts and are mapped onto each day's cell in one vectorized step.
+    """
+    width, height = schedule_canvas.winfo_width(), schedule_canvas.winfo_height()
+    if width <= 1:
+        return  # not mapped yet; <Configure> renders once it is
+
+    view = schedule_view.get()
+    days, columns, gutter, header, cell_width, cell_height = schedule_engine.grid(view, schedule_day, width, height)
+    small = view != "day"
+    schedule_label.configure(text=f"Schedule - {schedule_engine.title(view, schedule_day)}")
+    schedule_canvas.delete("all")
+
+    # Hour rows in the gutter
+    if view != "month":
+        slot_height = cell_height / schedule_engine.hours
+        for i, text in enumerate(schedule_engine.hour_labels()):
+            y = header + i * slot_height
+            schedule_canvas.create_rectangle(0, y, gutter, y + slot_height, fill=schedule_colors["slot"], tags="hour")
+            schedule_canvas.create_text(4, y + slot_height / 2, text=text, anchor="w", fill=schedule_colors["text"],
+                                        font=("Arial", 11 if small else 18), tags="text")
+
+    # Day names above the columns
+    if view != "day":
+        for col in range(columns):
+            name = f"{days[col]:%a %d}" if view == "week" else f"{days[col]:%a}"
+            schedule_canvas.create_text(gutter + (col + 0.5) * cell_width, header / 2, text=name,
+                                        fill=schedule_colors["text"], font=("Helvetica", 11), tags="text")
+
+    for i, layout in enumerate(schedule_engine.layouts(days)):
+        x = gutter + (i % columns) * cell_width
+        y = header + (i // columns) * cell_height
+        events_y, events_height = y, cell_height
+        if view == "month":
+            schedule_canvas.create_rectangle(x, y, x + cell_width, y + cell_height, outline=schedule_colors["text"], tags="cell")
+            schedule_canvas.create_text(x + 3, y + 2, text=str(layout.day.day), anchor="nw", font=("Helvetica", 10),
+                                        fill=schedule_colors["text"] if layout.day.month == schedule_day.month else "gray",
+                                        tags="text")
+            events_y, events_height = y + 16, cell_height - 18
+
+        xs, ys, widths, heights = layout.rects(x + 1, events_y, cell_width - 2, events_height)
+        for event, ex, ey, ew, eh in zip(layout.events, xs, ys, widths, heights):
+            tags = ("event", f"event{event.id}")
+            schedule_canvas.create_rectangle(ex, ey, ex + ew, ey + eh, fill=event.color, outline="black", tags=tags)
+            schedule_canvas.create_text(ex + ew / 2, ey + eh / 2, text=event.title, width=max(ew - 4, 1),
+                                        font=("Helvetica", 9 if small else 16), tags=tags)
+
+    schedule_canvas.create_line(0, 0, 0, 0, fill="red", width=2, tags="now")
+    update_time_indicator()
+
+
+def schedule_resized(event):
+    """<Configure> handler: coalesce a burst of resizes into one render per frame."""
+    global schedule_relayout
+    if schedule_relayout is None:
+        schedule_relayout = root.after(RELAYOUT_INTERVAL_MS, relayout_schedule)
+
+
+def relayout_schedule():
+    global schedule_relayout
+    schedule_relayout = None
+    render_schedule()
+
+
+def event_id_at_pointer():
+    for tag in schedule_canvas.gettags("current"):
+        if tag.startswith("event") and tag != "event":
+            return int(tag[len("event"):])
+    return None
+
+
+def show_event_menu(event):
+    event_id = event_id_at_pointer()
+    if event_id is None:
+        return
+    event_menu = tk.Menu(root, tearoff=0)
+    rule = event_store.rule_of(event_id)
+    if rule is None:
+        event_menu.add_command(label="Remove Event", command=lambda: remove_event(event_id))
+    else:
+        event_menu.add_command(label="Remove This Occurrence", command=lambda: skip_occurrence(event_id))
+        event_menu.add_command(label="Remove All Occurrences", command=lambda: remove_event(rule.id))
+    event_menu.post(event.x_root, event.y_root)
+    root.bind("<Button-1>", lambda event: close_menu(event, event_menu))
+
+
+def remove_event(event_id):
+    event_store.remove(event_id)
+    render_schedule()
+
+
+def skip_occurrence(event_id):
+    event_store.skip_occurrence(event_id)
+    render_schedule()
+
+
+# Function to move the schedule one day/week/month back or forward, or to today
+def page_schedule(direction):
+    global schedule_day
+    if direction:
+        schedule_day = schedule_engine.step(schedule_view.get(), schedule_day, direction)
+    else:
+        schedule_day = datetime.now().date()
+    render_schedule()
+
+
+def set_time_window():
+    start = simpledialog.askinteger("Time Window", "First hour (0-23):", initialvalue=schedule_engine.start_hour,
+                                    minvalue=0, maxvalue=23, parent=root)
+    if start is None:
+        return
+    end = simpledialog.askinteger("Time Window", "Last hour (1-24):", initialvalue=max(schedule_engine.end_hour, start + 1),
+                                  minvalue=start + 1, maxvalue=24, parent=root)
+    if end is None:
+        return
+    schedule_engine.set_window(start, end)
+    render_schedule()
+
+
 # Function to open the notes window
-def open_notes_window():
+def open_notes_window(file_path=None):
     notes_window = tk.Toplevel(root)
     notes_window.title("Markdown Notes")
     notes_window.geometry("700x600")
@@ -197,78 +847,199 @@ def open_notes_window():
     text_scrollbar.config(command = notes_text.yview)
     text_scrollbar.pack(side="right", fill = "y")
     notes_text.pack(side ="left", expand = True, fill = "both")
+    highlighter = MarkdownHighlighter(notes_text, "Helvetica", 18)
+
+    # Huge notes are memory-mapped and edited a page at a time, in place of the editor
+    pager = PagedText(text_frame, ("Courier", 14), on_edit=lambda: schedule_autosave())
 
     metadata_label = tk.Label(notes_window, text="", font=("Helvetica", 16), fg="gray")
     metadata_label.pack(pady=5)
 
+    # Once the note has a file, edits are journaled in the background shortly after typing stops.
+    # Large notes are inserted a chunk per after() callback while "chunks" holds the rest.
+    note = {"path": None, "autosave": None, "chunks": None, "loading": None, "loading_path": None, "paged": False,
+            "journal": None}
+    writer.submit("recover-notes", planner_notes.recover_notes)  # edits journaled before a crash
+
+    def text_modified(event=None):
+        # <<Modified>> fires when the flag changes; clearing it re-arms the event for the next edit
+        if notes_text.edit_modified():
+            notes_text.edit_modified(False)
+            schedule_autosave()
+
+    def schedule_autosave(event=None):
+        if note["path"]:
+            if note["autosave"] is not None:
+                notes_window.after_cancel(note["autosave"])
+            note["autosave"] = notes_window.after(planner_notes.AUTOSAVE_DELAY_MS, autosave)
+
+    def autosave():
+        note["autosave"] = None
+        file_path = note["path"]
+        if note["paged"]:
+            # Only the list of pieces is handed over; the writer copies unedited lines from the mapping
+            mapped, pieces = pager.note, pager.note.pieces
+            metadata, _ = planner_notes.note_content(file_path, title_entry.get().strip(), "")
+            writer.submit(file_path, lambda: mapped.write(file_path, metadata, pieces))
+        else:
+            # Only the changed span is journaled; the writer compacts the journal into the note
+            metadata, _ = planner_notes.note_content(file_path, title_entry.get().strip(), "")
+            note["journal"].record(metadata, notes_text.get("1.0", tk.END).strip())
+        metadata_label.config(text=f"Autosaved {file_path} at {metadata['Last Modified']}")
+
+    def flush_autosave():
+        if note["autosave"] is not None:
+            notes_window.after_cancel(note["autosave"])
+            autosave()
+        if note["paged"]:
+            writer.flush()  # the write reads from the mapping, which is closed next
+
+    def start_journal(file_path, body):
+        note["journal"] = planner_notes.NoteJournal(writer, file_path, body)
+
+    def close_journal(compact=True):
+        if note["journal"] is not None:
+            note["journal"].close(compact)
+            note["journal"] = None
+
+    def close():
+        flush_autosave()
+        close_journal()
+        stop_loading()
+        pager.set_note(None)
+        notes_window.destroy()
+
+    def set_paged(paged):
+        if paged == note["paged"]:
+            return
+        note["paged"] = paged
+        if paged:
+            text_scrollbar.pack_forget()
+            notes_text.pack_forget()
+            pager.pack()
+        else:
+            pager.set_note(None)
+            pager.pack_forget()
+            text_scrollbar.pack(side="right", fill="y")
+            notes_text.pack(side="left", expand=True, fill="both")
+
+    def load_step():
+        chunk = next(note["chunks"], None)
+        if chunk is None:
+            file_path = note["loading_path"]
+            stop_loading()
+            notes_text.mark_set("insert", "1.0")
+            notes_text.yview("1.0")
+            notes_text.edit_modified(False)  # loading the text is not an edit to autosave
+            start_journal(file_path, notes_text.get("1.0", tk.END).strip())
+            note["path"] = file_path
+            return
+        notes_text.configure(state="normal")
+        notes_text.insert("end-1c", chunk)
+        notes_text.configure(state="disabled")
+        note["loading"] = notes_window.after(1, load_step)
+
+    def stop_loading():
+        if note["chunks"] is None:
+            return
+        if note["loading"] is not None:
+            notes_window.after_cancel(note["loading"])
+        note["chunks"].close()
+        note["chunks"] = note["loading"] = None
+        notes_text.configure(state="normal")
+
     # Function to save the file
     def save_notes(file_path=None):
+        if note["chunks"] is not None:
+            return  # still loading; saving would truncate the note
         if not file_path:
             file_path = filedialog.asksaveasfilename(defaultextension=".md", filetypes=[("Markdown files", "*.md")])
         if file_path:
-            now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-            if os.path.exists(file_path):
-                with open(file_path, 'r') as f:
-                    content = f.read()
-                metadata_match = re.match(r'---\n(.*?)\n---\n', content, re.DOTALL)
-                if metadata_match:
-                    metadata = metadata_match.group(1)
-                    created_date = re.search(r'Date Created: (.*)', metadata).group(1)
-                    title = re.search(r'Title: (.*)', metadata).group(1)
-                else:
-                    created_date = now
-                    title = title_entry.get().strip() or "Untitled"
-                last_modified = now
+            # A queued autosave of this note must not land after the explicit save
+            if note["autosave"] is not None:
+                notes_window.after_cancel(note["autosave"])
+                note["autosave"] = None
+            close_journal(compact=False)  # the save below writes the note in full
+            writer.flush()
+            if note["paged"]:
+                metadata = planner_notes.save_mapped_note(file_path, title_entry.get().strip(), pager.note)
             else:
-                created_date = now
-                last_modified = now
-                title = title_entry.get().strip() or "Untitled"
-
-            markdown_content = f"""---
-Title: {title}
-Date Created: {created_date}
-Last Modified: {last_modified}
----
-
-{notes_text.get("1.0", tk.END).strip()}
-"""
+                body = notes_text.get("1.0", tk.END).strip()
+                metadata = planner_notes.save_note(file_path, title_entry.get().strip(), body)
+                start_journal(file_path, body)
+            title_entry.delete(0, tk.END)
+            title_entry.insert(0, metadata["Title"])
+            note["path"] = file_path
+            if note["paged"]:
+                metadata_label.config(text=f"Saved at {file_path} | Not converted to PDF, the note is too large")
+                return
 
-            with open(file_path, 'w') as f:
-                f.write(markdown_content)
+            metadata_label.config(text=f"Saved at {file_path} | Converting to PDF...")
 
-            messagebox.showinfo("Success", f"Notes saved at {file_path}")
-
-            pdf_path = file_path.replace(".md", ".pdf")
-            try:
-                subprocess.run(["pandoc", file_path, "-o", pdf_path], check=True)
-                messagebox.showinfo("Success", f"PDF saved at {pdf_path}")
-            except Exception as e:
-                messagebox.showerror("Error", f"Failed to convert to PDF: {e}")
+            # PDF conversion runs in the background; the status line reports the result
+            submit_export(file_path)
 
     # Function to open an existing markdown file
-    def open_notes():
-        file_path = filedialog.askopenfilename(filetypes=[("Markdown files", "*.md")])
+    def open_notes(file_path=None):
+        if not file_path:
+            file_path = filedialog.askopenfilename(filetypes=[("Markdown files", "*.md")])
         if file_path:
-            with open(file_path, 'r') as f:
-                content = f.read()
-
-            metadata_match = re.match(r'---\n(.*?)\n---\n', content, re.DOTALL)
-            if metadata_match:
-                metadata = metadata_match.group(1)
-                content_body = content[len(metadata_match.group(0)):].strip()
-                
-                title = re.search(r'Title: (.*)', metadata).group(1)
-                created_date = re.search(r'Date Created: (.*)', metadata).group(1)
-                last_modified = re.search(r'Last Modified: (.*)', metadata).group(1)
-                
-                title_entry.delete(0, tk.END)
-                title_entry.insert(0, title)
-                metadata_label.config(text=f"Created: {created_date} | Last Modified: {last_modified}")
-                notes_text.delete("1.0", tk.END)
-                notes_text.insert("1.0", content_body)
+            flush_autosave()
+            close_journal()
+            stop_loading()
+            writer.flush()
+            planner_notes.recover_note(file_path)  # edits journaled before a crash
+            size = os.path.getsize(file_path)
+            if size >= planner_notes.HUGE_NOTE_BYTES:
+                mapped = planner_notes.MappedNote(file_path)
+                metadata = mapped.metadata
+            elif size >= planner_notes.LARGE_NOTE_BYTES:
+                metadata, chunks = planner_notes.read_note_chunks(file_path)
             else:
+                metadata, content_body = planner_notes.read_note(file_path)
+            if metadata is None:
+                if size >= planner_notes.HUGE_NOTE_BYTES:
+                    mapped.close()
                 messagebox.showerror("Error", "Invalid or missing metadata in file.")
+                return
+
+            note["path"] = None
+            highlighter.enabled = size < planner_notes.LARGE_NOTE_BYTES  # large notes are left plain
+            set_paged(False)
+            title_entry.delete(0, tk.END)
+            title_entry.insert(0, metadata.get("Title", "Untitled"))
+            details = f"Created: {metadata.get('Date Created', '')} | Last Modified: {metadata.get('Last Modified', '')}"
+            metadata_label.config(text=details)
+            notes_text.delete("1.0", tk.END)
+            if size >= planner_notes.HUGE_NOTE_BYTES:
+                set_paged(True)
+                pager.set_note(mapped)
+                metadata_label.config(text=f"{details} | {size / 2**20:.0f} MB, {len(mapped)} lines")
+                note["path"] = file_path
+            elif size >= planner_notes.LARGE_NOTE_BYTES:
+                notes_text.configure(state="disabled")  # until the whole note is in
+                note["chunks"] = chunks
+                note["loading_path"] = file_path
+                note["loading"] = notes_window.after(1, load_step)
+            else:
+                notes_text.insert("1.0", content_body)
+                notes_text.edit_modified(False)  # loading the text is not an edit to autosave
+                start_journal(file_path, content_body)
+                note["path"] = file_path
+
+    # Function to wrap the selection in Markdown markers
+    def format_text(prefix, suffix):
+        if note["chunks"] is not None or note["paged"]:
+            return "break"
+        try:
+            start, end = notes_text.index("sel.first"), notes_text.index("sel.last")
+        except tk.TclError:
+            start = end = notes_text.index("insert")  # no selection: insert an empty pair
+        notes_text.insert(end, suffix)
+        notes_text.insert(start, prefix)
+        if start == end:
+            notes_text.mark_set("insert", f"{start}+{len(prefix)}c")
+        return "break"
 
     # Function to select all text
     def select_all(event=None):
@@ -286,9 +1057,9 @@ Last Modified: {last_modified}
     # Keyboard shortcuts
     notes_window.bind("<Control-s>", lambda event: save_notes())  # Ctrl+S to save
     notes_window.bind("<Control-a>", select_all)  # Ctrl+A to select all
-    notes_window.bind("<Control-b>", lambda event: format_text("**", "**"))  # Ctrl+B for bold
-    notes_window.bind("<Control-i>", lambda event: format_text("*", "*"))  # Ctrl+I for italics
-    notes_window.bind("<Control-u>", lambda event: format_text("__", "__"))  # Ctrl+U for underline
+    notes_text.bind("<Control-b>", lambda event: format_text("**", "**"))  # Ctrl+B for bold
+    notes_text.bind("<Control-i>", lambda event: format_text("*", "*"))  # Ctrl+I for italics
+    notes_text.bind("<Control-u>", lambda event: format_text("__", "__"))  # Ctrl+U for underline
 
     # Right-click menu
     def show_context_menu(event):
@@ -308,6 +1079,9 @@ Last Modified: {last_modified}
 
 
     notes_text.bind("<Button-3>", show_context_menu)
+    notes_text.bind("<<Modified>>", text_modified)
+    title_entry.bind("<KeyRelease>", schedule_autosave)
+    notes_window.protocol("WM_DELETE_WINDOW", close)
     notes_window.bind("<Button-1>", lambda event: close_menu(event, context_menu))
 
     # Buttons for saving and opening notes
@@ -317,159 +1091,336 @@ Last Modified: {last_modified}
     tk.Button(button_frame, text="Save Notes", command=lambda: save_notes(), font=("Helvetica", 18)).pack(side="left", padx=10)
     tk.Button(button_frame, text="Open Notes", command=open_notes, font=("Helvetica", 18)).pack(side="left", padx=10)
 
+    if file_path:
+        open_notes(file_path)
+
+
+# Function to search a folder of notes
+def open_library_window():
+    """
+    Full-text search over a folder of notes. The folder is rescanned and new or changed
+    notes are indexed periodically on a worker thread, keeping the window responsive.
+    """
+    library_window = tk.Toplevel(root)
+    library_window.title("Notes Library")
+    library_window.geometry("700x600")
+    state = {"library": planner_notes.NoteLibrary(), "scan": None, "poll": None, "search": None, "paths": [],
+             "sync": None, "pending": 0, "changed": False}
+
+    folder_frame = tk.Frame(library_window)
+    folder_frame.pack(fill="x", padx=10, pady=5)
+    folder_label = tk.Label(folder_frame, text=state["library"].directory, font=("Helvetica", 14), anchor="w")
+    folder_label.pack(side="left", fill="x", expand=True)
+
+    search_entry = tk.Entry(library_window, font=("Helvetica", 20))
+    search_entry.pack(fill="x", padx=10, pady=5)
+
+    results_frame = tk.Frame(library_window)
+    results_frame.pack(expand=True, fill="both", padx=10, pady=5)
+    results_scrollbar = tk.Scrollbar(results_frame, orient="vertical")
+    results_list = tk.Listbox(results_frame, font=("Helvetica", 16), yscrollcommand=results_scrollbar.set)
+    results_scrollbar.config(command=results_list.yview)
+    results_scrollbar.pack(side="right", fill="y")
+    results_list.pack(side="left", expand=True, fill="both")
+
+    status = tk.Label(library_window, text="", font=("Helvetica", 14), anchor="w")
+    status.pack(fill="x", padx=10, pady=5)
+
+    def update_status():
+        indexed = f"{len(state['library'])} notes indexed"
+        status.config(text=f"{indexed}, {state['pending']} to go..." if state["pending"] else indexed)
+
+    def sync_worker(directory, results, cancel):
+        # The worker opens its own connection; the window's library only searches
+        library = planner_notes.NoteLibrary(directory)
+        try:
+            for remaining in library.sync():
+                results.put(remaining)
+                if cancel.is_set():
+                    return
+        finally:
+            library.close()
+            results.put(None)
+
+    def scan():
+        if state["sync"] is None:
+            results, cancel = queue.Queue(), threading.Event()
+            state.update(sync=(results, cancel), changed=False)
+            threading.Thread(target=sync_worker, args=(state["library"].directory, results, cancel),
+                             daemon=True).start()
+            state["poll"] = library_window.after(50, poll_sync)
+        update_status()
+        state["scan"] = library_window.after(planner_notes.LIBRARY_SCAN_INTERVAL_MS, scan)
+
+    def poll_sync():
+        results = state["sync"][0]
+        try:
+            while True:
+                remaining = results.get_nowait()
+                if remaining is None:
+                    state.update(sync=None, poll=None, pending=0)
+                    if state["changed"]:
+                        run_search()
+                    update_status()
+                    return
+                state.update(pending=remaining, changed=True)
+        except queue.Empty:
+            pass
+        update_status()
+        state["poll"] = library_window.after(50, poll_sync)
+
+    def run_search():
+        state["search"] = None
+        results_list.delete(0, tk.END)
+        state["paths"] = []
+        for path, title, created, snippet in state["library"].search(search_entry.get()):
+            results_list.insert(tk.END, f"{title}  ({created or os.path.basename(path)})  {snippet}")
+            state["paths"].append(path)
+
+    def search_changed(event=None):
+        # Debounce typing so a burst of keystrokes runs one query
+        if state["search"] is not None:
+            library_window.after_cancel(state["search"])
+        state["search"] = library_window.after(150, run_search)
+
+    def open_result(event=None):
+        selection = results_list.curselection()
+        if selection:
+            open_notes_window(state["paths"][selection[0]])
+
+    def stop_timers():
+        for key in ("scan", "poll", "search"):
+            if state[key] is not None:
+                library_window.after_cancel(state[key])
+                state[key] = None
+        if state["sync"] is not None:
+            state["sync"][1].set()  # the worker stops before its next step; its queue is dropped
+            state.update(sync=None, pending=0)
+
+    def choose_folder():
+        directory = filedialog.askdirectory(initialdir=state["library"].directory)
+        if directory:
+            stop_timers()
+            state["library"].close()
+            state["library"] = planner_notes.NoteLibrary(directory)
+            folder_label.config(text=state["library"].directory)
+            results_list.delete(0, tk.END)
+            scan()
+
+    def close():
+        stop_timers()
+        state["library"].close()
+        library_window.destroy()
+
+    tk.Button(folder_frame, text="Choose Folder...", command=choose_folder, font=("Helvetica", 14)).pack(side="right")
+    search_entry.bind("<KeyRelease>", search_changed)
+    results_list.bind("<Double-Button-1>", open_result)
+    results_list.bind("<Return>", open_result)
+    library_window.protocol("WM_DELETE_WINDOW", close)
+    search_entry.focus_set()
+    scan()
+
+
+
+# ----------------------------- Theme -----------------------------#
+# Every theme is compiled once into widget options per role; themed widgets register
+# their role when created, so switching only re-applies prepared options to them
+tk_themes = {name: tk_options(t) for name, t in THEMES.items()}
+themed_widgets = {role: [] for role in tk_themes[DEFAULT_THEME.name]}
+theme = DEFAULT_THEME
+
+
+def themed(widget, role):
+    """Give a widget the current theme's colours for its role and keep it for theme switches."""
+    themed_widgets[role].append(widget)
+    widget.configure(**tk_themes[theme.name][role])
+    return widget
 
 
 # Function to switch between day and night modes
 def toggle_theme():
-    if theme_switch.get():
-        univ_bg = "#231123"
-        text_color = "#da4167"
-        schedule_color = "#3E0F06"
-        button_color = "#3B5360"
-
+    global theme
+    theme = THEMES["night" if theme_switch.get() else "day"]
+    options = tk_themes[theme.name]
+    for role, widgets in themed_widgets.items():
+        for widget in widgets:
+            widget.configure(**options[role])
+
+    # The canvases draw their own rows and items
+    todo_view.set_colors(theme.bg, theme.text)
+    schedule_colors.update(slot=theme.slot, text=theme.text)
+    schedule_canvas.configure(bg=theme.bg)
+    schedule_canvas.itemconfigure("hour", fill=theme.slot)
+    schedule_canvas.itemconfigure("text", fill=theme.text)
+    schedule_canvas.itemconfigure("cell", outline=theme.text)
+
+
+def update_time_indicator(now=None):
+    """Function to update the position of the time indicator line."""
+    now = now or datetime.now()
+    view = schedule_view.get()
+    width, height = schedule_canvas.winfo_width(), schedule_canvas.winfo_height()
+    days, columns, gutter, header, cell_width, cell_height = schedule_engine.grid(view, schedule_day, width, height)
+    fraction = schedule_engine.time_fraction(now)
+
+    # Convert current time to a position in the schedule
+    if view != "month" and now.date() in days and fraction is not None:
+        y = header + fraction * cell_height
+        schedule_canvas.coords("now", 0, y, width, y)
+        schedule_canvas.itemconfigure("now", state="normal")
+        schedule_canvas.tag_raise("now")
     else:
-        univ_bg = "#FFECD8"
-        text_color = "#381d2a"
-        schedule_color = "#88D5D3"
-        button_color = "#E3E6B5"
+        schedule_canvas.itemconfigure("now", state="hidden")
 
 
-    # Apply the new background color
-    root.config(bg=univ_bg)
-    header_label.configure(bg=univ_bg, fg= text_color)
-    left_frame.configure(bg=univ_bg)
-    todo_label.configure(bg=univ_bg, fg = text_color)
-    todo_frame.configure(bg=univ_bg)
-    right_frame.configure(bg=univ_bg)
-    schedule_label.configure(bg=univ_bg, fg = text_color)
-    schedule_frame.configure(bg=univ_bg)
-    button_frame.configure(bg=univ_bg)
+def day_changed(previous, today):
+    """At midnight: new header date, and a view that was showing today moves on with it."""
+    global schedule_day
+    header_label.configure(text=today.strftime("%B %d, %Y | %A"))
+    if previous is not None and schedule_day == previous:
+        schedule_day = today
+        render_schedule()
 
-    for task in todo_tasks:
-        task[1].configure(bg = univ_bg, fg = text_color)
 
-    for widget in schedule_frame.winfo_children():
-        widget.configure(bg = schedule_color, fg = text_color)
+def window_mapped(event):
+    # Bindings on root also see its children's events
+    if event.widget is root:
+        clock.start()  # catches up at once on a minute or day missed while hidden
 
-    # update button
-    add_event_btn.configure(bg = button_color, fg = text_color)
-    save_btn.configure(bg = button_color, fg = text_color)
-    load_btn.configure(bg = button_color, fg = text_color)
-    notes_btn.configure(bg = button_color, fg = text_color)
 
-
-def update_time_indicator():
-    """Function to update the position of the time indicator line."""
-    now = datetime.now()
-    current_hour = now.hour
-    current_minute = now.minute
-
-    # Convert current time to relative position in the schedule
-    if 8 <= current_hour < 20:
-        time_position = ((current_hour - 8) + (current_minute / 60)) / 12
-        time_indicator.place(relx=0, rely=time_position, relwidth=2, height=2)
-    else:
-        time_indicator.place_forget()
-
-    # Update every minute
-    schedule_frame.after(60000, update_time_indicator)
+def window_unmapped(event):
+    if event.widget is root:
+        clock.pause()
 
 
 def change_style(theme):
     # Change style
     style.theme_use(theme)
 
+
+def fill_theme_menu():
+    """List the themes the first time the Themes menu opens; ttkthemes is not needed before."""
+    global style
+    if theme_menu.index("end") is not None:
+        return
+    from ttkthemes import ThemedStyle
+    style = ThemedStyle(root)
+    for t in style.get_themes():
+        theme_menu.add_command(label = t, command = lambda t=t: change_style(t), font = ("Helvetica", 24))
+
 # Function to update the calendar display for the selected month and year
 def update_calendar(year, month):
-    now = datetime.now()
-    today = now.day if year == now.year and month == now.month else None
-    
-    cal = calendar.monthcalendar(year, month)
-    cal_text = f"{calendar.month_name[month]} {year}\n\n"
-    cal_text += " Mo  Tu  We  Th  Fr  Sa  Su \n"
-    
-    for week in cal:
-        for day in week:
-            if day == today:
-                cal_text += f" {day:2d}*"
-            elif day == 0:
-                cal_text += "    "
-            else:
-                cal_text += f" {day:2d} "
-        cal_text += "\n"
-    
-    calendar_label.config(text=cal_text)
+    """Relabel and shade the fixed grid of day cells; layouts and counts come from caches."""
+    global current_year, current_month, calendar_days
+    current_year, current_month = year, month
     month_var.set(calendar.month_name[month])
-    year_var.set(year)
+    year_var.set(str(year))
+    today = datetime.now().date()
+    calendar_days = page_days(year, month)
+    for cell, day in zip(calendar_cells, calendar_days):
+        events, tasks = day_activity.counts(day)
+        count = events + tasks
+        cell.config(text=f"{day.day}\n{count}" if count else f"{day.day}\n",
+                    bg=HEAT_COLORS[heat_level(count)],
+                    fg=theme.text if day.month == month else "gray",
+                    relief="solid" if day == today else "flat",
+                    font=("Helvetica", 14, "bold" if day == today else "normal"))
+
+
 # Function to select a month from the dropdown
 def select_month(event):
-    global current_month, current_year
-    selected_month = month_var.get()
-    current_month = list(calendar.month_name).index(selected_month)
-    update_calendar(current_year, current_month)
+    update_calendar(current_year, list(calendar.month_name).index(month_var.get()))
+
+
+# Function to select a year from the spinbox
+def select_year(event=None):
+    try:
+        year = int(year_var.get())
+    except ValueError:
+        return  # still typing
+    if 1 <= year <= 9999 and year != current_year:
+        update_calendar(year, current_month)
+
+
+def page_month(direction):
+    update_calendar(*step_month(current_year, current_month, direction))
+
+
+# Function to show the schedule for a day clicked in the calendar
+def select_day(index):
+    global schedule_day
+    schedule_day = calendar_days[index]
+    render_schedule()
+    calendar_window.destroy()
 
-# Function to select a year from the dropdown
-def select_year(event):
-    global current_month, current_year
-    current_year = int(year_var.get())
-    update_calendar(current_year, current_month)
 
 # Function to show the calendar window
 def open_calendar():
-    global calendar_label, current_month, current_year, month_var, year_var
+    global calendar_window, calendar_cells, month_var, year_var
 
     # Get current date
     now = datetime.now()
-    current_year, current_month = now.year, now.month
 
     # Create calendar window
     calendar_window = tk.Toplevel(root)
     calendar_window.title("Calendar")
-    calendar_window.geometry("400x450")
-    
+    calendar_window.geometry("520x480")
+
     header_frame = tk.Frame(calendar_window)
     header_frame.pack(pady=10)
 
+    tk.Button(header_frame, text="<", command=lambda: page_month(-1), font=("Helvetica", 16)).pack(side="left", padx=5)
+
     # Month selection dropdown
-    month_var = tk.StringVar(value=calendar.month_name[current_month])
+    month_var = tk.StringVar(value=calendar.month_name[now.month])
     month_menu = ttk.Combobox(header_frame, textvariable=month_var, values=list(calendar.month_name)[1:], font=("HyperFont", 20), width = 10, state="readonly")
-    month_menu.pack(side="left", padx=10)
+    month_menu.pack(side="left", padx=5)
     month_menu.bind("<<ComboboxSelected>>", select_month)
 
-    # Year selection dropdown
-    year_var = tk.StringVar(value=str(current_year))
-    year_menu = ttk.Combobox(header_frame, textvariable=year_var, values=[str(y) for y in range(1900, 2100)], font=("HyperFont", 20), width = 10, state="readonly")
-    year_menu.pack(side="left", padx=10)
-    year_menu.bind("<<ComboboxSelected>>", select_year)
+    # Year selection; a spinbox instead of a list of every year
+    year_var = tk.StringVar(value=str(now.year))
+    year_spin = tk.Spinbox(header_frame, from_=1, to=9999, textvariable=year_var, font=("HyperFont", 20), width=6, command=select_year)
+    year_spin.pack(side="left", padx=5)
+    year_spin.bind("<KeyRelease>", select_year)
+
+    tk.Button(header_frame, text=">", command=lambda: page_month(1), font=("Helvetica", 16)).pack(side="left", padx=5)
+    tk.Button(header_frame, text="Today", command=lambda: update_calendar(now.year, now.month), font=("Helvetica", 16)).pack(side="left", padx=5)
 
-    # Calendar display
-    calendar_label = tk.Label(calendar_window, font=("HyperFont", 20), justify="left")
-    calendar_label.pack(pady=10)
+    # Day grid: 42 cells created once and relabelled per month, shaded by events + tasks
+    grid_frame = tk.Frame(calendar_window)
+    grid_frame.pack(expand=True, fill="both", padx=10, pady=5)
+    for column, name in enumerate(calendar.day_abbr):
+        tk.Label(grid_frame, text=name, font=("Helvetica", 14, "bold")).grid(row=0, column=column, sticky="nsew")
+        grid_frame.columnconfigure(column, weight=1)
+    calendar_cells = []
+    for i in range(GRID_WEEKS * 7):
+        cell = tk.Label(grid_frame, font=("Helvetica", 14), borderwidth=1, width=4)
+        cell.grid(row=1 + i // 7, column=i % 7, sticky="nsew", padx=1, pady=1)
+        cell.bind("<Button-1>", lambda event, i=i: select_day(i))
+        calendar_cells.append(cell)
+    for row in range(1, GRID_WEEKS + 1):
+        grid_frame.rowconfigure(row, weight=1)
 
-    update_calendar(current_year, current_month)
+    tk.Label(calendar_window, text="Shading: events + tasks on the day. Click a day to show it in the schedule.",
+             font=("Helvetica", 12)).pack(pady=5)
 
+    update_calendar(now.year, now.month)
 
-univ_bg = "#FFECD8"
-text_color = "#381d2a"
-schedule_color = "#88D5D3"
-button_color = "#E3E6B5"
 
 # Main application window
-root = ThemedTk()
+root = tk.Tk()
 root.title("Planner")
 root.geometry("850x760")
 
-root.config(bg = univ_bg)
+themed(root, "bg")
 
 style = ttk.Style(root)
 style.theme_use("alt")
-our_themes = ttk.Style().theme_names() 
-our_themes2 = root.get_themes()
 
 my_menu = tk.Menu(root)
 root.config(menu = my_menu)
 
-theme_menu = tk.Menu(my_menu)
+theme_menu = tk.Menu(my_menu, postcommand = fill_theme_menu)
 
 
 calendar_menu = tk.Menu(my_menu)
@@ -477,14 +1428,32 @@ my_menu.add_cascade(label = "Themes", menu = theme_menu, font= ("Helvetica", 24)
 my_menu.add_cascade(label = "Calendar", menu = calendar_menu, font = ("Helvetica", 24))
 
 calendar_menu.add_command(label = "Open Calendar", command = open_calendar, font = ("Helvetica", 24))
-
-for t in our_themes2:
-    theme_menu.add_command(label = t, command = lambda t=t: change_style(t), font = ("Helvetica", 24))
+calendar_menu.add_separator()
+calendar_menu.add_command(label = "Import .ics...", command = import_calendar, font = ("Helvetica", 24))
+calendar_menu.add_command(label = "Export .ics...", command = export_calendar, font = ("Helvetica", 24))
+
+notes_menu = tk.Menu(my_menu)
+my_menu.add_cascade(label = "Notes", menu = notes_menu, font = ("Helvetica", 24))
+notes_menu.add_command(label = "Notes Library...", command = open_library_window, font = ("Helvetica", 24))
+
+# View menu: day/week/month, paging and the visible time window
+schedule_view = tk.StringVar(value="day")
+view_menu = tk.Menu(my_menu)
+my_menu.add_cascade(label = "View", menu = view_menu, font = ("Helvetica", 24))
+for v in VIEWS:
+    view_menu.add_radiobutton(label = v.capitalize(), variable = schedule_view, value = v, command = render_schedule,
+                              font = ("Helvetica", 24))
+view_menu.add_separator()
+view_menu.add_command(label = "Previous", command = lambda: page_schedule(-1), font = ("Helvetica", 24))
+view_menu.add_command(label = "Today", command = lambda: page_schedule(0), font = ("Helvetica", 24))
+view_menu.add_command(label = "Next", command = lambda: page_schedule(1), font = ("Helvetica", 24))
+view_menu.add_separator()
+view_menu.add_command(label = "Time Window...", command = set_time_window, font = ("Helvetica", 24))
 
 # Top date label
 current_date = datetime.now().strftime("%B %d, %Y | %A")
 header_label = tk.Label(root, text=current_date, font=("Helvetica", 30), anchor="center")
-header_label.configure(bg = univ_bg)
+themed(header_label, "label")
 header_label.pack(pady=10)
 
 # Create the main layout frames
@@ -493,83 +1462,111 @@ main_frame.pack(fill="both", expand=True)
 
 # Left column for Todo List
 left_frame = tk.Frame(main_frame, width=300, padx=10, pady=10)
-left_frame.configure(bg = univ_bg)
+themed(left_frame, "bg")
 left_frame.pack(side="left", fill="y")
 
 todo_label = tk.Label(left_frame, text="To-Do List", font=("Helvetica", 24, "bold"))
-todo_label.configure(bg=univ_bg)
+themed(todo_label, "label")
 todo_label.pack()
 
 todo_entry = tk.Entry(left_frame, width=30, font=("Helvetica", 20))
-todo_entry.configure(bg = univ_bg)
+todo_entry.configure(bg = DEFAULT_THEME.bg)
 todo_entry.pack(pady=5)
 todo_entry.bind("<Return>", add_task)
 
 todo_frame = tk.Frame(left_frame)
-todo_frame.configure(bg = univ_bg)
+themed(todo_frame, "bg")
 todo_frame.pack(pady=5, fill="both", expand=True)
 
-todo_tasks = []
+# The list is restored from, and written back to, the database in DATA_DIR
+task_store = TaskStore()
+task_table = open_task_table()
+todo_view = TodoCanvas(todo_frame, task_store, bg=theme.bg, fg=theme.text)
+
+# Progress of a running CSV import/export, packed only while a job runs
+csv_frame = themed(tk.Frame(left_frame), "bg")
+csv_progress = ttk.Progressbar(csv_frame, orient="horizontal", mode="determinate", maximum=100)
+csv_progress.pack(side="left", fill="x", expand=True, padx=5)
+tk.Button(csv_frame, text="Cancel", command=cancel_csv_job, font=("Helvetica", 16)).pack(side="left")
 
 # Right column for Scheduler
 right_frame = tk.Frame(main_frame, padx=10, pady=10)
-right_frame.configure(bg = univ_bg)
+themed(right_frame, "bg")
 right_frame.pack(side="right", fill="both", expand=True)
 
 schedule_label = tk.Label(right_frame, text="Schedule", font=("Helvetica", 24, "bold"))
-schedule_label.configure(bg = univ_bg)
+themed(schedule_label, "label")
 schedule_label.pack()
 
 schedule_frame = tk.Frame(right_frame, width=450, height=400, bd=1, relief="solid")
 schedule_frame.pack(pady=5)
-schedule_frame.configure(bg = univ_bg)
-
-schedule_events = []
-
-# Display scheduler time slots
-hours = [f"{h}:00 AM" if h < 12 else f"{h-12}:00 PM" if h >12 else f"12:00 PM" for h in range(8, 20)]
-for idx, hour in enumerate(hours):
-    lbl = tk.Label(schedule_frame, text=hour, anchor="w", font=("Arial", 18), relief="ridge")
-    lbl.configure(bg = schedule_color)
-    lbl.place(relx=0, rely=idx/len(hours), relwidth=0.35, relheight=1/len(hours))
-
-# Add real-time blue line indicator for current time
-time_indicator = tk.Canvas(schedule_frame, height=2, bg = "red")
-time_indicator.config(bg = "red")
-time_indicator.place(relx=0, rely=0, relwidth=1, height=2)
-
-# Start the time tracker
-update_time_indicator()
+themed(schedule_frame, "bg")
+
+# Events are kept in a persistent store with a per-day interval index
+event_store = EventStore()
+event_store.load()
+schedule_engine = ScheduleEngine(event_store)
+day_activity = DayActivity(event_store, task_store)  # per-day counts for the calendar heat map
+schedule_day = datetime.now().date()  # anchor date of the view
+schedule_relayout = None  # pending after() id of a coalesced resize
+schedule_colors = {"slot": theme.slot, "text": theme.text}
+
+# Time slots, events and the red current-time line are all drawn on one canvas
+schedule_canvas = tk.Canvas(schedule_frame, bg=theme.bg, highlightthickness=0)
+schedule_canvas.place(relx=0, rely=0, relwidth=1, relheight=1)
+schedule_canvas.bind("<Configure>", schedule_resized)
+schedule_canvas.tag_bind("event", "<Button-3>", show_event_menu)
+
+# One after() timer, re-armed for each minute boundary, drives everything that follows
+# the clock; it pauses while the window is minimized or withdrawn
+clock = Clock(lambda delay: root.after(delay, clock.tick), root.after_cancel)
+clock.on_day(day_changed)
+clock.on_minute(update_time_indicator)
 
 add_event_btn = tk.Button(right_frame, text="Add Event", command=add_event, font=("Helvetica", 20), )
-add_event_btn.configure(bg = button_color, fg = text_color)
+themed(add_event_btn, "button")
 add_event_btn.pack(pady=5)
 
 # Button to open Notes Window
 notes_btn = tk.Button(root, text="Open Notes", command=open_notes_window, font=("Helvetica", 20))
-notes_btn.configure(bg = button_color, fg = text_color)
+themed(notes_btn, "button")
 notes_btn.pack(pady=5)
 
 
 
 # Add Save and Load Buttons
 button_frame = tk.Frame(root)
-button_frame.configure(bg = univ_bg)
+themed(button_frame, "bg")
 button_frame.pack(pady=5)
 
 save_btn = tk.Button(button_frame, text="Save", command=save_data, font=("Helvetica", 20))
-save_btn.configure(bg = button_color, fg = text_color)
+themed(save_btn, "button")
 save_btn.pack(side="left", padx=10)
 
 load_btn = tk.Button(button_frame, text="Load", command=load_data, font=("Helvetica", 20))
-load_btn.configure(bg = button_color, fg = text_color)
+themed(load_btn, "button")
 load_btn.pack(side="left", padx=10)
 
 # Day/Night Mode Toggle
 theme_switch = tk.BooleanVar(value=False)
 toggle_button = tk.Checkbutton(root, text="Night Mode", variable=theme_switch, command=toggle_theme, font = ("Helvetica", 20))
-toggle_button.configure(bg = button_color, fg = text_color)
+themed(toggle_button, "button")
 toggle_button.pack(pady=10)
 
+# Non-blocking notifications (PDF exports, ...)
+status_label = themed(tk.Label(root, text="", font=("Helvetica", 14), anchor="w"), "label")
+status_label.pack(side="bottom", fill="x", padx=10)
+
+clock.start()
+root.bind("<Map>", window_mapped)
+root.bind("<Unmap>", window_unmapped)
+root.protocol("WM_DELETE_WINDOW", quit_planner)
+
 # Run the application
-root.mainloop()
+if os.environ.get("PLANNER_BENCHMARK"):
+    # startup_benchmark.py: report when the first frame is on screen, then exit
+    root.update()
+    print(f"first-frame {time.time():.6f}", flush=True)
+    quit_planner()
+else:
+    root.mainloop()
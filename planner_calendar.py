@@ -0,0 +1,91 @@
+"""
+Month grids and per-day activity for the calendar of planner.py (Tkinter) and planner-QT.py (PyQt).
+Author: Burhan Sabuwala
+
+Month layouts are computed once and kept in an LRU cache. Per-day counts come from
+aggregates kept up to date as the stores change: events from the event_days table the
+EventStore writes with every event, tasks from a per-day counter updated by the
+TaskStore's notifications. Drawing a month is 42 keyed lookups (plus expanding the few
+recurring events) however many years of history there are, and it never loads a day's
+events into the store's day cache.
+
+This work is licensed under the Creative Commons Attribution-NonCommercial 4.0 International (CC BY-NC 4.0) License.
+https://creativecommons.org/licenses/by-nc/4.0/
+"""
+
+import calendar
+from collections import Counter
+from functools import lru_cache
+
+# Month layouts kept in memory: twenty years of paging back and forth
+MONTH_CACHE_SIZE = 240
+
+# A calendar page always shows six weeks, so its cells never move between months
+GRID_WEEKS = 6
+
+# Activity (events + tasks) from which a day gets each heat level
+HEAT_LEVELS = (1, 2, 4, 7)
+
+# Cell colours for heat levels 0 to len(HEAT_LEVELS)
+HEAT_COLORS = ("#FFFFFF", "#D6F0D8", "#9EDBA4", "#55B662", "#2A7D39")
+
+_calendar = calendar.Calendar()  # weeks start on Monday
+
+
+@lru_cache(maxsize=MONTH_CACHE_SIZE)
+def month_grid(year, month):
+    """Weeks (Monday-Sunday tuples of dates) covering a month, including the adjacent days."""
+    return tuple(tuple(week) for week in _calendar.monthdatescalendar(year, month))
+
+
+@lru_cache(maxsize=MONTH_CACHE_SIZE)
+def page_days(year, month):
+    """The GRID_WEEKS * 7 dates of a month's calendar page, padded with the following week(s)."""
+    days = [day for week in month_grid(year, month) for day in week]
+    while len(days) < GRID_WEEKS * 7:
+        days.append(days[-1] + (days[-1] - days[-2]))
+    return tuple(days)
+
+
+def step_month(year, month, direction):
+    """(year, month) one month before (direction=-1) or after (direction=1)."""
+    month += direction - 1
+    return year + month // 12, month % 12 + 1
+
+
+def heat_level(count):
+    """Index into HEAT_COLORS for a day's activity count."""
+    level = 0
+    for threshold in HEAT_LEVELS:
+        if count >= threshold:
+            level += 1
+    return level
+
+
+class DayActivity:
+    """
+    Per-day counts of events and tasks. Events are counted from the EventStore's per-day
+    count table; tasks by creation date in a counter built once and then updated from the
+    TaskStore's notifications.
+    """
+
+    def __init__(self, event_store, task_store):
+        self.event_store = event_store
+        self.tasks = Counter(task.created for task in task_store)
+        task_store.subscribe(self._tasks_changed)
+
+    def _tasks_changed(self, kind, tasks):
+        if kind in ("clear", "replace"):
+            self.tasks.clear()
+        if kind in ("add", "replace"):
+            self.tasks.update(task.created for task in tasks)
+        elif kind == "remove":
+            self.tasks.subtract(task.created for task in tasks)
+
+    def counts(self, day):
+        """(events, tasks) on a day."""
+        return self.event_store.count_on(day), self.tasks[day]
+
+    def describe(self, day):
+        events, tasks = self.counts(day)
+        return f"{day:%A, %B %d, %Y}: {events} event{'s' * (events != 1)}, {tasks} task{'s' * (tasks != 1)}"
@@ -0,0 +1,76 @@
+"""
+Wall-clock service shared by planner.py (Tkinter) and planner-QT.py (PyQt).
+Author: Burhan Sabuwala
+
+A single one-shot timer is re-armed for the next minute boundary each time it fires, so
+the now-line, the header date and anything else that follows the clock update exactly on
+the minute and at midnight instead of drifting with a free-running 60 s timer. While the
+window is hidden the timer is not armed at all; showing it again catches up immediately.
+
+This work is licensed under the Creative Commons Attribution-NonCommercial 4.0 International (CC BY-NC 4.0) License.
+https://creativecommons.org/licenses/by-nc/4.0/
+"""
+
+from datetime import datetime
+
+# Fire this long after the boundary, so a timer that wakes a little early still lands past it
+CLOCK_SLACK_MS = 5
+
+
+def ms_to_next_minute(now):
+    """Milliseconds from now until just after the next minute boundary."""
+    return (60 - now.second) * 1000 - now.microsecond // 1000 + CLOCK_SLACK_MS
+
+
+class Clock:
+    """
+    Fans one timer out to minute and day subscribers. The toolkit provides the timer:
+    schedule(delay_ms) arms a one-shot that calls tick() and returns a handle, and
+    cancel(handle) disarms it (Tk: root.after/after_cancel, Qt: a single-shot QTimer).
+    """
+
+    def __init__(self, schedule, cancel, now=datetime.now):
+        self._schedule = schedule
+        self._cancel = cancel
+        self._now = now
+        self._minute_callbacks = []  # callback(now)
+        self._day_callbacks = []  # callback(previous day or None, today)
+        self._handle = None
+        self._armed = False
+        self._today = None
+        self.running = False
+
+    def on_minute(self, callback):
+        self._minute_callbacks.append(callback)
+
+    def on_day(self, callback):
+        self._day_callbacks.append(callback)
+
+    def start(self):
+        """Notify subscribers now, then on every boundary. Does nothing if already running."""
+        if not self.running:
+            self.running = True
+            self.tick()
+
+    def pause(self):
+        """Stop waking up until start() is called again."""
+        if self.running:
+            self.running = False
+            if self._armed:
+                self._cancel(self._handle)
+                self._armed = False
+
+    def tick(self):
+        self._armed = False
+        if not self.running:
+            return
+        now = self._now()
+        today = now.date()
+        if today != self._today:
+            previous, self._today = self._today, today
+            for callback in self._day_callbacks:
+                callback(previous, today)
+        for callback in self._minute_callbacks:
+            callback(now)
+        self._handle = self._schedule(ms_to_next_minute(now))
+        self._armed = True
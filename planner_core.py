@@ -0,0 +1,1095 @@
+"""
+Planner data model shared by planner.py (Tkinter) and planner-QT.py (PyQt).
+Author: Burhan Sabuwala
+
+The widgets in either front end only display what is stored here; saving, loading and
+editing tasks never walk the widget tree. Tasks, events and note headers are kept in
+an embedded SQLite database in DATA_DIR, written a row at a time as they change.
+
+This work is licensed under the Creative Commons Attribution-NonCommercial 4.0 International (CC BY-NC 4.0) License.
+https://creativecommons.org/licenses/by-nc/4.0/
+"""
+
+import bisect
+import calendar
+import csv
+import importlib.util
+import itertools
+import json
+import os
+import sqlite3
+import sys
+import threading
+from collections import Counter, OrderedDict
+from datetime import date, datetime, time, timedelta
+
+# Rows are parsed/written in batches of this size so the GUI can update between batches
+CSV_BATCH_SIZE = 2000
+
+# Where the planner keeps its own data (events, indexes, ...)
+DATA_DIR = os.path.join(os.path.expanduser("~"), ".planner")
+
+# Embedded database holding the tasks, events and note headers
+DATABASE_PATH = os.path.join(DATA_DIR, "planner.db")
+
+# Days whose events an EventStore keeps in memory; the least recently used are dropped
+LOADED_DAYS = 400
+
+
+# ----------------------------- Lazy imports -----------------------------#
+def lazy_import(name):
+    """
+    A module that is only executed when one of its attributes is first used, so heavy
+    dependencies needed by a few code paths (numpy) stay off the startup path.
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+
+# ----------------------------- Durable writes -----------------------------#
+def atomic_write(file_path, data, mode='w'):
+    """
+    Replace a file so that a crash leaves either the old or the new version, never a
+    truncated one: write a temporary file, fsync it, rename it over the target.
+    """
+    tmp_path = file_path + ".tmp"
+    with open(tmp_path, mode, **({} if 'b' in mode else {"encoding": "utf-8"})) as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, file_path)
+
+
+class WriteBehind:
+    """
+    Background thread that performs file and database writes off the GUI thread, in
+    submission order. A write submitted under a key replaces one with the same key that
+    has not started yet, so a burst of autosaves of the same file costs a single write.
+    Errors are passed to on_error(message) from the writer thread; on_submit() is called
+    on the submitting thread after each submit, e.g. to watch for errors while writes run.
+    """
+
+    def __init__(self, on_error=None, on_submit=None):
+        self.on_error = on_error
+        self.on_submit = on_submit
+        self._jobs = OrderedDict()  # key -> callable, oldest first
+        self._cond = threading.Condition()
+        self._busy = False
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="planner-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, key, write):
+        with self._cond:
+            self._jobs.pop(key, None)
+            self._jobs[key] = write
+            self._cond.notify()
+        if self.on_submit is not None:
+            self.on_submit()
+
+    def pending(self):
+        """Whether a submitted write has not finished yet."""
+        with self._cond:
+            return bool(self._jobs) or self._busy
+
+    def flush(self):
+        """Block until every submitted write has run."""
+        with self._cond:
+            while self._jobs or self._busy:
+                self._cond.wait()
+
+    def close(self):
+        """Run the remaining writes and stop the thread."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._jobs and not self._closed:
+                    self._cond.wait()
+                if not self._jobs:
+                    return
+                _, write = self._jobs.popitem(last=False)
+                self._busy = True
+            try:
+                write()
+            except (OSError, ValueError, sqlite3.Error) as e:
+                if self.on_error is not None:
+                    self.on_error(str(e))
+            finally:
+                with self._cond:
+                    self._busy = False
+                    self._cond.notify_all()
+
+
+# ----------------------------- Database -----------------------------#
+DATABASE_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS tasks (
+        id INTEGER PRIMARY KEY, text TEXT NOT NULL, completed INTEGER NOT NULL, created TEXT NOT NULL);
+    CREATE INDEX IF NOT EXISTS tasks_completed ON tasks (completed);
+    CREATE INDEX IF NOT EXISTS tasks_created ON tasks (created);
+    CREATE INDEX IF NOT EXISTS tasks_text ON tasks (text);
+
+    CREATE TABLE IF NOT EXISTS events (
+        id INTEGER PRIMARY KEY, title TEXT NOT NULL, start_at TEXT NOT NULL, end_at TEXT NOT NULL, color TEXT NOT NULL);
+    CREATE INDEX IF NOT EXISTS events_start ON events (start_at);
+    CREATE INDEX IF NOT EXISTS events_title ON events (title);
+    CREATE INDEX IF NOT EXISTS events_length ON events (julianday(end_at) - julianday(start_at));
+    CREATE TABLE IF NOT EXISTS event_days (day TEXT PRIMARY KEY, events INTEGER NOT NULL) WITHOUT ROWID;
+
+    CREATE TABLE IF NOT EXISTS rules (
+        id INTEGER PRIMARY KEY, title TEXT NOT NULL, start_at TEXT NOT NULL, end_at TEXT NOT NULL, color TEXT NOT NULL,
+        rrule TEXT NOT NULL, exceptions TEXT NOT NULL);
+
+    CREATE TABLE IF NOT EXISTS note_headers (
+        directory TEXT NOT NULL, name TEXT NOT NULL, mtime_ns INTEGER NOT NULL, size INTEGER NOT NULL,
+        title TEXT, created TEXT, metadata TEXT, PRIMARY KEY (directory, name));
+    CREATE INDEX IF NOT EXISTS note_headers_title ON note_headers (title);
+    CREATE INDEX IF NOT EXISTS note_headers_created ON note_headers (created);
+"""
+
+_connections = threading.local()
+
+
+def connect(path=None):
+    """
+    This thread's connection to the planner database (DATABASE_PATH by default), opened
+    on first use. The database runs in WAL mode, so the writer thread commits while the
+    GUI thread keeps reading, and with synchronous=NORMAL a commit is an append to the
+    log rather than an fsync. Statements are written as module constants so sqlite3's
+    per-connection cache prepares each of them once.
+    """
+    path = os.path.abspath(path or DATABASE_PATH)
+    connections = _connections.__dict__.setdefault("by_path", {})
+    db = connections.get(path)
+    if db is None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        db = sqlite3.connect(path, timeout=10)
+        db.execute("PRAGMA journal_mode = WAL")
+        db.execute("PRAGMA synchronous = NORMAL")
+        db.executescript(DATABASE_SCHEMA)
+        connections[path] = db
+    return db
+
+
+def retire(file_path):
+    """Keep a file the database has taken over as file_path.migrated, so it is not imported twice."""
+    os.replace(file_path, file_path + ".migrated")
+
+
+# ----------------------------- Tasks -----------------------------#
+class Task:
+    """A single to-do item. Slots keep tens of thousands of these cheap."""
+    __slots__ = ("id", "text", "completed", "created")
+
+    def __init__(self, task_id, text, completed=False, created=None):
+        self.id = task_id
+        self.text = text
+        self.completed = completed
+        self.created = created or date.today()
+
+    def __repr__(self):
+        return f"Task({self.id!r}, {self.text!r}, completed={self.completed!r})"
+
+
+class TaskStore:
+    """
+    Ordered collection of tasks indexed by a stable id.
+
+    Lookup, toggle and removal by id are O(1) dict operations. Views that address rows
+    by position use at(); the row order is rebuilt lazily on the first access after a
+    removal, so removing many tasks in a row costs a single re-index.
+    Callbacks registered with subscribe() are called as callback(kind, tasks), where kind
+    is "add", "set" (completion changed), "remove", "clear" or "replace" (the whole list
+    swapped for the tasks passed).
+    """
+
+    def __init__(self):
+        self._tasks = {}  # id -> Task, in display order
+        self._rows = []  # ids in display order, None after a removal
+        self._next_id = 1
+        self._listeners = []
+
+    def subscribe(self, callback):
+        self._listeners.append(callback)
+
+    def _notify(self, kind, tasks):
+        for callback in self._listeners:
+            callback(kind, tasks)
+
+    def __len__(self):
+        return len(self._tasks)
+
+    def __iter__(self):
+        return iter(self._tasks.values())
+
+    def __contains__(self, task_id):
+        return task_id in self._tasks
+
+    def _append(self, text, completed, created):
+        task = Task(self._next_id, text, completed, created)
+        self._next_id += 1
+        self._tasks[task.id] = task
+        if self._rows is not None:
+            self._rows.append(task.id)
+        return task
+
+    def add(self, text, completed=False, created=None):
+        task = self._append(text, completed, created)
+        self._notify("add", [task])
+        return task
+
+    def extend(self, tasks):
+        """Add (text, completed) pairs and return the new Task records."""
+        today = date.today()
+        added = [self._append(text, completed, today) for text, completed in tasks]
+        self._notify("add", added)
+        return added
+
+    def replace(self, tasks):
+        """Swap the whole list for (text, completed) pairs, announced as a single change."""
+        self._tasks.clear()
+        self._rows = []
+        today = date.today()
+        added = [self._append(text, completed, today) for text, completed in tasks]
+        self._notify("replace", added)
+        return added
+
+    def restore(self, task_id, text, completed, created):
+        """Put back a task with a known id (when loading saved state); listeners are not called."""
+        task = Task(task_id, text, completed, created)
+        self._tasks[task_id] = task
+        self._next_id = max(self._next_id, task_id + 1)
+        self._rows = None
+        return task
+
+    def get(self, task_id):
+        return self._tasks[task_id]
+
+    def at(self, row):
+        """Task at a display position."""
+        if self._rows is None:
+            self._rows = list(self._tasks)
+        return self._tasks[self._rows[row]]
+
+    def toggle(self, task_id):
+        task = self._tasks[task_id]
+        task.completed = not task.completed
+        self._notify("set", [task])
+        return task.completed
+
+    def set_completed(self, task_id, completed):
+        task = self._tasks[task_id]
+        task.completed = completed
+        self._notify("set", [task])
+
+    def remove(self, task_id):
+        task = self._tasks.pop(task_id)
+        self._rows = None
+        self._notify("remove", [task])
+        return task
+
+    def clear(self):
+        self._tasks.clear()
+        self._rows = []
+        self._notify("clear", [])
+
+    def snapshot(self):
+        """(text, completed) pairs for every task, safe to hand to another thread."""
+        return [(task.text, task.completed) for task in self._tasks.values()]
+
+
+INSERT_TASK = "INSERT OR REPLACE INTO tasks (id, text, completed, created) VALUES (?, ?, ?, ?)"
+UPDATE_TASK = "UPDATE tasks SET completed = ? WHERE id = ?"
+DELETE_TASK = "DELETE FROM tasks WHERE id = ?"
+CLEAR_TASKS = "DELETE FROM tasks"
+SELECT_TASKS = "SELECT id, text, completed, created FROM tasks ORDER BY id"
+
+
+def read_task_journal(directory):
+    """
+    {id: [text, completed, created]} from the JSON snapshot and change journal that held
+    the to-do list before the database, replaying only entries newer than the snapshot.
+    """
+    tasks = {}
+    seq = 0
+    snapshot_path = os.path.join(directory, "tasks.json")
+    journal_path = os.path.join(directory, "tasks.journal")
+    if os.path.exists(snapshot_path):
+        with open(snapshot_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        seq = data["seq"]
+        tasks = {task_id: [text, completed, created] for task_id, text, completed, created in data["tasks"]}
+    if os.path.exists(journal_path):
+        with open(journal_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    break  # torn final line from a crash mid-append
+                if entry["seq"] <= seq:
+                    continue
+                op = entry["op"]
+                if op == "add":
+                    tasks.update((task_id, [text, completed, created])
+                                 for task_id, text, completed, created in entry["tasks"])
+                elif op == "set":
+                    for task_id, completed in entry["tasks"]:
+                        if task_id in tasks:
+                            tasks[task_id][1] = completed
+                elif op == "remove":
+                    for task_id in entry["ids"]:
+                        tasks.pop(task_id, None)
+                elif op == "clear":
+                    tasks.clear()
+    return tasks
+
+
+class TaskTable:
+    """
+    Write-behind persistence of a TaskStore in the tasks table of the planner database.
+
+    Every change becomes single-row statements (an insert per added task, an update per
+    toggle, a delete per removal) queued on a WriteBehind writer, which runs whatever is
+    queued with executemany in one transaction. Editing one task never rewrites the list.
+    The first time the table is opened, the JSON snapshot and journal of earlier versions
+    are imported and kept as .migrated files.
+    """
+
+    def __init__(self, store, writer, path=None):
+        self.store = store
+        self.writer = writer
+        self.path = path or DATABASE_PATH
+        self._pending = []  # (statement, rows) not yet run by the writer thread
+        self._lock = threading.Lock()
+        self.load()
+        store.subscribe(self._changed)
+
+    def load(self):
+        """Restore the store from the table, in one query."""
+        db = connect(self.path)
+        if db.execute("SELECT NOT EXISTS (SELECT 1 FROM tasks)").fetchone()[0]:
+            self._migrate(db)
+        for task_id, text, completed, created in db.execute(SELECT_TASKS):
+            self.store.restore(task_id, text, bool(completed), date.fromisoformat(created))
+
+    def _migrate(self, db):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        tasks = read_task_journal(directory)
+        with db:
+            db.executemany(INSERT_TASK, [(task_id, text, completed, created)
+                                         for task_id, (text, completed, created) in sorted(tasks.items())])
+        for name in ("tasks.json", "tasks.journal"):
+            if os.path.exists(os.path.join(directory, name)):
+                retire(os.path.join(directory, name))
+
+    def _changed(self, kind, tasks):
+        if kind in ("add", "replace"):
+            rows = [(task.id, task.text, task.completed, task.created.isoformat()) for task in tasks]
+        if kind == "add":
+            changes = [(INSERT_TASK, rows)]
+        elif kind == "set":
+            changes = [(UPDATE_TASK, [(task.completed, task.id) for task in tasks])]
+        elif kind == "remove":
+            changes = [(DELETE_TASK, [(task.id,) for task in tasks])]
+        elif kind == "replace":
+            changes = [(CLEAR_TASKS, [()]), (INSERT_TASK, rows)]  # queued together: one transaction
+        else:
+            changes = [(CLEAR_TASKS, [()])]
+        with self._lock:
+            self._pending.extend(changes)
+        self.writer.submit((self.path, "tasks"), self._write)
+
+    def _write(self):
+        with self._lock:
+            changes, self._pending = self._pending, []
+        if changes:
+            db = connect(self.path)
+            with db:
+                for statement, rows in changes:
+                    db.executemany(statement, rows)
+
+
+# ----------------------------- CSV Import/Export -----------------------------#
+def read_tasks_csv(file_path, batch_size=CSV_BATCH_SIZE):
+    """
+    Stream a to-do CSV ("Completed", "Task" columns) as batches of (text, completed) pairs.
+    Yields (batch, percent) where percent is how much of the file has been read.
+    """
+    total = os.path.getsize(file_path) or 1
+    read = 0
+
+    with open(file_path, 'r', newline='', encoding='utf-8') as file:
+        def lines():
+            nonlocal read
+            for line in file:
+                read += len(line)
+                yield line
+
+        reader = csv.reader(lines())
+        next(reader, None)  # Skip header
+        batch = []
+        for row in reader:
+            if len(row) < 2:
+                continue
+            batch.append((row[1].strip(), row[0].strip().lower() == "yes"))
+            if len(batch) >= batch_size:
+                yield batch, min(99, read * 100 // total)
+                batch = []
+        yield batch, 100
+
+
+def write_tasks_csv(file_path, tasks, batch_size=CSV_BATCH_SIZE):
+    """
+    Write (text, completed) pairs to a to-do CSV, yielding the percent written after each batch.
+    Rows go to a temporary file that replaces the target only once the generator runs to
+    completion; closing it early (to cancel) discards the partial file.
+    """
+    tmp_path = file_path + ".tmp"
+    total = len(tasks) or 1
+    complete = False
+
+    try:
+        with open(tmp_path, 'w', newline='', encoding='utf-8') as file:
+            writer = csv.writer(file)
+            writer.writerow(["Completed", "Task"])
+            for start in range(0, len(tasks), batch_size):
+                batch = tasks[start:start + batch_size]
+                writer.writerows(["Yes" if completed else "No", text] for text, completed in batch)
+                if start + batch_size < len(tasks):
+                    yield (start + len(batch)) * 100 // total
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, file_path)
+        complete = True
+        yield 100
+    finally:
+        if not complete and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+# ----------------------------- Events -----------------------------#
+class Event:
+    """A scheduled block of time. start and end are naive local datetimes."""
+    __slots__ = ("id", "title", "start", "end", "color")
+
+    def __init__(self, event_id, title, start, end, color="lightblue"):
+        self.id = event_id
+        self.title = title
+        self.start = start
+        self.end = end
+        self.color = color
+
+    def __repr__(self):
+        return f"Event({self.id!r}, {self.title!r}, {self.start:%Y-%m-%d %H:%M}-{self.end:%H:%M})"
+
+    def to_dict(self):
+        return {"id": self.id, "title": self.title, "color": self.color,
+                "start": self.start.isoformat(), "end": self.end.isoformat()}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["id"], data["title"], datetime.fromisoformat(data["start"]),
+                   datetime.fromisoformat(data["end"]), data.get("color", "lightblue"))
+
+
+# ----------------------------- Recurring events -----------------------------#
+FREQUENCIES = ("DAILY", "WEEKLY", "MONTHLY")
+WEEKDAY_CODES = ("MO", "TU", "WE", "TH", "FR", "SA", "SU")
+
+# Occurrence ids pack (rule id, date) into one negative int, so they never collide with the
+# ids of stored events; date.toordinal() stays below 2 ** 20 until the year 2870
+_OCCURRENCE_DAY_BITS = 20
+
+
+def occurrence_id(rule_id, day):
+    return -((rule_id << _OCCURRENCE_DAY_BITS) | day.toordinal())
+
+
+def split_occurrence_id(event_id):
+    """(rule id, date) of an occurrence id, or None for the id of a stored event."""
+    if event_id >= 0:
+        return None
+    value = -event_id
+    return value >> _OCCURRENCE_DAY_BITS, date.fromordinal(value & ((1 << _OCCURRENCE_DAY_BITS) - 1))
+
+
+def parse_rrule(text):
+    """
+    Keyword arguments for RecurrenceRule from an iCalendar RRULE value such as
+    "FREQ=WEEKLY;INTERVAL=2;BYDAY=MO,WE;UNTIL=20271231T235959". Parts the planner cannot
+    repeat faithfully (BYMONTHDAY, BYSETPOS, ordinal weekdays, ...) raise ValueError.
+    """
+    parts = dict(part.split("=", 1) for part in text.upper().split(";") if part)
+    freq = parts.pop("FREQ", None)
+    if freq not in FREQUENCIES:
+        raise ValueError(f"Unsupported recurrence frequency {freq!r}")
+    recurrence = {"freq": freq, "interval": int(parts.pop("INTERVAL", 1))}
+    if "BYDAY" in parts:
+        codes = parts.pop("BYDAY").split(",")
+        if freq != "WEEKLY" or any(code not in WEEKDAY_CODES for code in codes):
+            raise ValueError(f"Unsupported BYDAY in {text!r}")
+        recurrence["weekdays"] = [WEEKDAY_CODES.index(code) for code in codes]
+    if "UNTIL" in parts:
+        until = parts.pop("UNTIL")
+        recurrence["until"] = date(int(until[:4]), int(until[4:6]), int(until[6:8]))
+    if "COUNT" in parts:
+        recurrence["count"] = int(parts.pop("COUNT"))
+    parts.pop("WKST", None)  # only matters for BYWEEKNO/weekly rules with BYDAY spanning weeks
+    if parts:
+        raise ValueError(f"Unsupported recurrence parts {sorted(parts)}")
+    return recurrence
+
+
+class RecurrenceRule:
+    """
+    A repeating event, stored as its rule rather than as occurrences. start/end are the
+    first occurrence; it repeats every interval days, weeks (on the given weekdays) or
+    months (on the start's day of the month, skipping months without it) until a date or
+    for a number of occurrences, or forever. As in iCalendar, the start is the first
+    occurrence even when its weekday is not among the weekdays. Dates in exceptions are
+    left out.
+
+    occurrences() only generates the dates that can fall inside the requested window,
+    jumping straight to it instead of stepping from the first occurrence.
+    """
+    __slots__ = ("id", "title", "start", "end", "color", "freq", "interval", "weekdays", "until", "count",
+                 "exceptions", "_last_day")
+
+    def __init__(self, rule_id, title, start, end, color="lightblue", freq="WEEKLY", interval=1, weekdays=(),
+                 until=None, count=None, exceptions=()):
+        if freq not in FREQUENCIES:
+            raise ValueError(f"Unknown recurrence frequency {freq!r}")
+        if interval < 1 or (count is not None and count < 1):
+            raise ValueError("The interval and the number of occurrences must be at least 1.")
+        self.id = rule_id
+        self.title = title
+        self.start = start
+        self.end = end
+        self.color = color
+        self.freq = freq
+        self.interval = interval
+        self.weekdays = tuple(sorted(set(weekdays))) or (start.weekday(),)
+        self.until = until  # date of the last possible occurrence, inclusive
+        self.count = count
+        self.exceptions = set(exceptions)
+        self._last_day = None
+
+    def __repr__(self):
+        return f"RecurrenceRule({self.id!r}, {self.title!r}, {self.rrule()!r})"
+
+    @property
+    def duration(self):
+        return self.end - self.start
+
+    def rrule(self):
+        """The rule as an iCalendar RRULE value."""
+        parts = [f"FREQ={self.freq}"]
+        if self.interval != 1:
+            parts.append(f"INTERVAL={self.interval}")
+        if self.freq == "WEEKLY" and self.weekdays != (self.start.weekday(),):
+            parts.append("BYDAY=" + ",".join(WEEKDAY_CODES[d] for d in self.weekdays))
+        if self.until is not None:
+            # DTSTART is a date-time, so UNTIL must be one too; the end of the day keeps that day's occurrence
+            parts.append(f"UNTIL={self.until:%Y%m%d}T235959")
+        if self.count is not None:
+            parts.append(f"COUNT={self.count}")
+        return ";".join(parts)
+
+    def _days(self, first, last):
+        """Candidate occurrence dates from first to last inclusive, exceptions included, in order."""
+        base = self.start.date()
+        first = max(first, base)
+        if self.freq == "DAILY":
+            steps = -(-(first - base).days // self.interval)  # first step on or after `first`
+            day = base + timedelta(days=steps * self.interval)
+            while day <= last:
+                yield day
+                day += timedelta(days=self.interval)
+        elif self.freq == "WEEKLY":
+            if base.weekday() not in self.weekdays and first == base <= last:
+                yield base  # the start counts even off the rule's weekdays
+            base_monday = base - timedelta(days=base.weekday())
+            weeks = (first - base_monday).days // 7 // self.interval * self.interval
+            monday = base_monday + timedelta(weeks=weeks)
+            while monday <= last:
+                for weekday in self.weekdays:
+                    day = monday + timedelta(days=weekday)
+                    if day > last:
+                        return
+                    if day >= first:
+                        yield day
+                monday += timedelta(weeks=self.interval)
+        else:
+            months = (first.year - base.year) * 12 + first.month - base.month
+            month = base.year * 12 + base.month - 1 + months // self.interval * self.interval
+            while True:
+                year, month_index = divmod(month, 12)
+                if date(year, month_index + 1, 1) > last:
+                    return
+                if base.day <= calendar.monthrange(year, month_index + 1)[1]:
+                    day = date(year, month_index + 1, base.day)
+                    if first <= day <= last:
+                        yield day
+                month += self.interval
+
+    def last_day(self):
+        """Date of the final occurrence, or None if the rule repeats forever."""
+        if self.count is None:
+            return self.until
+        if self._last_day is None:
+            # Occurrences are counted from the start, so this walk is done once per rule
+            for self._last_day in itertools.islice(self._days(self.start.date(), self.until or date.max), self.count):
+                pass
+            if self._last_day is None:
+                self._last_day = self.start.date() - timedelta(days=1)  # until falls before the start
+        return self._last_day
+
+    def overlaps(self, start, end):
+        """Whether any occurrence could overlap [start, end), judging by the rule's span only."""
+        if self.start >= end:
+            return False
+        last = self.last_day()
+        return last is None or datetime.combine(last, self.start.time()) + self.duration > start
+
+    def occurrences(self, start, end):
+        """Occurrences overlapping [start, end) as Events, in start order, generated lazily."""
+        duration = self.duration
+        first = (start - duration).date() if start - datetime.min > duration else date.min
+        last = (end - timedelta(microseconds=1)).date()
+        final = self.last_day()
+        if final is not None:
+            last = min(last, final)
+        for day in self._days(first, last):
+            if day in self.exceptions:
+                continue
+            occurrence_start = datetime.combine(day, self.start.time())
+            occurrence_end = occurrence_start + duration
+            if occurrence_start < end and occurrence_end > start:
+                yield Event(occurrence_id(self.id, day), self.title, occurrence_start, occurrence_end, self.color)
+
+    def to_dict(self):
+        return {"id": self.id, "title": self.title, "color": self.color,
+                "start": self.start.isoformat(), "end": self.end.isoformat(), "rrule": self.rrule(),
+                "exceptions": sorted(day.isoformat() for day in self.exceptions)}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["id"], data["title"], datetime.fromisoformat(data["start"]),
+                   datetime.fromisoformat(data["end"]), data.get("color", "lightblue"),
+                   exceptions=[date.fromisoformat(day) for day in data.get("exceptions", ())],
+                   **parse_rrule(data["rrule"]))
+
+
+class DayIndex:
+    """
+    Interval index over the events touching one day.
+
+    Events are kept sorted by start time. Overlap queries walk that array as an implicit
+    balanced tree where each midpoint stores the latest end time in its subtree, so a
+    query visits O(log n + k) nodes. The max-end array is rebuilt lazily after changes.
+    """
+    __slots__ = ("events", "_keys", "_max_end")
+
+    def __init__(self):
+        self.events = []  # sorted by (start, id)
+        self._keys = []
+        self._max_end = None
+
+    def __len__(self):
+        return len(self.events)
+
+    def add(self, event):
+        key = (event.start, event.id)
+        i = bisect.bisect_left(self._keys, key)
+        self._keys.insert(i, key)
+        self.events.insert(i, event)
+        self._max_end = None
+
+    def remove(self, event):
+        i = bisect.bisect_left(self._keys, (event.start, event.id))
+        if i < len(self._keys) and self._keys[i][1] == event.id:
+            del self._keys[i]
+            del self.events[i]
+            self._max_end = None
+
+    def _build(self, lo, hi):
+        mid = (lo + hi) // 2
+        latest = self.events[mid].end
+        if lo < mid:
+            latest = max(latest, self._build(lo, mid))
+        if mid + 1 < hi:
+            latest = max(latest, self._build(mid + 1, hi))
+        self._max_end[mid] = latest
+        return latest
+
+    def overlapping(self, start, end):
+        """Events with start < end and end > start, in start order."""
+        if not self.events:
+            return []
+        if self._max_end is None:
+            self._max_end = [None] * len(self.events)
+            self._build(0, len(self.events))
+
+        found = []
+        events, max_end = self.events, self._max_end
+
+        def visit(lo, hi):
+            if lo >= hi:
+                return
+            mid = (lo + hi) // 2
+            if max_end[mid] <= start:
+                return  # nothing in this subtree ends after the window opens
+            visit(lo, mid)
+            event = events[mid]
+            if event.start < end:
+                if event.end > start:
+                    found.append(event)
+                visit(mid + 1, hi)  # later starts can only matter if this one was in range
+
+        visit(0, len(events))
+        return found
+
+
+INSERT_EVENT = "INSERT OR REPLACE INTO events (id, title, start_at, end_at, color) VALUES (?, ?, ?, ?, ?)"
+DELETE_EVENT = "DELETE FROM events WHERE id = ?"
+SELECT_EVENT = "SELECT id, title, start_at, end_at, color FROM events WHERE id = ?"
+SELECT_EVENTS = "SELECT id, title, start_at, end_at, color FROM events ORDER BY start_at, id"
+# Events overlapping [start, end); the lower bound on start_at keeps the query on the index
+SELECT_OVERLAPPING = ("SELECT id, title, start_at, end_at, color FROM events "
+                      "WHERE start_at >= ? AND start_at < ? AND end_at > ?")
+# Per-day event counts, kept in step with the events table for the calendar heat map
+ADD_DAY_COUNT = ("INSERT INTO event_days (day, events) VALUES (?, ?) "
+                 "ON CONFLICT (day) DO UPDATE SET events = events + excluded.events")
+SELECT_DAY_COUNT = "SELECT events FROM event_days WHERE day = ?"
+SELECT_SPANS = "SELECT start_at, end_at FROM events"
+NEEDS_DAY_COUNTS = "SELECT EXISTS (SELECT 1 FROM events) AND NOT EXISTS (SELECT 1 FROM event_days)"
+SELECT_LONGEST = "SELECT MAX(julianday(end_at) - julianday(start_at)) FROM events"  # answered by events_length
+SELECT_LAST_ID = "SELECT MAX(id) FROM (SELECT MAX(id) AS id FROM events UNION ALL SELECT MAX(id) FROM rules)"
+INSERT_RULE = ("INSERT OR REPLACE INTO rules (id, title, start_at, end_at, color, rrule, exceptions) "
+               "VALUES (?, ?, ?, ?, ?, ?, ?)")
+DELETE_RULE = "DELETE FROM rules WHERE id = ?"
+SELECT_RULES = "SELECT id, title, start_at, end_at, color, rrule, exceptions FROM rules"
+
+
+def _event_row(event):
+    return event.id, event.title, event.start.isoformat(), event.end.isoformat(), event.color
+
+
+def _day_counts(events, sign=1):
+    """ADD_DAY_COUNT rows adding sign for every day each event touches."""
+    counts = Counter(day for event in events for day in EventStore.days_of(event))
+    return [(day.isoformat(), sign * count) for day, count in counts.items()]
+
+
+def _rule_row(rule):
+    return (rule.id, rule.title, rule.start.isoformat(), rule.end.isoformat(), rule.color, rule.rrule(),
+            ",".join(sorted(day.isoformat() for day in rule.exceptions)))
+
+
+class EventStore:
+    """
+    Scheduled events, kept in the events table of the planner database and loaded one day
+    at a time: a day's events are read with one indexed query when the day is shown and
+    stay indexed by day while it is among the LOADED_DAYS most recently used. Only the
+    events of those days are kept in memory (an event spanning midnight is indexed under
+    every loaded day it touches), so neither startup nor an import depends on how much
+    history there is. The event_days table counts the events touching each day, written
+    in the same transaction as the events, so a calendar page never loads a day.
+    Recurring events are kept as RecurrenceRules (all loaded, there are few) and expanded
+    only for the days queried. Each change is written at once as a single-row statement.
+    Callbacks registered with subscribe() are called as callback("add" | "remove", event),
+    or callback("rule", rule) when a recurring event is added, removed or skips a date.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or DATABASE_PATH
+        self.db = None
+        self._events = {}  # id -> Event, for the events of the loaded days
+        self._refs = {}  # id -> number of loaded days holding the event
+        self._rules = {}  # id -> RecurrenceRule, sharing the events' id sequence
+        self._days = OrderedDict()  # date -> DayIndex of the loaded days, least recently used first
+        self._longest = timedelta(0)  # no stored event lasts longer
+        self._next_id = 1
+        self._listeners = []
+
+    def subscribe(self, callback):
+        self._listeners.append(callback)
+
+    def _notify(self, kind, event):
+        for callback in self._listeners:
+            callback(kind, event)
+
+    def __len__(self):
+        return self.db.execute("SELECT COUNT(*) FROM events").fetchone()[0]
+
+    def __iter__(self):
+        """Every stored event in start order, read from the database without being kept."""
+        for row in self.db.execute(SELECT_EVENTS):
+            yield self._event(row)
+
+    def _event(self, row):
+        """The Event for a row, reusing the one in memory so a loaded event has a single object."""
+        event = self._events.get(row[0])
+        if event is None:
+            event_id, title, start, end, color = row
+            event = Event(event_id, title, datetime.fromisoformat(start), datetime.fromisoformat(end), color)
+        return event
+
+    def _hold(self, event, index):
+        """Index an event under a loaded day, keeping it in memory while any loaded day holds it."""
+        index.add(event)
+        self._events[event.id] = event
+        self._refs[event.id] = self._refs.get(event.id, 0) + 1
+
+    def _release(self, event):
+        refs = self._refs[event.id] - 1
+        if refs:
+            self._refs[event.id] = refs
+        else:
+            del self._refs[event.id]
+            del self._events[event.id]
+
+    def get(self, event_id):
+        occurrence = split_occurrence_id(event_id)
+        if occurrence is None:
+            if event_id not in self._events:
+                row = self.db.execute(SELECT_EVENT, (event_id,)).fetchone()
+                if row is None:
+                    raise KeyError(event_id)
+                return self._event(row)
+            return self._events[event_id]
+        rule_id, day = occurrence
+        start = datetime.combine(day, self._rules[rule_id].start.time())
+        for event in self._rules[rule_id].occurrences(start, start + timedelta(microseconds=1)):
+            if event.id == event_id:
+                return event
+        raise KeyError(event_id)
+
+    @property
+    def rules(self):
+        return list(self._rules.values())
+
+    def rule_of(self, event_id):
+        """The RecurrenceRule an occurrence id belongs to, or None for a stored event."""
+        occurrence = split_occurrence_id(event_id)
+        return self._rules.get(occurrence[0]) if occurrence else None
+
+    @staticmethod
+    def days_of(event):
+        """Every date an event touches."""
+        day = event.start.date()
+        last = (event.end - timedelta(microseconds=1)).date()
+        while day <= last:
+            yield day
+            day += timedelta(days=1)
+
+    def _day(self, day):
+        """The DayIndex of a date, reading its events from the database unless the day is loaded."""
+        index = self._days.get(day)
+        if index is not None:
+            self._days.move_to_end(day)
+            return index
+        index = DayIndex()
+        start, end = day_span(day)
+        earliest = start - self._longest if start - datetime.min > self._longest else datetime.min
+        for row in self.db.execute(SELECT_OVERLAPPING, (earliest.isoformat(), end.isoformat(), start.isoformat())):
+            self._hold(self._event(row), index)
+        self._days[day] = index
+        if len(self._days) > LOADED_DAYS:
+            _, dropped = self._days.popitem(last=False)
+            for event in dropped.events:
+                self._release(event)
+        return index
+
+    def _index(self, event):
+        """Index a new event under the days already loaded; the others read it when they load."""
+        self._next_id = max(self._next_id, event.id + 1)
+        self._longest = max(self._longest, event.end - event.start)
+        for day in self.days_of(event):
+            if day in self._days:
+                self._hold(event, self._days[day])
+
+    def add(self, title, start, end, color="lightblue"):
+        if end <= start:
+            raise ValueError("End time must be after start time.")
+        event = Event(self._next_id, title, start, end, color)
+        with self.db:
+            self.db.execute(INSERT_EVENT, _event_row(event))
+            self.db.executemany(ADD_DAY_COUNT, _day_counts([event]))
+        self._index(event)
+        self._notify("add", event)
+        return event
+
+    def add_rule(self, title, start, end, color="lightblue", **recurrence):
+        """Add a recurring event; recurrence holds RecurrenceRule's freq, interval, weekdays, until and count."""
+        if end <= start:
+            raise ValueError("End time must be after start time.")
+        rule = RecurrenceRule(self._next_id, title, start, end, color, **recurrence)
+        with self.db:
+            self.db.execute(INSERT_RULE, _rule_row(rule))
+        self._index_rule(rule)
+        self._notify("rule", rule)
+        return rule
+
+    def extend(self, items):
+        """
+        Add a batch of Events and RecurrenceRules, e.g. from an import, in one transaction.
+        Items without an id get the next free one. A (rule, date) pair leaves that date out
+        of a rule added by an earlier batch, so an importer never has to change a rule
+        after handing it over.
+        """
+        events, rules, changed = [], [], {}
+        for item in items:
+            if isinstance(item, tuple):
+                rule, day = item
+                if self._rules.get(rule.id) is rule:  # not removed since it was imported
+                    rule.exceptions.add(day)
+                    changed[rule.id] = rule
+                continue
+            if item.id is None:
+                item.id = self._next_id
+                self._next_id += 1
+            (rules if isinstance(item, RecurrenceRule) else events).append(item)
+        with self.db:
+            self.db.executemany(INSERT_EVENT, [_event_row(event) for event in events])
+            self.db.executemany(ADD_DAY_COUNT, _day_counts(events))
+            self.db.executemany(INSERT_RULE, [_rule_row(rule) for rule in rules + list(changed.values())])
+        for event in events:
+            self._index(event)
+            self._notify("add", event)
+        for rule in rules:
+            self._index_rule(rule)
+            self._notify("rule", rule)
+        for rule in changed.values():
+            self._notify("rule", rule)
+
+    def snapshot(self):
+        """Copies of every event and recurring event, safe to read from another thread."""
+        items = list(self)
+        items.extend(RecurrenceRule.from_dict(rule.to_dict()) for rule in self._rules.values())
+        return items
+
+    def _index_rule(self, rule):
+        self._rules[rule.id] = rule
+        self._next_id = max(self._next_id, rule.id + 1)
+
+    def skip_occurrence(self, event_id):
+        """Leave one occurrence out of its recurring event."""
+        rule_id, day = split_occurrence_id(event_id)
+        rule = self._rules[rule_id]
+        rule.exceptions.add(day)
+        with self.db:
+            self.db.execute(INSERT_RULE, _rule_row(rule))
+        self._notify("rule", rule)
+
+    def remove(self, event_id):
+        """Remove an event, or a recurring event with all its occurrences."""
+        if event_id in self._rules:
+            with self.db:
+                self.db.execute(DELETE_RULE, (event_id,))
+            rule = self._rules.pop(event_id)
+            self._notify("rule", rule)
+            return rule
+        event = self.get(event_id)
+        with self.db:
+            self.db.execute(DELETE_EVENT, (event_id,))
+            self.db.executemany(ADD_DAY_COUNT, _day_counts([event], -1))
+        for day in self.days_of(event):
+            if day in self._days:
+                self._days[day].remove(event)
+                self._release(event)
+        self._notify("remove", event)
+        return event
+
+    def occurrences(self, start, end):
+        """Occurrences of recurring events overlapping [start, end); rules outside it are not expanded."""
+        for rule in self._rules.values():
+            if rule.overlaps(start, end):
+                yield from rule.occurrences(start, end)
+
+    def count_on(self, day):
+        """Number of events touching a day, from the per-day counts rather than the events."""
+        row = self.db.execute(SELECT_DAY_COUNT, (day.isoformat(),)).fetchone()
+        count = row[0] if row else 0
+        if self._rules:
+            count += sum(1 for _ in self.occurrences(*day_span(day)))
+        return count
+
+    def on_day(self, day):
+        """Events touching a day, in start order."""
+        events = list(self._day(day).events)
+        if self._rules:
+            events.extend(self.occurrences(*day_span(day)))
+            events.sort(key=lambda e: (e.start, e.id))
+        return events
+
+    def between(self, start, end):
+        """Events overlapping [start, end), in start order."""
+        found = {event.id: event for event in self.occurrences(start, end)}
+        day = start.date()
+        while day <= (end - timedelta(microseconds=1)).date():
+            for event in self._day(day).overlapping(start, end):
+                found[event.id] = event
+            day += timedelta(days=1)
+        return sorted(found.values(), key=lambda e: (e.start, e.id))
+
+    def conflicts(self, start, end, ignore_id=None):
+        """Events that would overlap a new event from start to end."""
+        return [e for e in self.between(start, end) if e.id != ignore_id]
+
+    def load(self):
+        """
+        Open the database and read what every view needs: the recurring events, the next
+        free id and the longest event's length. Events themselves are read per day. The
+        first time, the events.json of earlier versions is imported and kept as .migrated.
+        """
+        self.db = connect(self.path)
+        legacy_path = os.path.join(os.path.dirname(os.path.abspath(self.path)), "events.json")
+        if os.path.exists(legacy_path) and self.db.execute(SELECT_LAST_ID).fetchone()[0] is None:
+            with open(legacy_path, 'r', encoding='utf-8') as f:
+                records = json.load(f)
+            with self.db:
+                self.db.executemany(INSERT_EVENT, [_event_row(Event.from_dict(data))
+                                                   for data in records if "rrule" not in data])
+                self.db.executemany(INSERT_RULE, [_rule_row(RecurrenceRule.from_dict(data))
+                                                  for data in records if "rrule" in data])
+            retire(legacy_path)
+        if self.db.execute(NEEDS_DAY_COUNTS).fetchone()[0]:
+            # Databases written before the per-day counts existed get them once
+            spans = [Event(None, "", datetime.fromisoformat(start), datetime.fromisoformat(end))
+                     for start, end in self.db.execute(SELECT_SPANS)]
+            with self.db:
+                self.db.executemany(ADD_DAY_COUNT, _day_counts(spans))
+
+        for rule_id, title, start, end, color, rrule, exceptions in self.db.execute(SELECT_RULES):
+            skipped = [date.fromisoformat(day) for day in exceptions.split(",") if day]
+            self._index_rule(RecurrenceRule(rule_id, title, datetime.fromisoformat(start), datetime.fromisoformat(end),
+                                            color, exceptions=skipped, **parse_rrule(rrule)))
+        last_id = self.db.execute(SELECT_LAST_ID).fetchone()[0]
+        self._next_id = max(self._next_id, (last_id or 0) + 1)
+        longest = self.db.execute(SELECT_LONGEST).fetchone()[0]
+        if longest is not None:
+            # julianday() is a float; the extra second keeps rounding from hiding the longest event
+            self._longest = max(self._longest, timedelta(days=longest, seconds=1))
+
+
+def at_time(day, hour, minute=0):
+    """datetime for a wall-clock time on a given date."""
+    return datetime.combine(day, time(hour, minute))
+
+
+def day_span(day):
+    """(midnight, next midnight) of a date."""
+    start = datetime.combine(day, time())
+    return start, start + timedelta(days=1)
@@ -0,0 +1,209 @@
+"""
+Background PDF export of Markdown notes, shared by planner.py (Tkinter) and planner-QT.py (PyQt).
+Author: Burhan Sabuwala
+
+Conversions run outside the GUI thread, a few at a time. Saving a note again while its
+conversion is still waiting is a no-op, and saving it while it converts queues exactly one
+more run, so a burst of saves never stacks up pandoc processes for the same file.
+Rendered PDFs are also kept in a content-addressed cache, so saving a note whose text has
+not changed (only its "Last Modified" line) copies the previous PDF instead of running pandoc.
+
+This work is licensed under the Creative Commons Attribution-NonCommercial 4.0 International (CC BY-NC 4.0) License.
+https://creativecommons.org/licenses/by-nc/4.0/
+"""
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import time
+from collections import OrderedDict
+
+from planner_core import DATA_DIR
+
+# Conversions allowed to run at the same time; each one is a full pandoc/LaTeX process
+MAX_EXPORT_WORKERS = 2
+
+# "pandoc" converts through pandoc/LaTeX in a separate process; "qt" is planner-QT.py's
+# in-process renderer, which needs no external binary
+BACKENDS = ("qt", "pandoc")
+
+# Rendered PDFs kept in the cache before the least recently used one is evicted
+RENDER_CACHE_SIZE = 64
+
+# The save timestamp changes on every save without changing what pandoc renders
+LAST_MODIFIED_RE = re.compile(r"^Last Modified: .*\n", re.MULTILINE)
+
+
+def pdf_path_for(md_path):
+    return os.path.splitext(md_path)[0] + ".pdf"
+
+
+def pandoc_command(md_path, pdf_path):
+    return ["pandoc", md_path, "-o", pdf_path]
+
+
+class ExportJob:
+    """One Markdown -> PDF conversion."""
+    __slots__ = ("source", "target", "backend", "command", "rerun", "key", "started", "cached")
+
+    def __init__(self, source, target, backend="pandoc"):
+        self.source = source
+        self.target = target
+        self.backend = backend
+        self.command = pandoc_command(source, target) if backend == "pandoc" else None
+        self.rerun = False  # the source was saved again while this job was running
+        self.key = None  # render cache key, taken just before the job starts
+        self.started = None
+        self.cached = False  # the PDF was copied from the render cache
+
+    def __repr__(self):
+        return f"ExportJob({self.source!r} -> {self.target!r})"
+
+
+class RenderCache:
+    """
+    Rendered PDFs stored under a hash of what the converter would see: the note with its
+    "Last Modified" line removed (so the title and body) and the conversion options.
+    Bounded to max_entries files with least-recently-used eviction. Hit/miss counts and
+    the conversion time avoided are kept in the index next to the files.
+    """
+
+    def __init__(self, directory=None, max_entries=RENDER_CACHE_SIZE):
+        self.directory = directory or os.path.join(DATA_DIR, "pdf_cache")
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> seconds the conversion took
+        self.hits = 0
+        self.misses = 0
+        self.seconds_saved = 0.0
+        self.load()
+
+    @staticmethod
+    def key(job):
+        with open(job.source, 'rb') as f:
+            content = f.read().decode('utf-8', errors='replace')
+        options = [job.backend] + [arg for arg in job.command or () if arg not in (job.source, job.target)]
+        digest = hashlib.sha256()
+        digest.update("\0".join(options + [os.path.splitext(job.target)[1]]).encode('utf-8'))
+        digest.update(LAST_MODIFIED_RE.sub("", content, count=1).encode('utf-8'))
+        return digest.hexdigest()
+
+    def _file(self, key):
+        return os.path.join(self.directory, key + ".pdf")
+
+    def restore(self, key, target):
+        """Copy a cached render to target. Returns False (a miss) when there is none."""
+        seconds = self._entries.get(key)
+        if seconds is None or not os.path.exists(self._file(key)):
+            self.misses += 1
+            self.save()
+            return False
+        shutil.copyfile(self._file(key), target)
+        self._entries.move_to_end(key)
+        self.hits += 1
+        self.seconds_saved += seconds
+        self.save()
+        return True
+
+    def store(self, key, target, seconds):
+        os.makedirs(self.directory, exist_ok=True)
+        shutil.copyfile(target, self._file(key))
+        self._entries[key] = seconds
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            old, _ = self._entries.popitem(last=False)
+            if os.path.exists(self._file(old)):
+                os.remove(self._file(old))
+        self.save()
+
+    def stats(self):
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses,
+                "seconds_saved": self.seconds_saved}
+
+    def summary(self):
+        return f"PDF cache: {self.hits} hits, {self.misses} misses, {self.seconds_saved:.1f} s of conversion saved"
+
+    def load(self):
+        path = os.path.join(self.directory, "index.json")
+        if not os.path.exists(path):
+            return
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        self._entries = OrderedDict(data["entries"])
+        self.hits = data["hits"]
+        self.misses = data["misses"]
+        self.seconds_saved = data["seconds_saved"]
+
+    def save(self):
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, "index.json")
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"entries": list(self._entries.items()), "hits": self.hits,
+                       "misses": self.misses, "seconds_saved": self.seconds_saved}, f)
+        os.replace(tmp_path, path)
+
+
+class ExportQueue:
+    """
+    Bounded queue of conversions, keyed by source file.
+
+    The front end supplies launch(job), which must start the conversion without blocking
+    and arrange for finished(job, error) to be called on the GUI thread once it exits.
+    notify(job, error) is then called with error None on success or a message on failure.
+    With a RenderCache, jobs whose render is cached complete at once without launching.
+    """
+
+    def __init__(self, launch, notify, max_workers=MAX_EXPORT_WORKERS, cache=None, backend="pandoc"):
+        self.launch = launch
+        self.notify = notify
+        self.max_workers = max_workers
+        self.cache = cache
+        self.backend = backend  # used for jobs submitted without one
+        self._pending = OrderedDict()  # source -> job waiting for a worker
+        self._running = {}  # source -> job being converted
+
+    def __len__(self):
+        return len(self._pending) + len(self._running)
+
+    def submit(self, source, target=None):
+        """Queue a conversion of source, coalescing with one already queued or running."""
+        running = self._running.get(source)
+        if running is not None:
+            running.rerun = True
+        elif source not in self._pending:
+            self._pending[source] = ExportJob(source, target or pdf_path_for(source), self.backend)
+        self._start_next()
+
+    def finished(self, job, error=None):
+        del self._running[job.source]
+        if job.rerun and job.source not in self._pending:
+            # The file changed mid-conversion; convert the latest version
+            self._pending[job.source] = ExportJob(job.source, job.target, job.backend)
+        else:
+            if error is None and self.cache is not None and job.key is not None:
+                try:
+                    self.cache.store(job.key, job.target, time.monotonic() - job.started)
+                except OSError:
+                    pass  # the PDF was written; only caching it failed
+            self.notify(job, error)
+        self._start_next()
+
+    def _start_next(self):
+        while self._pending and len(self._running) < self.max_workers:
+            source, job = self._pending.popitem(last=False)
+            if self.cache is not None and self._restore(job):
+                self.notify(job, None)
+                continue
+            job.started = time.monotonic()
+            self._running[source] = job
+            self.launch(job)
+
+    def _restore(self, job):
+        try:
+            job.key = self.cache.key(job)
+            job.cached = self.cache.restore(job.key, job.target)
+        except OSError:
+            job.key = None  # unreadable source or cache; let pandoc report it
+        return job.cached
@@ -0,0 +1,295 @@
+"""
+Streaming iCalendar (.ics) import and export for the schedule of planner.py (Tkinter) and planner-QT.py (PyQt).
+Author: Burhan Sabuwala
+
+Files are read one unfolded content line at a time and events are handed out in batches,
+so a server export with hundreds of thousands of VEVENTs is imported in bounded memory
+with progress reporting. Only the current event and the UIDs of recurring events are kept
+while reading. Exports are written event by event to a temporary file that replaces the
+target once complete.
+
+This work is licensed under the Creative Commons Attribution-NonCommercial 4.0 International (CC BY-NC 4.0) License.
+https://creativecommons.org/licenses/by-nc/4.0/
+"""
+
+import os
+import re
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+
+from planner_core import Event, RecurrenceRule, parse_rrule
+
+# Events are handed to the GUI in batches of this size
+ICS_BATCH_SIZE = 2000
+
+# Length given to events without an end (or ending when they start), so they can be drawn and clicked
+ZERO_LENGTH_MINUTES = 15
+
+# Content lines are folded at 75 octets (RFC 5545, 3.1)
+FOLD_OCTETS = 75
+
+# Properties read from a VEVENT; the rest (DESCRIPTION, ATTENDEE, ...) are skipped without parsing
+EVENT_PROPERTIES = {"BEGIN", "END", "UID", "DTSTART", "DTEND", "DURATION", "SUMMARY", "COLOR", "RRULE", "EXDATE",
+                    "RECURRENCE-ID"}
+
+NAME_RE = re.compile(r"[^;:]*")
+DURATION_RE = re.compile(r"([+-])?P(?:(\d+)W)?(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?)?$")
+UNESCAPE_RE = re.compile(r"\\([\\;,nN])")
+
+
+# ----------------------------- Reading -----------------------------#
+def unfold_lines(file):
+    """
+    Logical content lines of a binary .ics file, with the folds removed. Yields
+    (line, bytes read so far) so callers can report progress.
+    """
+    read = 0
+    pending = None
+    for raw in file:
+        read += len(raw)
+        raw = raw.rstrip(b"\r\n")
+        if raw[:1] in (b" ", b"\t"):
+            if pending is not None:
+                pending += raw[1:]
+            continue
+        if pending is not None:
+            yield pending.decode("utf-8", "replace"), read
+        pending = raw
+    if pending is not None:
+        yield pending.decode("utf-8", "replace"), read
+
+
+def parse_content_line(line):
+    """(NAME, {PARAM: value}, value) of a content line such as DTSTART;TZID=Europe/Paris:20261018T090000."""
+    if '"' not in line:
+        head, _, value = line.partition(":")
+        name, *params = head.split(";")
+    else:
+        # Quoted parameter values may contain ':' and ';'
+        quoted = False
+        split_at = len(line)
+        params, start = [], 0
+        for i, char in enumerate(line):
+            if char == '"':
+                quoted = not quoted
+            elif not quoted and char in ";:":
+                params.append(line[start:i])
+                start = i + 1
+                if char == ":":
+                    split_at = i
+                    break
+        name, *params = params or [line]
+        value = line[split_at + 1:]
+    return name.upper(), dict(_split_param(param) for param in params), value
+
+
+def _split_param(param):
+    key, _, value = param.partition("=")
+    return key.upper(), value.strip('"')
+
+
+def unescape_text(value):
+    return UNESCAPE_RE.sub(lambda m: "\n" if m.group(1) in "nN" else m.group(1), value)
+
+
+@lru_cache(maxsize=64)
+def _zone(tzid):
+    """The tzinfo for a TZID, or None when it is unknown here (the time is then taken as local)."""
+    try:
+        from zoneinfo import ZoneInfo
+        return ZoneInfo(tzid)
+    except (ImportError, KeyError, ValueError):
+        return None
+
+
+def parse_datetime(value, params):
+    """(naive local datetime, is_date) of a DATE or DATE-TIME value in UTC, a TZID zone or floating time."""
+    if params.get("VALUE") == "DATE" or len(value) == 8:
+        return datetime(int(value[:4]), int(value[4:6]), int(value[6:8])), True
+    if len(value) < 15 or value[8] != "T":
+        raise ValueError(f"Invalid date-time {value!r}")
+    moment = datetime(int(value[:4]), int(value[4:6]), int(value[6:8]),
+                      int(value[9:11]), int(value[11:13]), int(value[13:15]))
+    if value.endswith("Z"):
+        zone = timezone.utc
+    else:
+        zone = _zone(params["TZID"]) if "TZID" in params else None
+    if zone is not None:
+        moment = moment.replace(tzinfo=zone).astimezone().replace(tzinfo=None)
+    return moment, False
+
+
+def parse_duration(value):
+    match = DURATION_RE.match(value)
+    if not match:
+        raise ValueError(f"Invalid duration {value!r}")
+    sign, weeks, days, hours, minutes, seconds = match.groups()
+    duration = timedelta(weeks=int(weeks or 0), days=int(days or 0), hours=int(hours or 0),
+                         minutes=int(minutes or 0), seconds=int(seconds or 0))
+    return -duration if sign == "-" else duration
+
+
+def _build(properties):
+    """An Event or RecurrenceRule (with id None) from one VEVENT's properties, or None if it has no start."""
+    if "DTSTART" not in properties:
+        return None
+    params, value = properties["DTSTART"]
+    start, is_date = parse_datetime(value, params)
+    if "DTEND" in properties:
+        end = parse_datetime(properties["DTEND"][1], properties["DTEND"][0])[0]
+    elif "DURATION" in properties:
+        end = start + parse_duration(properties["DURATION"][1])
+    else:
+        end = start + timedelta(days=1) if is_date else start
+    if end <= start:
+        end = start + timedelta(minutes=ZERO_LENGTH_MINUTES)
+
+    title = unescape_text(properties["SUMMARY"][1]) if "SUMMARY" in properties else "(no title)"
+    color = properties["COLOR"][1] if "COLOR" in properties else "lightblue"
+    if "RRULE" in properties:
+        try:
+            recurrence = parse_rrule(properties["RRULE"][1])
+        except ValueError:
+            recurrence = None  # a pattern the planner cannot repeat: keep the first occurrence
+        if recurrence is not None:
+            exceptions = [parse_datetime(day, params)[0].date()
+                          for params, value in properties.get("EXDATE", ()) for day in value.split(",") if day]
+            return RecurrenceRule(None, title, start, end, color, exceptions=exceptions, **recurrence)
+    return Event(None, title, start, end, color)
+
+
+def read_ics(file_path, batch_size=ICS_BATCH_SIZE):
+    """
+    Stream the VEVENTs of an .ics file as batches of Events and RecurrenceRules (ids None).
+    Yields (batch, percent) where percent is how much of the file has been read.
+
+    A modified occurrence (RECURRENCE-ID) becomes an event of its own and an exception
+    of its recurring event. A rule is never changed once its batch has been handed out
+    (the GUI thread owns it from then on): an exception found later is added to the
+    batch as a (rule, date) pair for EventStore.extend() to apply.
+    """
+    total = os.path.getsize(file_path) or 1
+    rules = {}  # UID -> RecurrenceRule, the only state kept across events
+    overridden = {}  # UID -> dates of modified occurrences whose rule has not been read yet
+    unsent = set()  # UIDs of the rules in the batch being filled
+    batch = []
+    properties = None
+    depth = 0  # nesting inside the current VEVENT (VALARM, ...)
+
+    with open(file_path, 'rb') as file:
+        for line, read in unfold_lines(file):
+            if properties is None:
+                if line.upper() == "BEGIN:VEVENT":
+                    properties, depth = {}, 0
+                continue
+            if NAME_RE.match(line).group().upper() not in EVENT_PROPERTIES:
+                continue
+            name, params, value = parse_content_line(line)
+            if name == "BEGIN":
+                depth += 1
+            elif name == "END" and depth:
+                depth -= 1
+            elif name == "END":
+                day = None
+                try:
+                    item = _build(properties)
+                    if "RECURRENCE-ID" in properties:
+                        day = parse_datetime(properties["RECURRENCE-ID"][1], properties["RECURRENCE-ID"][0])[0].date()
+                except ValueError:
+                    item = None  # malformed dates: skip the event, not the file
+                uid = properties.get("UID", (None, None))[1]
+                if item is not None:
+                    if day is not None:
+                        rule = rules.get(uid)
+                        if rule is None:
+                            overridden.setdefault(uid, set()).add(day)
+                        elif uid in unsent:
+                            rule.exceptions.add(day)
+                        else:
+                            batch.append((rule, day))
+                    elif isinstance(item, RecurrenceRule) and uid is not None:
+                        rules[uid] = item
+                        unsent.add(uid)
+                        item.exceptions.update(overridden.pop(uid, ()))
+                    batch.append(item)
+                properties = None
+                if len(batch) >= batch_size:
+                    yield batch, min(99, read * 100 // total)
+                    batch = []
+                    unsent = set()
+            elif depth == 0:
+                if name == "EXDATE":
+                    properties.setdefault(name, []).append((params, value))
+                else:
+                    properties.setdefault(name, (params, value))
+    yield batch, 100
+
+
+# ----------------------------- Writing -----------------------------#
+def escape_text(value):
+    return (value.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,")
+            .replace("\r\n", "\\n").replace("\n", "\\n"))
+
+
+def fold(line):
+    """A content line as CRLF-terminated bytes, folded at FOLD_OCTETS without splitting a UTF-8 character."""
+    data = line.encode("utf-8")
+    if len(data) <= FOLD_OCTETS:
+        return data + b"\r\n"
+    parts = []
+    limit = FOLD_OCTETS
+    while len(data) > limit:
+        cut = limit
+        while data[cut] & 0xC0 == 0x80:  # continuation byte: back up to the character start
+            cut -= 1
+        parts.append(data[:cut])
+        data = data[cut:]
+        limit = FOLD_OCTETS - 1  # continuation lines start with a space
+    parts.append(data)
+    return b"\r\n ".join(parts) + b"\r\n"
+
+
+def _vevent(item, stamp):
+    """Content lines of one Event or RecurrenceRule. Times are written as floating local time."""
+    lines = ["BEGIN:VEVENT", f"UID:planner-{item.id}@planner", f"DTSTAMP:{stamp}",
+             f"DTSTART:{item.start:%Y%m%dT%H%M%S}", f"DTEND:{item.end:%Y%m%dT%H%M%S}",
+             f"SUMMARY:{escape_text(item.title)}", f"COLOR:{item.color}"]
+    if isinstance(item, RecurrenceRule):
+        lines.append(f"RRULE:{item.rrule()}")
+        if item.exceptions:
+            at = item.start.time()
+            lines.append("EXDATE:" + ",".join(f"{datetime.combine(day, at):%Y%m%dT%H%M%S}"
+                                              for day in sorted(item.exceptions)))
+    lines.append("END:VEVENT")
+    return b"".join(fold(line) for line in lines)
+
+
+def write_ics(file_path, items, batch_size=ICS_BATCH_SIZE):
+    """
+    Write Events and RecurrenceRules to an .ics file, yielding the percent written after
+    each batch. Events go to a temporary file that replaces the target only once the
+    generator runs to completion; closing it early (to cancel) discards the partial file.
+    """
+    tmp_path = file_path + ".tmp"
+    total = len(items) or 1
+    stamp = f"{datetime.now(timezone.utc):%Y%m%dT%H%M%SZ}"
+    complete = False
+
+    try:
+        with open(tmp_path, 'wb') as file:
+            file.write(b"".join(fold(line) for line in
+                                ("BEGIN:VCALENDAR", "VERSION:2.0", "PRODID:-//Planner//Planner//EN", "CALSCALE:GREGORIAN")))
+            for start in range(0, len(items), batch_size):
+                batch = items[start:start + batch_size]
+                file.write(b"".join(_vevent(item, stamp) for item in batch))
+                if start + batch_size < len(items):
+                    yield (start + len(batch)) * 100 // total
+            file.write(fold("END:VCALENDAR"))
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, file_path)
+        complete = True
+        yield 100
+    finally:
+        if not complete and os.path.exists(tmp_path):
+            os.remove(tmp_path)
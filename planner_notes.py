@@ -0,0 +1,796 @@
+"""
+Markdown notes shared by planner.py (Tkinter) and planner-QT.py (PyQt).
+Author: Burhan Sabuwala
+
+A note is a Markdown file that starts with a small front-matter header:
+
+    ---
+    Title: ...
+    Date Created: YYYY-MM-DD HH:MM:SS
+    Last Modified: YYYY-MM-DD HH:MM:SS
+    ---
+
+Headers are read line by line up to the closing "---", never the body, and the planner
+database keeps an index of every directory's note headers keyed on file mtime and size,
+so saving or listing notes does not re-read files that have not changed.
+
+Large notes are read in chunks, and huge ones through a memory map (MappedNote) that
+only decodes the lines on screen, so opening a log of tens of megabytes stays cheap.
+
+Autosaves of an open note go through a NoteJournal: only the changed span of the body is
+appended to a journal, and the writer thread compacts the journal into the note with
+one atomic rewrite once it grows or the note is closed. A journal left by a crash is
+replayed into its note when the notes editor is next opened.
+
+A NoteLibrary adds full-text search over a directory tree of notes with an SQLite FTS5
+index, ranked by bm25 and updated incrementally on a worker thread: only new or changed
+files are re-read.
+
+This work is licensed under the Creative Commons Attribution-NonCommercial 4.0 International (CC BY-NC 4.0) License.
+https://creativecommons.org/licenses/by-nc/4.0/
+"""
+
+import hashlib
+import itertools
+import json
+import mmap
+import os
+import re
+import sqlite3
+import threading
+import zlib
+from datetime import datetime
+
+from planner_core import DATA_DIR, DATABASE_PATH, atomic_write, connect, lazy_import
+
+np = lazy_import("numpy")
+
+FRONT_MATTER_FENCE = "---"
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Default notes library and the search database kept at its root
+NOTES_DIR = os.path.join(DATA_DIR, "notes")
+LIBRARY_DB_NAME = ".planner-library.sqlite"
+
+# Changed notes re-read per step of a library sync, each step written in one transaction
+REINDEX_BATCH = 200
+
+# How often an open library rescans its directory for changed files
+LIBRARY_SCAN_INTERVAL_MS = 10000
+
+# Quiet time after the last keystroke before an open note is saved in the background
+AUTOSAVE_DELAY_MS = 2000
+
+# Autosave journals of open notes, one per note, replayed if the planner stops before compacting
+JOURNAL_DIR = os.path.join(DATA_DIR, "journals")
+
+# Edits journaled for a note before the writer compacts them into one rewrite of the note
+JOURNAL_COMPACT_BYTES = 256 << 10
+
+# Notes from this size open in large-file mode: a plain editor filled in chunks, no preview
+LARGE_NOTE_BYTES = 1 << 20
+
+# Notes from this size are memory-mapped and edited a page at a time
+HUGE_NOTE_BYTES = 32 << 20
+
+# Characters inserted into the editor per event-loop turn while a large note loads
+LOAD_CHUNK_CHARS = 256 << 10
+
+# Lines held by the editor at a time while paging through a huge note
+PAGE_LINES = 2000
+
+# Bytes of a mapped note scanned for line breaks per numpy pass, bounding temporary memory
+SCAN_CHUNK_BYTES = 8 << 20
+
+FIELD_RE = re.compile(r"([^:]+):[ \t]*(.*)")
+WORD_RE = re.compile(r"\w+")
+
+# Highlighter state carried from one line to the next: outside code or inside a fence
+STATE_TEXT, STATE_BACKTICK_FENCE, STATE_TILDE_FENCE = 0, 1, 2
+FENCE_STATES = {"```": STATE_BACKTICK_FENCE, "~~~": STATE_TILDE_FENCE}
+
+HEADING_RE = re.compile(r" {0,3}#{1,6}(?:[ \t]|$)")
+QUOTE_RE = re.compile(r" {0,3}>")
+LIST_RE = re.compile(r"([ \t]*)(?:[-*+]|\d{1,9}[.)])(?=[ \t])")
+INLINE_RE = re.compile(
+    r"(?P<code>(?P<ticks>`+).+?(?P=ticks))"
+    r"|(?P<link>\[[^\]]*\]\([^)]*\))"
+    r"|(?P<bold>(?P<strong>\*\*|__)(?=\S).+?(?<=\S)(?P=strong))"
+    r"|(?P<italic>(?<![*_\w])(?P<em>[*_])(?=[^\s*_]).*?(?<=[^\s*_])(?P=em)(?![*_\w]))")
+
+# How each kind of highlighted span is drawn, shared by both editors
+MARKDOWN_STYLES = {
+    "heading": {"color": "#1f5fa8", "bold": True},
+    "bold": {"bold": True},
+    "italic": {"italic": True},
+    "code": {"color": "#b3401a", "monospace": True},
+    "link": {"color": "#1a7f37", "underline": True},
+    "quote": {"color": "#6a737d", "italic": True},
+    "list": {"color": "#d4741c", "bold": True},
+}
+
+
+# ----------------------------- Front matter -----------------------------#
+def _parse_field(line, metadata):
+    match = FIELD_RE.match(line)
+    if match:
+        metadata[match.group(1).strip()] = match.group(2).strip()
+
+
+def _read_header(lines):
+    """Parse front matter from an iterator of lines, consuming only the header."""
+    if next(lines, "").rstrip("\r\n") != FRONT_MATTER_FENCE:
+        return None
+    metadata = {}
+    for line in lines:
+        line = line.rstrip("\r\n")
+        if line == FRONT_MATTER_FENCE:
+            return metadata
+        _parse_field(line, metadata)
+    return None  # the header was never closed
+
+
+def read_front_matter(file_path):
+    """
+    Header fields of a note as a dict, reading only up to the closing fence.
+    Missing keys are simply absent; returns None when the file has no front matter.
+    """
+    with open(file_path, 'r', encoding='utf-8') as f:
+        return _read_header(iter(f.readline, ""))
+
+
+def split_front_matter(content):
+    """(metadata or None, body) for the full text of a note."""
+    lines = content.split("\n")
+    if lines[0].rstrip("\r") != FRONT_MATTER_FENCE:
+        return None, content
+    metadata = {}
+    for i in range(1, len(lines)):
+        line = lines[i].rstrip("\r")
+        if line == FRONT_MATTER_FENCE:
+            return metadata, "\n".join(lines[i + 1:])
+        _parse_field(line, metadata)
+    return None, content
+
+
+def format_note(metadata, body):
+    header = "\n".join(f"{key}: {value}" for key, value in metadata.items())
+    return f"{FRONT_MATTER_FENCE}\n{header}\n{FRONT_MATTER_FENCE}\n\n{body}\n"
+
+
+def markdown_blocks(text):
+    """
+    Split Markdown into top-level blocks at blank lines, keeping fenced code blocks whole.
+    Each block renders on its own, so a preview only has to re-render the blocks an edit touched.
+    """
+    blocks = []
+    current = []
+    fence = None
+    for line in text.split("\n"):
+        stripped = line.lstrip()
+        if fence is not None:
+            current.append(line)
+            if stripped.startswith(fence):
+                blocks.append("\n".join(current))
+                current = []
+                fence = None
+            continue
+        if stripped.startswith("```") or stripped.startswith("~~~"):
+            if current:
+                blocks.append("\n".join(current))
+            current = [line]
+            fence = stripped[:3]
+        elif stripped:
+            current.append(line)
+        elif current:
+            blocks.append("\n".join(current))
+            current = []
+    if current:
+        blocks.append("\n".join(current))
+    return blocks
+
+
+def markdown_spans(line, state=STATE_TEXT):
+    """
+    Highlighted spans of one line of Markdown as (start, length, kind) triples, plus the
+    state to carry into the next line. Only fenced code blocks span lines, so a line's
+    highlighting depends on nothing but its own text and the state at its start.
+    """
+    stripped = line.lstrip()
+    fence = FENCE_STATES.get(stripped[:3])
+    if state != STATE_TEXT:
+        return ([(0, len(line), "code")] if line else []), (STATE_TEXT if fence == state else state)
+    if fence is not None and len(line) - len(stripped) < 4:
+        return [(0, len(line), "code")], fence
+    if HEADING_RE.match(line):
+        return [(0, len(line), "heading")], STATE_TEXT
+
+    spans = []
+    if QUOTE_RE.match(line):
+        spans.append((0, len(line), "quote"))
+    else:
+        match = LIST_RE.match(line)
+        if match:
+            spans.append((match.end(1), match.end() - match.end(1), "list"))
+    if "`" in line or "*" in line or "_" in line or "[" in line:
+        for match in INLINE_RE.finditer(line):
+            spans.append((match.start(), match.end() - match.start(), match.lastgroup))
+    return spans, STATE_TEXT
+
+
+# ----------------------------- Header index -----------------------------#
+INSERT_NOTE_HEADER = ("INSERT OR REPLACE INTO note_headers (directory, name, mtime_ns, size, title, created, metadata) "
+                      "VALUES (?, ?, ?, ?, ?, ?, ?)")
+DELETE_NOTE_HEADER = "DELETE FROM note_headers WHERE directory = ? AND name = ?"
+SELECT_NOTE_HEADERS = "SELECT name, mtime_ns, size, metadata FROM note_headers WHERE directory = ?"
+
+
+class NoteIndex:
+    """
+    Front matter of the notes in one directory, cached in the note_headers table of the
+    planner database. An entry is reused while the file's (mtime, size) is unchanged;
+    otherwise only the header is re-read. Saving upserts or deletes just the entries that
+    changed, in one transaction, and is skipped when nothing changed.
+    """
+
+    def __init__(self, directory, path=None):
+        self.directory = directory
+        self.path = path or DATABASE_PATH
+        self._entries = {}  # file name -> [mtime_ns, size, metadata or None]
+        self._dirty = set()  # names whose entry changed or went away since the last save
+        self.load()
+
+    def metadata(self, file_path, stat=None):
+        """Header of a note in this directory, read from disk only if the file changed."""
+        name = os.path.basename(file_path)
+        stat = stat or os.stat(file_path)
+        entry = self._entries.get(name)
+        if entry is not None and entry[0] == stat.st_mtime_ns and entry[1] == stat.st_size:
+            return entry[2]
+        metadata = read_front_matter(file_path)
+        self._entries[name] = [stat.st_mtime_ns, stat.st_size, metadata]
+        self._dirty.add(name)
+        return metadata
+
+    def record(self, file_path, metadata):
+        """Remember the header of a note that was just written."""
+        stat = os.stat(file_path)
+        name = os.path.basename(file_path)
+        self._entries[name] = [stat.st_mtime_ns, stat.st_size, metadata]
+        self._dirty.add(name)
+        self.save()
+
+    def load(self):
+        try:
+            rows = connect(self.path).execute(SELECT_NOTE_HEADERS, (self.directory,))
+            self._entries = {name: [mtime_ns, size, json.loads(metadata)] for name, mtime_ns, size, metadata in rows}
+        except (sqlite3.Error, ValueError):
+            self._entries = {}  # unreadable index; it is rebuilt from the headers
+
+    def save(self):
+        if not self._dirty:
+            return
+        names, self._dirty = self._dirty, set()
+        upserts, deletes = [], []
+        for name in names:
+            entry = self._entries.get(name)
+            if entry is None:
+                deletes.append((self.directory, name))
+            else:
+                metadata = entry[2] or {}
+                upserts.append((self.directory, name, entry[0], entry[1], metadata.get("Title"),
+                                metadata.get("Date Created"), json.dumps(entry[2])))
+        try:
+            db = connect(self.path)
+            with db:
+                db.executemany(INSERT_NOTE_HEADER, upserts)
+                db.executemany(DELETE_NOTE_HEADER, deletes)
+        except sqlite3.Error:
+            self._dirty |= names  # the index stays in memory and is written next time
+
+
+_indexes = {}  # directory -> NoteIndex
+
+
+def note_index(directory):
+    directory = os.path.abspath(directory)
+    index = _indexes.get(directory)
+    if index is None:
+        index = _indexes[directory] = NoteIndex(directory)
+    return index
+
+
+def note_metadata(file_path):
+    """Header of a note via its directory's index, or None without front matter."""
+    return note_index(os.path.dirname(os.path.abspath(file_path))).metadata(file_path)
+
+
+# ----------------------------- Reading and saving -----------------------------#
+def read_note(file_path):
+    """(metadata or None, body) of a note."""
+    with open(file_path, 'r', encoding='utf-8') as f:
+        metadata, body = split_front_matter(f.read())
+    return metadata, body.strip()
+
+
+def note_content(file_path, title, body):
+    """
+    (metadata, text) of a note about to be saved, keeping Date Created (and the title,
+    when none is given) from the existing header.
+    """
+    now = datetime.now().strftime(TIMESTAMP_FORMAT)
+    old = (note_metadata(file_path) if os.path.exists(file_path) else None) or {}
+    metadata = {
+        "Title": title or old.get("Title") or "Untitled",
+        "Date Created": old.get("Date Created") or now,
+        "Last Modified": now,
+    }
+    return metadata, format_note(metadata, body)
+
+
+def read_note_chunks(file_path, chunk_size=LOAD_CHUNK_CHARS):
+    """
+    (metadata or None, chunks) of a note, where chunks yields the body chunk_size
+    characters at a time, so a large note is never held as one string before display.
+    """
+    f = open(file_path, 'r', encoding='utf-8')
+    try:
+        metadata = _read_header(iter(f.readline, ""))
+        if metadata is None:
+            f.seek(0)
+    except (OSError, UnicodeDecodeError):
+        f.close()
+        raise
+
+    def chunks():
+        with f:
+            leading = True
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    return
+                if leading:
+                    chunk = chunk.lstrip()  # same body as read_note()
+                    leading = not chunk
+                if chunk:
+                    yield chunk
+
+    return metadata, chunks()
+
+
+def _piece_lines(piece):
+    return piece[1] - piece[0] if isinstance(piece, tuple) else len(piece)
+
+
+def _cut(piece, start, stop):
+    """Lines start to stop of a MappedNote piece, as a new piece."""
+    return (piece[0] + start, piece[0] + stop) if isinstance(piece, tuple) else piece[start:stop]
+
+
+class MappedNote:
+    """
+    Memory-mapped huge note, addressed by line and edited a page of lines at a time.
+
+    Line starts are found with numpy a few megabytes at a time, costing 8 bytes per line;
+    the text itself stays in the page cache and a page of lines is decoded only when shown.
+    Edits are kept as a piece table: the body is a list of pieces that are either a
+    (first, last) range of mapped lines or a list of edited lines, so memory grows with
+    the edited pages only. Pieces are never changed in place, which lets the writer
+    thread save the list it was handed while editing goes on.
+    """
+
+    def __init__(self, file_path):
+        self.path = file_path
+        with open(file_path, 'rb') as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.metadata, body_start = self._header()
+        self.starts = self._line_starts(body_start)
+        self.pieces = [(0, len(self.starts))]
+        self._length = len(self.starts)
+
+    def _header(self):
+        lines = iter(lambda: self.map.readline().decode('utf-8', errors='replace'), "")
+        metadata = _read_header(lines)
+        start = self.map.tell() if metadata is not None else 0
+        while start < len(self.map) and self.map[start] in (10, 13):
+            start += 1  # blank lines before the body, as read_note() strips them
+        return metadata, start
+
+    def _line_starts(self, body_start):
+        data = np.frombuffer(self.map, np.uint8)
+        starts = [np.array([body_start], np.int64)]
+        for offset in range(body_start, len(data), SCAN_CHUNK_BYTES):
+            breaks = np.flatnonzero(data[offset:offset + SCAN_CHUNK_BYTES] == 10)
+            starts.append(breaks + (offset + 1))
+        del data  # the mapping cannot be closed while an array still points into it
+        starts = np.concatenate(starts)
+        return starts[:-1] if starts[-1] >= len(self.map) and len(starts) > 1 else starts
+
+    def __len__(self):
+        return self._length
+
+    @property
+    def size(self):
+        return len(self.map)
+
+    def _span(self, first, last):
+        """Byte range of mapped lines first to last (exclusive), without the final line break."""
+        end = self.starts[last] - 1 if last < len(self.starts) else len(self.map)
+        if last == len(self.starts) and end > self.starts[first] and self.map[end - 1] == 10:
+            end -= 1
+        return self.starts[first], end
+
+    def _slices(self, first, last):
+        """(piece, start, stop) for the parts of the pieces covering lines first to last."""
+        offset = 0
+        for piece in self.pieces:
+            if offset >= last:
+                return
+            count = _piece_lines(piece)
+            if offset + count > first:
+                yield piece, max(first - offset, 0), min(last - offset, count)
+            offset += count
+
+    def lines(self, first, last):
+        """Text of lines first to last (exclusive), without the final line break."""
+        parts = []
+        for piece, start, stop in self._slices(first, min(last, self._length)):
+            if isinstance(piece, tuple):
+                begin, end = self._span(piece[0] + start, piece[0] + stop)
+                parts.append(self.map[begin:end].decode('utf-8', errors='replace'))
+            else:
+                parts.append("\n".join(piece[start:stop]))
+        return "\n".join(parts)
+
+    def replace(self, first, last, text):
+        """Replace lines first to last (exclusive) with text. Returns the number of lines it became."""
+        new = text.split("\n")
+        before = [_cut(piece, start, stop) for piece, start, stop in self._slices(0, first)]
+        after = [_cut(piece, start, stop) for piece, start, stop in self._slices(last, self._length)]
+        self.pieces = before + [new] + after
+        self._length += len(new) - (last - first)
+        return len(new)
+
+    def write(self, file_path, metadata, pieces=None):
+        """
+        Atomically write the note with a new header, copying unedited lines straight from
+        the mapping. pieces is a list taken earlier from self.pieces, when saving a snapshot.
+        """
+        tmp_path = file_path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(format_note(metadata, "")[:-1].encode('utf-8'))
+            separator = b""
+            for piece in self.pieces if pieces is None else pieces:
+                f.write(separator)
+                separator = b"\n"
+                if isinstance(piece, tuple):
+                    begin, end = self._span(*piece)
+                    for offset in range(begin, end, SCAN_CHUNK_BYTES):
+                        f.write(self.map[offset:min(end, offset + SCAN_CHUNK_BYTES)])
+                else:
+                    f.write("\n".join(piece).encode('utf-8'))
+            f.write(b"\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, file_path)
+
+    def close(self):
+        self.map.close()
+
+
+def write_note(file_path, metadata, content):
+    """Atomically replace a note and record its header in the directory index."""
+    atomic_write(file_path, content)
+    note_index(os.path.dirname(os.path.abspath(file_path))).record(file_path, metadata)
+
+
+def save_note(file_path, title, body):
+    """Write a note now. Returns the metadata written."""
+    metadata, content = note_content(file_path, title, body)
+    write_note(file_path, metadata, content)
+    return metadata
+
+
+def save_mapped_note(file_path, title, note):
+    """save_note() for a MappedNote: its body is streamed from the mapping and its edits."""
+    metadata, _ = note_content(file_path, title, "")
+    note.write(file_path, metadata)
+    note_index(os.path.dirname(os.path.abspath(file_path))).record(file_path, metadata)
+    return metadata
+
+
+# ----------------------------- Autosave journal -----------------------------#
+_journal_lock = threading.Lock()  # one replay at a time, from the writer or the GUI thread
+_journal_keys = itertools.count()
+_open_journals = set()  # notes with a NoteJournal that has not been closed, never replayed
+
+
+def journal_path(file_path):
+    name = hashlib.sha1(os.path.abspath(file_path).encode('utf-8')).hexdigest()
+    return os.path.join(JOURNAL_DIR, name + ".journal")
+
+
+def _changed_span(old, new):
+    """(start, old_end, new_end) of the single span where two texts differ, by bisecting on slices."""
+    limit = min(len(old), len(new))
+    lo, hi = 0, limit
+    while lo < hi:  # longest common prefix
+        mid = (lo + hi + 1) // 2
+        if old[:mid] == new[:mid]:
+            lo = mid
+        else:
+            hi = mid - 1
+    start = lo
+    lo, hi = 0, limit - start
+    while lo < hi:  # longest common suffix that does not overlap it
+        mid = (lo + hi + 1) // 2
+        if old[len(old) - mid:] == new[len(new) - mid:]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return start, len(old) - lo, len(new) - lo
+
+
+def _journal_header(file_path, body):
+    stat = os.stat(file_path)
+    return {"path": os.path.abspath(file_path), "mtime_ns": stat.st_mtime_ns, "size": stat.st_size,
+            "crc": zlib.crc32(body.encode('utf-8'))}
+
+
+class NoteJournal:
+    """
+    Autosaves of one open note. record() is called on the GUI thread with the whole body
+    but queues only the span that changed since the previous autosave; the writer thread
+    appends those spans to the note's journal and fsyncs it. Once JOURNAL_COMPACT_BYTES
+    have been journaled, or when the note is closed, the writer rewrites the note
+    atomically and deletes the journal. A journal only starts over a note file that
+    still holds the text the edits apply to; otherwise the writer rewrites the note.
+    """
+
+    def __init__(self, writer, file_path, body):
+        self.writer = writer
+        self.path = file_path
+        self.body = body  # text as of the last record(), GUI side
+        self.metadata = None
+        self._logged = 0  # bytes journaled since the last compaction
+        self._key = ("journal", next(_journal_keys))
+        self._lock = threading.Lock()
+        self._pending = []
+        self._base = body  # text of the note file, writer side
+        self._open = False  # whether the journal has its header, writer side
+        with _journal_lock:
+            _open_journals.add(os.path.abspath(file_path))
+
+    def record(self, metadata, body):
+        start, old_end, new_end = _changed_span(self.body, body)
+        self.body, self.metadata = body, metadata
+        self._logged += new_end - start + 200  # span plus the header fields around it
+        if self._logged > JOURNAL_COMPACT_BYTES:
+            self._logged = 0
+            self._queue(("compact", metadata, body))
+        else:
+            self._queue(("edit", metadata, body, start, old_end, body[start:new_end]))
+
+    def close(self, compact=True):
+        """Stop journaling: compact what was journaled, or drop it when the note was just saved in full."""
+        if compact and self._logged:
+            self._queue(("compact", self.metadata, self.body))
+        else:
+            self._queue(("drop",))
+        self._queue(("closed",))
+        self._logged = 0
+
+    def _queue(self, change):
+        with self._lock:
+            self._pending.append(change)
+        self.writer.submit(self._key, self._write)
+
+    def _write(self):
+        with self._lock:
+            changes, self._pending = self._pending, []
+        path = journal_path(self.path)
+        lines = []
+        for change in changes:
+            if change[0] == "closed":
+                with _journal_lock:
+                    _open_journals.discard(os.path.abspath(self.path))
+                continue
+            if change[0] == "edit":
+                _, metadata, body, start, end, text = change
+                if not self._open:
+                    try:
+                        _, disk_body = read_note(self.path)
+                        self._open = disk_body == self._base
+                        if self._open:
+                            lines.append(json.dumps(_journal_header(self.path, disk_body)))
+                    except (OSError, ValueError):
+                        pass
+                if self._open:
+                    lines.append(json.dumps({"meta": metadata, "at": [start, end], "text": text}))
+                    continue
+                change = ("compact", metadata, body)  # the file changed under the journal
+            lines = []  # a compaction or a save in full supersedes what was journaled
+            if change[0] == "compact":
+                atomic_write(self.path, format_note(change[1], change[2]))
+                self._base = change[2]
+            if os.path.exists(path):
+                os.remove(path)
+            self._open = False
+        if lines:
+            os.makedirs(JOURNAL_DIR, exist_ok=True)
+            with open(path, 'a', encoding='utf-8') as f:
+                f.write("\n".join(lines) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+
+def recover_note(file_path):
+    """
+    Replay a journal left by a crash into its note. A journal whose note changed since
+    it was started is dropped, and so is a last entry cut short. The journal of a note
+    open in an editor is left alone. Returns whether the note was rewritten.
+    """
+    path = journal_path(file_path)
+    with _journal_lock:
+        if os.path.abspath(file_path) in _open_journals:
+            return False
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                lines = f.read().split("\n")
+        except FileNotFoundError:
+            return False
+        changed = False
+        try:
+            metadata, body = read_note(file_path)
+            if json.loads(lines[0]) == _journal_header(file_path, body):
+                for line in lines[1:]:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        break  # the write the crash interrupted
+                    start, end = entry["at"]
+                    body = body[:start] + entry["text"] + body[end:]
+                    metadata, changed = entry["meta"], True
+        except (OSError, ValueError):
+            changed = False
+        if changed:
+            atomic_write(file_path, format_note(metadata, body))
+        os.remove(path)
+        return changed
+
+
+def recover_notes():
+    """Replay every journal left behind, e.g. on the writer thread at startup."""
+    try:
+        names = [name for name in os.listdir(JOURNAL_DIR) if name.endswith(".journal")]
+    except FileNotFoundError:
+        return
+    for name in names:
+        try:
+            with open(os.path.join(JOURNAL_DIR, name), 'r', encoding='utf-8') as f:
+                file_path = json.loads(f.readline())["path"]
+        except (OSError, ValueError, KeyError):
+            os.remove(os.path.join(JOURNAL_DIR, name))
+            continue
+        recover_note(file_path)
+
+
+# ----------------------------- Library search -----------------------------#
+def fts_query(text):
+    """FTS5 query matching every word of free text as a prefix, so typing never hits query syntax."""
+    return " ".join(f'"{word}"*' for word in WORD_RE.findall(text))
+
+
+def scan_library(directory):
+    """{relative path: (mtime_ns, size)} of every .md note below a directory, skipping hidden folders."""
+    found = {}
+    for folder, dirs, files in os.walk(directory):
+        dirs[:] = [d for d in dirs if not d.startswith(".")]
+        for name in files:
+            if not name.endswith(".md"):
+                continue
+            path = os.path.join(folder, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            found[os.path.relpath(path, directory)] = (stat.st_mtime_ns, stat.st_size)
+    return found
+
+
+def _library_row(directory, relative):
+    """(relative, mtime_ns, size, title, created, body) of a note to index, or None if it cannot be read."""
+    path = os.path.join(directory, relative)
+    try:
+        stat = os.stat(path)
+        metadata, body = read_note(path)
+    except (OSError, UnicodeDecodeError):
+        return None
+    metadata = metadata or {}
+    return (relative, stat.st_mtime_ns, stat.st_size,
+            metadata.get("Title", os.path.splitext(os.path.basename(path))[0]), metadata.get("Date Created", ""), body)
+
+
+class NoteLibrary:
+    """
+    Full-text index over every .md note below a directory.
+
+    sync() walks the tree, compares file (mtime, size) with the index, drops deleted notes
+    and re-reads new or changed ones in batches, one transaction each. The front ends run
+    it on a worker thread with a library opened there; the database is in WAL mode, so
+    the dialog's own library keeps answering search() while a sync writes. search()
+    ranks matches with bm25, weighting the title above the body.
+    """
+
+    def __init__(self, directory=None):
+        self.directory = os.path.abspath(directory or NOTES_DIR)
+        os.makedirs(self.directory, exist_ok=True)
+        self.db = sqlite3.connect(os.path.join(self.directory, LIBRARY_DB_NAME), timeout=10)
+        self.db.execute("PRAGMA journal_mode = WAL")
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS files (
+                id INTEGER PRIMARY KEY, path TEXT UNIQUE NOT NULL, mtime_ns INTEGER, size INTEGER);
+            CREATE VIRTUAL TABLE IF NOT EXISTS notes USING fts5(
+                title, created, body, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3');
+        """)
+
+    def __len__(self):
+        return self.db.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+
+    def close(self):
+        self.db.close()
+
+    def sync(self, batch_size=REINDEX_BATCH):
+        """
+        Bring the index up to date, yielding how many changed notes are still to be read
+        after each committed step. Yields nothing when the index was already current.
+        """
+        known = {path: (mtime, size) for path, mtime, size in self.db.execute("SELECT path, mtime_ns, size FROM files")}
+        stale = [relative for relative, key in scan_library(self.directory).items()
+                 if known.pop(relative, None) != key]
+        if not known and not stale:
+            return
+        with self.db:
+            for relative in known:  # deleted since the last sync
+                row = self.db.execute("SELECT id FROM files WHERE path = ?", (relative,)).fetchone()
+                self.db.execute("DELETE FROM notes WHERE rowid = ?", row)
+                self.db.execute("DELETE FROM files WHERE id = ?", row)
+        yield len(stale)
+        for start in range(0, len(stale), batch_size):
+            rows = [_library_row(self.directory, relative) for relative in stale[start:start + batch_size]]
+            with self.db:
+                for row in rows:
+                    if row is not None:
+                        self._index(*row)
+            yield max(0, len(stale) - start - batch_size)
+
+    def _index(self, relative, mtime_ns, size, title, created, body):
+        row = self.db.execute("SELECT id FROM files WHERE path = ?", (relative,)).fetchone()
+        if row is None:
+            note_id = self.db.execute("INSERT INTO files (path, mtime_ns, size) VALUES (?, ?, ?)",
+                                      (relative, mtime_ns, size)).lastrowid
+        else:
+            note_id = row[0]
+            self.db.execute("UPDATE files SET mtime_ns = ?, size = ? WHERE id = ?", (mtime_ns, size, note_id))
+            self.db.execute("DELETE FROM notes WHERE rowid = ?", (note_id,))
+        self.db.execute("INSERT INTO notes (rowid, title, created, body) VALUES (?, ?, ?, ?)",
+                        (note_id, title, created, body))
+
+    def refresh(self):
+        """Bring the whole index up to date in one go."""
+        for _ in self.sync():
+            pass
+
+    def search(self, text, limit=100):
+        """(path, title, created, snippet) of the best matches for free text, best first."""
+        query = fts_query(text)
+        if not query:
+            return []
+        rows = self.db.execute("""
+            SELECT files.path, notes.title, notes.created, snippet(notes, 2, '[', ']', '...', 12)
+            FROM notes JOIN files ON files.id = notes.rowid
+            WHERE notes MATCH ?
+            ORDER BY bm25(notes, 10.0, 2.0, 1.0)
+            LIMIT ?""", (query, limit))
+        return [(os.path.join(self.directory, path), title, created, snippet)
+                for path, title, created, snippet in rows]
@@ -0,0 +1,306 @@
+"""
+Schedule layout engine shared by planner.py (Tkinter) and planner-QT.py (PyQt).
+Author: Burhan Sabuwala
+
+Positions are computed once per day in normalized coordinates (fractions of the visible
+time window and of the day column) and cached. The day, week and month views only map
+those cached arrays onto their cells, so switching views or paging through a busy quarter
+never recomputes a day that has not changed.
+
+This work is licensed under the Creative Commons Attribution-NonCommercial 4.0 International (CC BY-NC 4.0) License.
+https://creativecommons.org/licenses/by-nc/4.0/
+"""
+
+import bisect
+import calendar
+import heapq
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from planner_calendar import month_grid
+from planner_core import day_span, lazy_import
+
+np = lazy_import("numpy")
+
+VIEWS = ("day", "week", "month")
+
+# Bursts of resize events are coalesced into at most one relayout per frame (~60 fps)
+RELAYOUT_INTERVAL_MS = 16
+
+
+def hour_label(hour):
+    """12-hour clock label used for the schedule rows, e.g. "8:00 AM"."""
+    if hour % 24 == 0:
+        return "12:00 AM"
+    if hour < 12:
+        return f"{hour}:00 AM"
+    if hour == 12:
+        return "12:00 PM"
+    return f"{hour - 12}:00 PM"
+
+
+def pack_columns(events, columns):
+    """
+    Sweep events sorted by start into clusters of transitively overlapping events and give
+    each event the lowest column free at its start. Writes (column, cluster_columns) into
+    columns[event.id] and returns the clusters as [start, end, events] lists. O(n log n).
+    """
+    clusters = []
+    cluster = None
+    active = []  # heap of (end, column) for events still running
+    free = []  # heap of columns released inside the current cluster
+    width = 0
+
+    def close(cluster, width):
+        for member in cluster[2]:
+            columns[member.id] = (columns[member.id], width)
+
+    for event in events:
+        if cluster is None or event.start >= cluster[1]:
+            if cluster is not None:
+                close(cluster, width)
+            cluster = [event.start, event.end, []]
+            clusters.append(cluster)
+            active.clear()
+            free.clear()
+            width = 0
+
+        while active and active[0][0] <= event.start:
+            heapq.heappush(free, heapq.heappop(active)[1])
+        if free:
+            column = heapq.heappop(free)
+        else:
+            column = width
+            width += 1
+        heapq.heappush(active, (event.end, column))
+
+        cluster[1] = max(cluster[1], event.end)
+        cluster[2].append(event)
+        columns[event.id] = column
+
+    if cluster is not None:
+        close(cluster, width)
+    return clusters
+
+
+class DayLayout:
+    """
+    Geometry of one day's events, in normalized coordinates.
+
+    Overlapping events are packed side by side: each cluster of transitively overlapping
+    events is split into as many columns as it needs at its busiest. Adding or removing an
+    event only repacks the clusters it touches. The arrays used for drawing (top/bottom as
+    fractions of the time window, left/width as fractions of the day column) are rebuilt
+    lazily, in one vectorized pass, the next time the day is drawn.
+    """
+    __slots__ = ("day", "events", "columns", "start_hour", "hours",
+                 "_keys", "_clusters", "_cluster_starts", "_arrays")
+
+    def __init__(self, day, events, start_hour, hours):
+        self.day = day
+        self.start_hour = start_hour
+        self.hours = hours
+        self.events = [e for e in events if self.visible(e)]  # sorted by (start, id)
+        self._keys = [(e.start, e.id) for e in self.events]
+        self.columns = {}  # event id -> (column, columns in its cluster)
+        self._clusters = pack_columns(self.events, self.columns)
+        self._cluster_starts = [c[0] for c in self._clusters]
+        self._arrays = None
+
+    def __len__(self):
+        return len(self.events)
+
+    def _hours(self, moment):
+        """Hours since this day's midnight (negative or past 24 for other days)."""
+        delta = moment - datetime(self.day.year, self.day.month, self.day.day)
+        return delta.total_seconds() / 3600
+
+    def visible(self, event):
+        return (self._hours(event.end) > self.start_hour
+                and self._hours(event.start) < self.start_hour + self.hours)
+
+    def add(self, event):
+        if not self.visible(event):
+            return
+        key = (event.start, event.id)
+        i = bisect.bisect_left(self._keys, key)
+        self._keys.insert(i, key)
+        self.events.insert(i, event)
+
+        # Clusters are disjoint and sorted, so the ones the event overlaps are contiguous
+        first = bisect.bisect_right(self._cluster_starts, event.start) - 1
+        if first < 0 or self._clusters[first][1] <= event.start:
+            first += 1
+        last = bisect.bisect_left(self._cluster_starts, event.end)
+        members = [event]
+        for cluster in self._clusters[first:last]:
+            members.extend(cluster[2])
+        members.sort(key=lambda e: (e.start, e.id))
+        self._repack(first, last, members)
+
+    def remove(self, event):
+        if event.id not in self.columns:
+            return
+        i = bisect.bisect_left(self._keys, (event.start, event.id))
+        del self._keys[i]
+        del self.events[i]
+        del self.columns[event.id]
+
+        index = bisect.bisect_right(self._cluster_starts, event.start) - 1
+        members = [e for e in self._clusters[index][2] if e.id != event.id]
+        self._repack(index, index + 1, members)
+
+    def _repack(self, first, last, members):
+        clusters = pack_columns(members, self.columns)
+        self._clusters[first:last] = clusters
+        self._cluster_starts[first:last] = [c[0] for c in clusters]
+        self._arrays = None
+
+    def arrays(self):
+        """(top, bottom, left, width) arrays, in the order of self.events."""
+        if self._arrays is None:
+            count = len(self.events)
+            starts = np.fromiter((self._hours(e.start) for e in self.events), float, count)
+            ends = np.fromiter((self._hours(e.end) for e in self.events), float, count)
+            column = np.fromiter((self.columns[e.id][0] for e in self.events), float, count)
+            width = np.fromiter((self.columns[e.id][1] for e in self.events), float, count)
+            top = np.clip((starts - self.start_hour) / self.hours, 0, 1)
+            bottom = np.clip((ends - self.start_hour) / self.hours, 0, 1)
+            self._arrays = (top, bottom, column / np.maximum(width, 1), 1 / np.maximum(width, 1))
+        return self._arrays
+
+    def rects(self, x, y, w, h):
+        """Pixel rectangles (xs, ys, widths, heights) for every event in a cell, as int arrays."""
+        if not self.events:
+            return (), (), (), ()  # most days of a month: no need to load numpy at all
+        top, bottom, left, width = self.arrays()
+        xs = np.rint(x + left * w).astype(int)
+        ys = np.rint(y + top * h).astype(int)
+        ws = np.maximum(np.rint(x + (left + width) * w).astype(int) - xs, 1)
+        hs = np.maximum(np.rint(y + bottom * h).astype(int) - ys, 1)
+        return xs, ys, ws, hs
+
+
+class ScheduleEngine:
+    """
+    Computes and caches DayLayouts for an EventStore over an arbitrary time window
+    (start_hour to end_hour, 0-24). Cached days are updated incrementally when one of
+    their events changes; the cache is bounded and evicts the least recently used days.
+    """
+
+    def __init__(self, event_store, start_hour=8, end_hour=20, cache_size=400):
+        self.event_store = event_store
+        self.start_hour = start_hour
+        self.end_hour = end_hour
+        self.cache_size = cache_size
+        self._cache = OrderedDict()  # date -> DayLayout
+        event_store.subscribe(self._event_changed)
+
+    @property
+    def hours(self):
+        return self.end_hour - self.start_hour
+
+    def set_window(self, start_hour, end_hour):
+        if not 0 <= start_hour < end_hour <= 24:
+            raise ValueError("The time window must lie within 0-24 and end after it starts.")
+        self.start_hour = start_hour
+        self.end_hour = end_hour
+        self._cache.clear()
+
+    def hour_labels(self):
+        return [hour_label(h) for h in range(self.start_hour, self.end_hour)]
+
+    def time_fraction(self, moment):
+        """Position of a datetime within the time window, or None when it falls outside."""
+        hour = moment.hour + moment.minute / 60
+        fraction = (hour - self.start_hour) / self.hours
+        return fraction if 0 <= fraction < 1 else None
+
+    # ----------------------------- Date ranges -----------------------------#
+    @staticmethod
+    def days(view, anchor):
+        """
+        Dates shown by a view around an anchor date, with the grid they are laid out in.
+        Returns (days, columns, rows): one cell for "day", Monday-Sunday for "week" and
+        the full weeks of the month for "month".
+        """
+        if view == "day":
+            return [anchor], 1, 1
+        if view == "week":
+            monday = anchor - timedelta(days=anchor.weekday())
+            return [monday + timedelta(days=i) for i in range(7)], 7, 1
+        if view == "month":
+            weeks = month_grid(anchor.year, anchor.month)
+            return [day for week in weeks for day in week], 7, len(weeks)
+        raise ValueError(f"Unknown view {view!r}")
+
+    def grid(self, view, anchor, width, height):
+        """
+        Cell grid of a view drawn in a width x height area.
+        Returns (days, columns, gutter, header, cell_width, cell_height): the gutter on the left
+        holds the hour labels and the header row the day names.
+        """
+        days, columns, rows = self.days(view, anchor)
+        if view == "day":
+            gutter, header = int(width * 0.35), 0
+            cell_width = int(width * 0.60)
+        else:
+            gutter = 70 if view == "week" else 0
+            header = 24
+            cell_width = (width - gutter) // columns
+        return days, columns, gutter, header, cell_width, (height - header) // rows
+
+    @staticmethod
+    def title(view, anchor):
+        if view == "day":
+            return f"{anchor:%A, %b %d}"
+        if view == "week":
+            return f"Week of {anchor - timedelta(days=anchor.weekday()):%b %d}"
+        return f"{anchor:%B %Y}"
+
+    @staticmethod
+    def step(view, anchor, direction):
+        """Anchor date one view-length before (direction=-1) or after (direction=1)."""
+        if view == "day":
+            return anchor + timedelta(days=direction)
+        if view == "week":
+            return anchor + timedelta(weeks=direction)
+        month = anchor.month - 1 + direction
+        year = anchor.year + month // 12
+        month = month % 12 + 1
+        return anchor.replace(year=year, month=month, day=min(anchor.day, calendar.monthrange(year, month)[1]))
+
+    # ----------------------------- Layout -----------------------------#
+    def day_layout(self, day):
+        layout = self._cache.get(day)
+        if layout is not None:
+            self._cache.move_to_end(day)
+            return layout
+
+        layout = self._compute(day)
+        self._cache[day] = layout
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return layout
+
+    def layouts(self, days):
+        return [self.day_layout(day) for day in days]
+
+    def _compute(self, day):
+        return DayLayout(day, self.event_store.on_day(day), self.start_hour, self.hours)
+
+    def _event_changed(self, kind, event):
+        if kind == "rule":
+            # A recurring event changed: drop the cached days it can reach, they are recomputed on demand
+            for day in [day for day in self._cache if event.overlaps(*day_span(day))]:
+                del self._cache[day]
+            return
+        # Cached days are updated in place; only the clusters the event touches are repacked
+        for day in self.event_store.days_of(event):
+            layout = self._cache.get(day)
+            if layout is None:
+                continue
+            if kind == "add":
+                layout.add(event)
+            else:
+                layout.remove(event)
@@ -0,0 +1,46 @@
+"""
+Colour themes shared by planner.py (Tkinter) and planner-QT.py (PyQt).
+Author: Burhan Sabuwala
+
+Each front end compiles every theme once at startup (a QPalette in Qt, per-role widget
+options in Tk). Switching theme swaps in the prepared object for the few themed surfaces,
+so it costs the same however many tasks and events are on screen.
+
+This work is licensed under the Creative Commons Attribution-NonCommercial 4.0 International (CC BY-NC 4.0) License.
+https://creativecommons.org/licenses/by-nc/4.0/
+"""
+
+
+class Theme:
+    """The colours of one theme: window background, text, schedule hour slots and buttons."""
+    __slots__ = ("name", "bg", "text", "slot", "button")
+
+    def __init__(self, name, bg, text, slot, button):
+        self.name = name
+        self.bg = bg
+        self.text = text
+        self.slot = slot
+        self.button = button
+
+    def __repr__(self):
+        return f"Theme({self.name!r})"
+
+
+THEMES = {
+    "day": Theme("day", bg="#FFECD8", text="#381d2a", slot="#88D5D3", button="#E3E6B5"),
+    "night": Theme("night", bg="#231123", text="#da4167", slot="#3E0F06", button="#3B5360"),
+}
+
+DEFAULT_THEME = THEMES["day"]
+
+
+def tk_options(theme):
+    """
+    Widget options per role for the Tk front end: "bg" for frames and other plain
+    surfaces, "label" for text on the background, "button" for buttons and checkbuttons.
+    """
+    return {
+        "bg": {"bg": theme.bg},
+        "label": {"bg": theme.bg, "fg": theme.text},
+        "button": {"bg": theme.button, "fg": theme.text},
+    }
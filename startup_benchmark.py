@@ -0,0 +1,81 @@
+"""
+Time-to-first-frame benchmark for planner-QT.py and planner.py.
+Author: Burhan Sabuwala
+
+Each run starts the front end in a fresh interpreter with PLANNER_BENCHMARK set. The app
+prints the wall-clock time once its first frame has been drawn and exits, and the
+benchmark reports how long that took from launching the process. Runs use an empty
+temporary home directory unless --home is given, so results do not depend on saved data.
+
+    python startup_benchmark.py qt --runs 10
+    python startup_benchmark.py tk --home ~      # with your own tasks and events
+    python startup_benchmark.py qt --importtime  # where the import time goes
+
+Headless machines can run the Qt front end with QT_QPA_PLATFORM=offscreen.
+
+This work is licensed under the Creative Commons Attribution-NonCommercial 4.0 International (CC BY-NC 4.0) License.
+https://creativecommons.org/licenses/by-nc/4.0/
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SCRIPTS = {"qt": "planner-QT.py", "tk": "planner.py"}
+
+# Printed by the front ends when PLANNER_BENCHMARK is set
+FIRST_FRAME_PREFIX = "first-frame "
+
+
+def run_once(script, home, importtime=False):
+    """Seconds from process launch to the first frame, and the child's stderr."""
+    env = dict(os.environ, HOME=home, PLANNER_BENCHMARK="1")
+    command = [sys.executable] + (["-X", "importtime"] if importtime else []) + [os.path.join(HERE, script)]
+    start = time.time()
+    result = subprocess.run(command, env=env, cwd=HERE, capture_output=True, text=True, timeout=120)
+    for line in result.stdout.splitlines():
+        if line.startswith(FIRST_FRAME_PREFIX):
+            return float(line[len(FIRST_FRAME_PREFIX):]) - start, result.stderr
+    raise RuntimeError(f"{script} exited ({result.returncode}) without drawing a frame:\n{result.stderr}")
+
+
+def slowest_imports(stderr, count=15):
+    """The imports with the largest cumulative time from -X importtime output."""
+    rows = []
+    for line in stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            _, cumulative, name = line[len("import time:"):].split("|")
+            if cumulative.strip().isdigit():
+                rows.append((int(cumulative), name.rstrip()))
+    return sorted(rows, reverse=True)[:count]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("front_end", choices=sorted(SCRIPTS))
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--home", help="home directory to start with (default: an empty temporary one)")
+    parser.add_argument("--importtime", action="store_true", help="also list the slowest imports of one run")
+    args = parser.parse_args()
+
+    script = SCRIPTS[args.front_end]
+    with tempfile.TemporaryDirectory() as scratch:
+        home = os.path.expanduser(args.home) if args.home else scratch
+        run_once(script, home)  # warm the OS file cache so runs are comparable
+        times = [run_once(script, home)[0] for _ in range(args.runs)]
+        print(f"{script}: time to first frame over {args.runs} runs: "
+              f"min {min(times) * 1000:.0f} ms, median {statistics.median(times) * 1000:.0f} ms, "
+              f"max {max(times) * 1000:.0f} ms")
+        if args.importtime:
+            print("Slowest imports (cumulative):")
+            for microseconds, name in slowest_imports(run_once(script, home, importtime=True)[1]):
+                print(f"  {microseconds / 1000:8.1f} ms  {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Render cache vs. the in-process PDF renderer: two saves of the same body share a cached
+PDF, so nothing that differs between those saves may appear in the rendered note.
+"""
+
+import importlib.util
+import os
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from planner_export import ExportJob, RenderCache
+from planner_notes import format_note
+
+try:
+    from PyQt5.QtWidgets import QApplication
+except ImportError:
+    QApplication = None
+
+
+def load_qt_front_end():
+    spec = importlib.util.spec_from_file_location("planner_qt", os.path.join(ROOT, "planner-QT.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@unittest.skipIf(QApplication is None, "PyQt5 is not installed")
+class RenderCacheTimestampTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication([])
+        cls.qt = load_qt_front_end()
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.note = os.path.join(self.directory.name, "note.md")
+        self.pdf = os.path.join(self.directory.name, "note.pdf")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def save(self, last_modified):
+        metadata = {"Title": "Trip", "Date Created": "2026-01-01 09:00:00", "Last Modified": last_modified}
+        with open(self.note, "w", encoding="utf-8") as f:
+            f.write(format_note(metadata, "Pack the **tent**."))
+
+    def test_same_body_saves_do_not_show_a_stale_timestamp(self):
+        cache = RenderCache(os.path.join(self.directory.name, "cache"))
+        self.save("2026-01-01 10:00:00")
+        first_key = cache.key(ExportJob(self.note, self.pdf, "qt"))
+        self.qt.render_pdf(self.note, self.pdf)
+        cache.store(first_key, self.pdf, 0.1)
+        _, first = self.qt.note_document(self.note)
+
+        self.save("2026-01-02 18:30:00")
+        second_key = cache.key(ExportJob(self.note, self.pdf, "qt"))
+        _, second = self.qt.note_document(self.note)
+
+        # The second save is served from the cache, so both renders must be the same text
+        self.assertEqual(first_key, second_key)
+        self.assertTrue(cache.restore(second_key, self.pdf))
+        self.assertEqual(first.toPlainText(), second.toPlainText())
+        self.assertNotIn("2026-01-01 10:00:00", first.toPlainText())
+        self.assertNotIn("2026-01-02 18:30:00", second.toPlainText())
+        self.assertIn("Date Created: 2026-01-01 09:00:00", second.toPlainText())
+
+
+if __name__ == "__main__":
+    unittest.main()